@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Profile, FreelancerProfile, ClientProfile
+from .models import Profile, FreelancerProfile, ClientProfile, UserStats, OutboxEmail
 
 admin.site.register(Profile)
 admin.site.register(FreelancerProfile)
 admin.site.register(ClientProfile)
+admin.site.register(UserStats)
+admin.site.register(OutboxEmail)
@@ -0,0 +1,119 @@
+"""
+Profile pictures, normalized on upload.
+
+Users upload multi-MB phone photos that are only ever shown as 100-150px
+avatars, so ``staged_avatar`` decodes an upload once, turns it upright from
+its EXIF orientation, crops it square and writes it at each of
+``AVATAR_SIZES`` as WebP under ``profile_pics/<key>/<size>.webp``, without
+any of the original's metadata (location included). The profile's
+ImageField stores the largest variant; templates pick the others through
+the ``avatar_url`` and ``avatar_srcset`` filters (``accounts.templatetags.avatars``).
+
+Pictures stored before this (any other name under ``profile_pics/``) are
+served as they are until the ``normalize_profile_pictures`` command
+converts them.
+"""
+import io
+import re
+import uuid
+from contextlib import contextmanager
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+AVATAR_DIR = 'profile_pics'
+# Square edge in pixels of each variant: the 1x, 2x and 3x renditions of
+# the largest avatar shown (150px on the dashboards)
+AVATAR_SIZES = (160, 320, 480)
+AVATAR_QUALITY = 82
+AVATAR_NAME_RE = re.compile(rf'^{AVATAR_DIR}/(?P<key>[0-9a-f]{{32}})/(?P<size>\d+)\.webp$')
+
+
+class AvatarError(ValueError):
+    pass
+
+
+def avatar_variant(name, size):
+    """The name of the ``size`` variant of a normalized avatar ``name``, or None for other names"""
+    match = AVATAR_NAME_RE.match(name or '')
+    if not match:
+        return None
+    return f"{AVATAR_DIR}/{match.group('key')}/{size}.webp"
+
+
+def render_avatar(source):
+    """
+    Write the variants of the picture in ``source`` (a path or file object)
+    and return the name of the largest. Raises ``AvatarError`` if it is not
+    an image. Touches no database, so it can run in a worker process.
+    """
+    largest = max(AVATAR_SIZES)
+    try:
+        with Image.open(source) as image:
+            # Let JPEG decode straight at a reduced scale that still covers the largest variant
+            image.draft('RGB', (largest, largest))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise AvatarError("The profile picture is not a valid image.")
+
+    image = ImageOps.fit(image, (largest, largest), Image.LANCZOS)
+    key = uuid.uuid4().hex
+    name = None
+    # Largest first, each resized from the previous one
+    for size in sorted(AVATAR_SIZES, reverse=True):
+        if size != image.width:
+            image = image.resize((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        # Nothing but the pixels is written: no EXIF, XMP or ICC profile
+        image.save(buffer, 'WEBP', quality=AVATAR_QUALITY, method=6)
+        saved = default_storage.save(f'{AVATAR_DIR}/{key}/{size}.webp', ContentFile(buffer.getvalue()))
+        name = name or saved
+    return name
+
+
+def delete_avatar(name):
+    """Remove a stored profile picture and all its variants"""
+    if avatar_variant(name, 0) is None:
+        default_storage.delete(name)
+        return
+    for size in AVATAR_SIZES:
+        default_storage.delete(avatar_variant(name, size))
+
+
+@contextmanager
+def staged_avatar(upload):
+    """
+    Render ``upload`` (None for no new picture) and yield the name to pass
+    to ``store_avatar``. Enter it before the transaction: decoding and
+    encoding take long enough that they must not hold the database write
+    lock. If the block raises, e.g. the transaction rolls back, the
+    rendered files are deleted again.
+
+        with staged_avatar(upload) as avatar, transaction.atomic():
+            if avatar:
+                store_avatar(profile, avatar)
+            profile.save()
+    """
+    name = render_avatar(upload) if upload else None
+    try:
+        yield name
+    except BaseException:
+        if name:
+            delete_avatar(name)
+        raise
+
+
+def store_avatar(profile, name):
+    """
+    Make the rendered avatar ``name`` ``profile``'s picture (``profile`` is
+    a FreelancerProfile or ClientProfile). Call it inside the transaction
+    that saves ``profile``: the previous picture's files are removed when
+    that commits.
+    """
+    previous = profile.profile_picture.name
+    profile.profile_picture = name
+    if previous:
+        transaction.on_commit(lambda: delete_avatar(previous))
@@ -0,0 +1,16 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .context import USER_RELATED
+
+
+class WorkhubBackend(ModelBackend):
+    """``ModelBackend`` that loads a session's user with the rows views need (see ``accounts.context``)"""
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related(*USER_RELATED).get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
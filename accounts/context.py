@@ -0,0 +1,50 @@
+"""
+The signed-in user and their per-user rows, loaded once per request.
+
+``WorkhubBackend`` (``accounts.backends``) fetches the session's user with
+its ``Profile``, ``Wallet`` and freelancer/client profile in one joined
+query, and ``WorkhubUserMiddleware`` exposes them as
+``request.workhub_user``, so views (and templates using ``user.profile``)
+never look those rows up again. Reading it never writes: a user without a
+wallet row gets an unsaved, empty ``Wallet`` to display.
+"""
+from django.utils.functional import cached_property
+
+# Rows joined onto the user by WorkhubBackend.get_user
+USER_RELATED = ('profile', 'wallet', 'profile__freelancerprofile', 'profile__clientprofile')
+
+
+class WorkhubUser:
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def profile(self):
+        """The user's Profile, or None (anonymous, or registration not finished)"""
+        if not self.user.is_authenticated:
+            return None
+        return getattr(self.user, 'profile', None)
+
+    @property
+    def role(self):
+        return self.profile.role if self.profile else None
+
+    @cached_property
+    def role_profile(self):
+        """The FreelancerProfile or ClientProfile for the user's role, or None before setup"""
+        if self.role == 'freelancer':
+            return getattr(self.profile, 'freelancerprofile', None)
+        if self.role == 'client':
+            return getattr(self.profile, 'clientprofile', None)
+        return None
+
+    @cached_property
+    def wallet(self):
+        from payments.models import Wallet
+
+        if not self.user.is_authenticated:
+            return None
+        wallet = getattr(self.user, 'wallet', None)
+        # Wallets are created with the user; never create one on a read
+        return wallet if wallet is not None else Wallet(user=self.user)
@@ -0,0 +1,58 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.avatars import AvatarError, avatar_variant, delete_avatar, render_avatar
+from accounts.models import ClientProfile, FreelancerProfile
+
+PROFILE_MODELS = (FreelancerProfile, ClientProfile)
+
+
+def _normalize(name):
+    try:
+        return name, render_avatar(default_storage.path(name)), None
+    except (AvatarError, OSError) as e:
+        return name, None, str(e)
+
+
+class Command(BaseCommand):
+    help = "Convert profile pictures uploaded before normalization into resized WebP variants, on a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Worker processes (default: one per CPU)")
+        parser.add_argument('--keep-originals', action='store_true',
+                            help="Leave the original files in place")
+
+    def handle(self, *args, **options):
+        names = set()
+        for model in PROFILE_MODELS:
+            names.update(
+                model.objects.exclude(profile_picture='').values_list('profile_picture', flat=True)
+            )
+        pending = sorted(name for name in names if name and avatar_variant(name, 0) is None)
+        self.stdout.write(f"{len(pending)} picture(s) to normalize")
+
+        converted = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for name, normalized, error in pool.map(_normalize, pending, chunksize=8):
+                if normalized is None:
+                    failed += 1
+                    self.stderr.write(f"Skipped {name}: {error}")
+                    continue
+                with transaction.atomic():
+                    updated = sum(
+                        model.objects.filter(profile_picture=name).update(profile_picture=normalized)
+                        for model in PROFILE_MODELS
+                    )
+                if not updated:
+                    # The user replaced the picture meanwhile
+                    delete_avatar(normalized)
+                    continue
+                converted += 1
+                if not options['keep_originals']:
+                    default_storage.delete(name)
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {converted} normalized, {failed} failed"))
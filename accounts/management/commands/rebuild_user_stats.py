@@ -0,0 +1,18 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from accounts.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized dashboard stats from jobs, applications and payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help="Only rebuild these users (default: everyone)")
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+        count = rebuild_user_stats(users)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} user(s)"))
@@ -0,0 +1,54 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.outbox import backoff, send_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails in batches, each over one backend connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep when the outbox is empty")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the currently due emails and exit")
+        parser.add_argument('--backend', help="Override OUTBOX_EMAIL_BACKEND, e.g. "
+                            "django.core.mail.backends.console.EmailBackend")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        # Consecutive batches whose connection could not be opened
+        outages = 0
+        try:
+            while True:
+                try:
+                    sent, failed = send_batch(options['batch_size'], options['backend'])
+                except Exception as e:
+                    # E.g. the SMTP server is down: keep the worker alive and try again later
+                    if options['once']:
+                        raise CommandError(f"Could not connect to the email backend: {e}")
+                    outages += 1
+                    delay = backoff(outages).total_seconds()
+                    logger.exception(f"Could not connect to the email backend; retrying in {delay:.0f}s")
+                    time.sleep(delay)
+                    continue
+                outages = 0
+
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}")
+
+                if sent + failed < options['batch_size']:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total_sent} sent, {total_failed} failed"))
@@ -0,0 +1,11 @@
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .context import WorkhubUser
+
+
+class WorkhubUserMiddleware(MiddlewareMixin):
+    """Set ``request.workhub_user``; goes after ``AuthenticationMiddleware``"""
+
+    def process_request(self, request):
+        request.workhub_user = SimpleLazyObject(lambda: WorkhubUser(request.user))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_clientprofile_phone_number_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_applications', models.PositiveIntegerField(default=0)),
+                ('assigned_in_progress', models.PositiveIntegerField(default=0)),
+                ('assigned_completed', models.PositiveIntegerField(default=0)),
+                ('total_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pending_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('applications_received', models.PositiveIntegerField(default=0)),
+                ('posted_jobs', models.PositiveIntegerField(default=0)),
+                ('posted_in_progress', models.PositiveIntegerField(default=0)),
+                ('posted_completed', models.PositiveIntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pending_payments', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'user stats',
+            },
+        ),
+    ]
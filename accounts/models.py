@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Profile(models.Model):
     ROLE_CHOICES = [
@@ -36,4 +37,71 @@ class ClientProfile(models.Model):
     profile_picture = models.ImageField(upload_to="profile_pics/")
 
     def __str__(self):
-        return f"Client: {self.first_name} {self.last_name} - {self.company_name} ({self.profile.user.username})"
\ No newline at end of file
+        return f"Client: {self.first_name} {self.last_name} - {self.company_name} ({self.profile.user.username})"
+
+class UserStats(models.Model):
+    """
+    Denormalized dashboard numbers for one user, kept up to date by
+    accounts.stats whenever an Application, Job or Payment changes.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats')
+
+    # freelancer side
+    total_applications = models.PositiveIntegerField(default=0)
+    assigned_in_progress = models.PositiveIntegerField(default=0)
+    assigned_completed = models.PositiveIntegerField(default=0)
+    total_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pending_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # client side
+    applications_received = models.PositiveIntegerField(default=0)
+    posted_jobs = models.PositiveIntegerField(default=0)
+    posted_in_progress = models.PositiveIntegerField(default=0)
+    posted_completed = models.PositiveIntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pending_payments = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'user stats'
+
+    def __str__(self):
+        return f"Stats for {self.user.username}"
+
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be delivered by the ``send_outbox`` worker.
+
+    Rows are written in the same transaction as the change that triggers
+    the email, so a rolled back registration never sends a welcome email and
+    a slow SMTP server never holds up a request.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    ]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            # The worker's "due pending emails" query
+            models.Index(fields=['status', 'next_attempt_at'], name='accounts_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
@@ -0,0 +1,154 @@
+"""
+Transactional email outbox.
+
+``enqueue`` stores an email as an ``OutboxEmail`` row; nothing is sent
+from the request. The ``send_outbox`` management command drains due rows
+in batches, each over one backend connection (one SMTP login/TLS handshake
+per batch rather than per email) that is closed before the worker sleeps,
+so it never reuses a connection the server dropped while idle. Failed
+sends are retried with exponential backoff and moved to ``dead`` after
+``OUTBOX_MAX_ATTEMPTS``; a backend that can't be reached uses no attempts.
+
+The backend is ``OUTBOX_EMAIL_BACKEND`` (default ``EMAIL_BACKEND``), so
+the console or file backends can be used to exercise the worker offline.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# A claimed batch is hidden from other workers for this long; if the worker
+# dies mid-batch the rows simply become due again afterwards.
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(to_email, subject, body, html_body='', from_email=None):
+    """Queue an email for delivery by the outbox worker"""
+    return OutboxEmail.objects.create(
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL or '',
+    )
+
+
+def backoff(attempts):
+    """Delay before retry number ``attempts`` (1-based), doubling each time"""
+    base = _setting('OUTBOX_RETRY_BASE_SECONDS', 30)
+    cap = _setting('OUTBOX_RETRY_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def claim_batch(batch_size):
+    """
+    Lock up to ``batch_size`` due emails for this worker and return them.
+
+    Rows are locked with SKIP LOCKED where the database supports it and
+    pushed ``CLAIM_TIMEOUT`` into the future, so concurrent workers never
+    pick up the same email.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if batch:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=now + CLAIM_TIMEOUT
+            )
+    return batch
+
+
+def _message(email, connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=[email.to_email],
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _record_failure(email, error):
+    max_attempts = _setting('OUTBOX_MAX_ATTEMPTS', 5)
+    email.attempts += 1
+    email.last_error = str(error)[:2000]
+    if email.attempts >= max_attempts:
+        email.status = 'dead'
+        logger.error(f"Outbox email {email.pk} to {email.to_email} dead after {email.attempts} attempts: {error}")
+    else:
+        email.next_attempt_at = timezone.now() + backoff(email.attempts)
+        logger.warning(f"Outbox email {email.pk} to {email.to_email} failed (attempt {email.attempts}): {error}")
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def release(batch):
+    """Make claimed emails due again without counting an attempt"""
+    OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(next_attempt_at=timezone.now())
+
+
+def send_batch(batch_size=50, backend=None):
+    """
+    Claim one batch of due emails and send it over one backend connection,
+    opened for the batch and closed afterwards.
+
+    Returns ``(sent, failed)``. An error on one email does not abort the
+    batch; if the connection breaks, the remaining emails fail this round
+    and are retried later. If the connection can't be opened at all, the
+    batch is released untouched and the error raised.
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+    try:
+        connection = open_connection(backend)
+    except Exception:
+        release(batch)
+        raise
+
+    sent = failed = 0
+    try:
+        for email in batch:
+            try:
+                _message(email, connection).send(fail_silently=False)
+            except Exception as e:
+                _record_failure(email, e)
+                failed += 1
+                continue
+            email.status = 'sent'
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            email.last_error = ''
+            email.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+            sent += 1
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            logger.warning("Could not close the outbox email connection", exc_info=True)
+    return sent, failed
+
+
+def open_connection(backend=None):
+    """Open a connection to the outbox email backend"""
+    backend = backend or _setting('OUTBOX_EMAIL_BACKEND', None) or settings.EMAIL_BACKEND
+    connection = get_connection(backend=backend, fail_silently=False)
+    connection.open()
+    return connection
@@ -1,7 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from accounts.email_service import EmailService
+from accounts.stats import (
+    apply_change, application_contributions, job_contributions, payment_contributions,
+)
+from jobs.models import Job, Application
+from payments.models import Payment
 
 
 @receiver(post_save, sender=User)
@@ -11,3 +16,66 @@ def send_registration_email(sender, instance, created, **kwargs):
     """
     if created:
         EmailService.send_welcome_email(instance)
+
+
+# Denormalized dashboard stats (see accounts/stats.py)
+
+JOB_STATS_FIELDS = ('client_id', 'freelancer_id', 'status')
+PAYMENT_STATS_FIELDS = ('from_user_id', 'to_user_id', 'status', 'payment_type', 'amount')
+
+
+def _previous_state(sender, instance, fields):
+    """Remember the stored values so post_save can subtract them"""
+    instance._stats_previous = None
+    if instance.pk:
+        instance._stats_previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def _contributions(instance, fields, contributions):
+    return contributions(*(getattr(instance, field) for field in fields))
+
+
+@receiver(post_save, sender=Application)
+def application_stats_created(sender, instance, created, **kwargs):
+    if created:
+        apply_change({}, application_contributions(instance.freelancer_id, instance.job.client_id))
+
+
+@receiver(post_delete, sender=Application)
+def application_stats_deleted(sender, instance, **kwargs):
+    client_id = Job.objects.filter(pk=instance.job_id).values_list('client_id', flat=True).first()
+    apply_change(application_contributions(instance.freelancer_id, client_id), {}, rebuild=False)
+
+
+@receiver(pre_save, sender=Job)
+def job_stats_snapshot(sender, instance, **kwargs):
+    _previous_state(sender, instance, JOB_STATS_FIELDS)
+
+
+@receiver(post_save, sender=Job)
+def job_stats_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_stats_previous', None)
+    old = job_contributions(*(previous[f] for f in JOB_STATS_FIELDS)) if previous else {}
+    apply_change(old, _contributions(instance, JOB_STATS_FIELDS, job_contributions))
+
+
+@receiver(post_delete, sender=Job)
+def job_stats_deleted(sender, instance, **kwargs):
+    apply_change(_contributions(instance, JOB_STATS_FIELDS, job_contributions), {}, rebuild=False)
+
+
+@receiver(pre_save, sender=Payment)
+def payment_stats_snapshot(sender, instance, **kwargs):
+    _previous_state(sender, instance, PAYMENT_STATS_FIELDS)
+
+
+@receiver(post_save, sender=Payment)
+def payment_stats_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_stats_previous', None)
+    old = payment_contributions(*(previous[f] for f in PAYMENT_STATS_FIELDS)) if previous else {}
+    apply_change(old, _contributions(instance, PAYMENT_STATS_FIELDS, payment_contributions))
+
+
+@receiver(post_delete, sender=Payment)
+def payment_stats_deleted(sender, instance, **kwargs):
+    apply_change(_contributions(instance, PAYMENT_STATS_FIELDS, payment_contributions), {}, rebuild=False)
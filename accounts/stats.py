@@ -0,0 +1,195 @@
+"""
+Incremental maintenance of the denormalized ``UserStats`` rows.
+
+Every Application, Job and Payment contributes a fixed set of counters and
+sums to one or two users (see the ``*_contributions`` functions). When one
+of those rows changes, the contribution of its old state is subtracted and
+the contribution of its new state added with a single ``F()`` UPDATE per
+affected user, inside the same transaction as the change itself.
+
+``rebuild_user_stats`` recomputes everything from scratch with grouped
+aggregates; it is used by the ``rebuild_user_stats`` management command and
+whenever a user has no stats row yet.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import UserStats
+
+COUNTER_FIELDS = [
+    'total_applications',
+    'applications_received',
+    'posted_jobs',
+    'posted_in_progress',
+    'posted_completed',
+    'assigned_in_progress',
+    'assigned_completed',
+]
+AMOUNT_FIELDS = [
+    'total_earnings',
+    'pending_earnings',
+    'total_spent',
+    'pending_payments',
+]
+# Stats rows upserted per statement by rebuild_user_stats
+REBUILD_BATCH_SIZE = 500
+
+
+def application_contributions(freelancer_id, client_id):
+    contributions = defaultdict(dict)
+    contributions[freelancer_id]['total_applications'] = 1
+    contributions[client_id]['applications_received'] = 1
+    return contributions
+
+
+def job_contributions(client_id, freelancer_id, status):
+    contributions = defaultdict(dict)
+    contributions[client_id]['posted_jobs'] = 1
+    if status in ('in_progress', 'completed'):
+        contributions[client_id][f'posted_{status}'] = 1
+        if freelancer_id:
+            contributions[freelancer_id][f'assigned_{status}'] = 1
+    return contributions
+
+
+def payment_contributions(from_user_id, to_user_id, status, payment_type, amount):
+    contributions = defaultdict(dict)
+    if payment_type != 'job_payment':
+        return contributions
+    amount = Decimal(str(amount))
+    if status == 'completed':
+        contributions[from_user_id]['total_spent'] = amount
+        if to_user_id:
+            contributions[to_user_id]['total_earnings'] = amount
+    elif status == 'on_hold':
+        contributions[from_user_id]['pending_payments'] = amount
+        if to_user_id:
+            contributions[to_user_id]['pending_earnings'] = amount
+    return contributions
+
+
+def apply_change(old, new, rebuild=True):
+    """
+    Move users' stats from the ``old`` contributions to the ``new`` ones.
+    Either side may be empty (row created / row deleted). A user without a
+    stats row gets one rebuilt, unless ``rebuild`` is False: deletions pass
+    that, since they may be cascading from the user itself, whose row would
+    then be recreated for a user about to disappear.
+    """
+    deltas = defaultdict(dict)
+    for sign, contributions in ((-1, old), (1, new)):
+        for user_id, fields in contributions.items():
+            for field, value in fields.items():
+                deltas[user_id][field] = deltas[user_id].get(field, 0) + sign * value
+
+    with transaction.atomic():
+        for user_id, fields in deltas.items():
+            changes = {field: F(field) + value for field, value in fields.items() if value}
+            if not user_id or not changes:
+                continue
+            changes['updated_at'] = timezone.now()
+            if not UserStats.objects.filter(user_id=user_id).update(**changes) and rebuild:
+                # No row yet: build it from the current (already changed) data
+                rebuild_user_stats(User.objects.filter(id=user_id))
+
+
+def rebuild_user_stats(users=None):
+    """
+    Recompute stats for ``users`` (a User queryset, default all users) with
+    one grouped aggregate per source table, then upsert the rows. The
+    aggregates are limited by a subquery on ``users`` (or not at all), never
+    by a list of ids, so a full rebuild doesn't send one parameter per user.
+    """
+    from jobs.models import Job, Application
+    from payments.models import Payment
+
+    def scoped(queryset, field):
+        if users is None:
+            return queryset
+        return queryset.filter(**{f'{field}__in': users.values('id')})
+
+    values = defaultdict(dict)
+
+    def collect(rows, key):
+        for row in rows:
+            user_id = row.pop(key)
+            values[user_id].update({field: value or 0 for field, value in row.items()})
+
+    collect(
+        scoped(Application.objects.all(), 'freelancer_id')
+        .values('freelancer_id').annotate(total_applications=Count('id')),
+        'freelancer_id',
+    )
+    collect(
+        scoped(Application.objects.all(), 'job__client_id')
+        .values('job__client_id').annotate(applications_received=Count('id')),
+        'job__client_id',
+    )
+    collect(
+        scoped(Job.objects.all(), 'client_id').values('client_id').annotate(
+            posted_jobs=Count('id'),
+            posted_in_progress=Count('id', filter=Q(status='in_progress')),
+            posted_completed=Count('id', filter=Q(status='completed')),
+        ),
+        'client_id',
+    )
+    collect(
+        scoped(Job.objects.all(), 'freelancer_id').values('freelancer_id').annotate(
+            assigned_in_progress=Count('id', filter=Q(status='in_progress')),
+            assigned_completed=Count('id', filter=Q(status='completed')),
+        ),
+        'freelancer_id',
+    )
+    job_payments = Payment.objects.filter(payment_type='job_payment')
+    collect(
+        scoped(job_payments, 'to_user_id').values('to_user_id').annotate(
+            total_earnings=Sum('amount', filter=Q(status='completed')),
+            pending_earnings=Sum('amount', filter=Q(status='on_hold')),
+        ),
+        'to_user_id',
+    )
+    collect(
+        scoped(job_payments, 'from_user_id').values('from_user_id').annotate(
+            total_spent=Sum('amount', filter=Q(status='completed')),
+            pending_payments=Sum('amount', filter=Q(status='on_hold')),
+        ),
+        'from_user_id',
+    )
+
+    # Every user gets a row, zeros included, upserted a batch of ids at a time
+    user_ids = (User.objects.all() if users is None else users).order_by('id').values_list('id', flat=True)
+    count = last_id = 0
+    while True:
+        batch = list(user_ids.filter(id__gt=last_id)[:REBUILD_BATCH_SIZE])
+        if not batch:
+            return count
+        rows = []
+        for user_id in batch:
+            row = {field: 0 for field in COUNTER_FIELDS}
+            row.update({field: Decimal('0.00') for field in AMOUNT_FIELDS})
+            row.update(values.get(user_id, {}))
+            rows.append(UserStats(user_id=user_id, **row))
+        UserStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=COUNTER_FIELDS + AMOUNT_FIELDS + ['updated_at'],
+        )
+        count += len(rows)
+        last_id = batch[-1]
+
+
+def get_user_stats(user):
+    """Return the user's stats row, building it on first use"""
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is None:
+        # In a transaction, so the row is read back from the primary it was written to
+        with transaction.atomic():
+            rebuild_user_stats(User.objects.filter(id=user.id))
+            stats = UserStats.objects.get(user=user)
+    return stats
@@ -0,0 +1,31 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from accounts.avatars import AVATAR_SIZES, avatar_variant
+
+register = template.Library()
+
+
+@register.filter
+def avatar_url(picture, width=None):
+    """
+    URL of the smallest variant of ``picture`` at least ``width`` pixels
+    wide (the largest if none is), for ``src``. Pictures that were never
+    normalized have a single URL.
+    """
+    if not picture:
+        return ''
+    sizes = sorted(AVATAR_SIZES)
+    size = next((size for size in sizes if width is None or size >= int(width)), sizes[-1])
+    name = avatar_variant(picture.name, size)
+    return default_storage.url(name) if name else picture.url
+
+
+@register.filter
+def avatar_srcset(picture):
+    """``srcset`` listing every variant of ``picture`` by width"""
+    if not picture or avatar_variant(picture.name, 0) is None:
+        return ''
+    return ', '.join(
+        f'{default_storage.url(avatar_variant(picture.name, size))} {size}w' for size in sorted(AVATAR_SIZES)
+    )
@@ -1,3 +1,219 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from accounts.avatars import AVATAR_SIZES, avatar_variant, render_avatar, staged_avatar, store_avatar
+from accounts.models import FreelancerProfile, OutboxEmail, Profile, UserStats
+from accounts.outbox import enqueue, send_batch
+from accounts.stats import get_user_stats, rebuild_user_stats
+from jobs.models import Application, Job
+from payments.models import Payment
+
+
+class UserStatsTests(TestCase):
+
+    def setUp(self):
+        self.client_user = User.objects.create_user('client', 'client@example.com', 'password')
+        self.freelancer = User.objects.create_user('freelancer', 'freelancer@example.com', 'password')
+        self.job = Job.objects.create(
+            title='Logo', description='A logo', category='design', budget=40,
+            deadline='2030-01-01', client=self.client_user,
+        )
+        Application.objects.create(
+            job=self.job, freelancer=self.freelancer, cover_letter='Hi',
+            proposed_budget=40, estimated_duration='1 week',
+        )
+        Payment.objects.create(
+            job=self.job, from_user=self.client_user, to_user=self.freelancer,
+            amount=Decimal('40.00'), status='on_hold',
+        )
+
+    def test_deleting_a_client_with_jobs(self):
+        self.client_user.delete()
+        self.assertFalse(UserStats.objects.filter(user_id=self.client_user.id).exists())
+        stats = get_user_stats(self.freelancer)
+        self.assertEqual((stats.total_applications, stats.pending_earnings), (0, 0))
+
+    def test_deleting_a_freelancer_with_applications(self):
+        self.freelancer.delete()
+        self.assertFalse(UserStats.objects.filter(user_id=self.freelancer.id).exists())
+        stats = get_user_stats(self.client_user)
+        self.assertEqual((stats.applications_received, stats.pending_payments), (0, 0))
+
+    def test_full_rebuild_filters_no_user_ids(self):
+        others = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'password') for i in range(3)]
+        UserStats.objects.all().delete()
+
+        with mock.patch('accounts.stats.REBUILD_BATCH_SIZE', 2), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(rebuild_user_stats(), 5)
+        self.assertEqual([query['sql'] for query in queries if ' IN (' in query['sql']], [])
+
+        stats = {row.user_id: row for row in UserStats.objects.all()}
+        self.assertEqual(set(stats), {self.client_user.id, self.freelancer.id, *(user.id for user in others)})
+        self.assertEqual(stats[self.freelancer.id].total_applications, 1)
+        self.assertEqual(stats[self.client_user.id].pending_payments, Decimal('40.00'))
+
+    def test_rebuild_for_some_users(self):
+        UserStats.objects.all().delete()
+        self.assertEqual(rebuild_user_stats(User.objects.filter(username='freelancer')), 1)
+        stats = UserStats.objects.get()
+        self.assertEqual((stats.user_id, stats.total_applications, stats.pending_earnings),
+                         (self.freelancer.id, 1, Decimal('40.00')))
+
+
+class AvatarTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = User.objects.create_user('freelancer', 'freelancer@example.com', 'password')
+        profile, _ = Profile.objects.get_or_create(user=user)
+        self.profile = FreelancerProfile(profile=profile, title='Designer', bio='', skills='', hourly_rate=20)
+
+    def upload(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600), 'red').save(buffer, 'JPEG')
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def stored(self, name):
+        return [default_storage.exists(avatar_variant(name, size)) for size in AVATAR_SIZES]
+
+    def test_renders_before_the_transaction(self):
+        # TestCase wraps each test in atomic blocks of its own
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        def render(upload):
+            depths.append(len(connection.atomic_blocks))
+            return render_avatar(upload)
+
+        with mock.patch('accounts.avatars.render_avatar', render):
+            with staged_avatar(self.upload()) as avatar, transaction.atomic():
+                store_avatar(self.profile, avatar)
+                self.profile.save()
+        self.assertEqual(depths, [depth])
+        self.assertEqual(self.stored(self.profile.profile_picture.name), [True] * len(AVATAR_SIZES))
+
+    def test_rollback_deletes_the_rendered_files(self):
+        with self.assertRaises(RuntimeError):
+            with staged_avatar(self.upload()) as avatar, transaction.atomic():
+                store_avatar(self.profile, avatar)
+                raise RuntimeError
+        self.assertEqual(self.stored(avatar), [False] * len(AVATAR_SIZES))
+
+
+class RejectingBackend(locmem.EmailBackend):
+    """Connects, but the server refuses every message"""
+
+    def send_messages(self, messages):
+        raise SMTPException('451 Try again later')
+
+
+class UnreachableBackend(locmem.EmailBackend):
+
+    def open(self):
+        raise ConnectionRefusedError('Connection refused')
+
+
+@override_settings(
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_BASE_SECONDS=30, OUTBOX_RETRY_MAX_SECONDS=3600,
+)
+class OutboxTests(TestCase):
+
+    def make_due(self):
+        OutboxEmail.objects.filter(status='pending').update(next_attempt_at=timezone.now())
+
+    def test_sends_due_emails(self):
+        enqueue('a@example.com', 'Welcome', 'Hello', html_body='<p>Hello</p>')
+        enqueue('b@example.com', 'Welcome', 'Hello')
+        OutboxEmail.objects.create(
+            to_email='later@example.com', subject='Later', body='Later',
+            next_attempt_at=timezone.now() + timedelta(hours=1),
+        )
+
+        self.assertEqual(send_batch(), (2, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['a@example.com', 'b@example.com'])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertEqual(
+            list(OutboxEmail.objects.order_by('id').values_list('status', 'attempts')),
+            [('sent', 1), ('sent', 1), ('pending', 0)],
+        )
+        self.assertEqual(send_batch(), (0, 0))
+
+    def test_failed_send_is_retried_with_backoff(self):
+        email = enqueue('a@example.com', 'Welcome', 'Hello')
+        backend = 'accounts.tests.RejectingBackend'
+        for attempt, delay in ((1, 30), (2, 60)):
+            before = timezone.now()
+            with self.assertLogs('accounts.outbox', 'WARNING'):
+                self.assertEqual(send_batch(backend=backend), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('pending', attempt))
+            self.assertIn('451', email.last_error)
+            self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=delay))
+            self.assertLess(email.next_attempt_at, before + timedelta(seconds=delay + 5))
+            # Not due until the backoff has passed
+            self.assertEqual(send_batch(backend=backend), (0, 0))
+            self.make_due()
+
+        self.assertEqual(send_batch(), (1, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('sent', 3))
+
+    def test_gives_up_after_max_attempts(self):
+        email = enqueue('a@example.com', 'Welcome', 'Hello')
+        with self.assertLogs('accounts.outbox', 'WARNING') as logs:
+            for _ in range(3):
+                send_batch(backend='accounts.tests.RejectingBackend')
+                self.make_due()
+        self.assertIn('dead after 3 attempts', logs.output[-1])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('dead', 3))
+        self.assertEqual(send_batch(), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_unreachable_backend_uses_no_attempts(self):
+        email = enqueue('a@example.com', 'Welcome', 'Hello')
+        with self.assertRaises(ConnectionRefusedError):
+            send_batch(backend='accounts.tests.UnreachableBackend')
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 0))
+        self.assertLessEqual(email.next_attempt_at, timezone.now())
+
+    def test_worker_survives_an_unreachable_backend(self):
+        enqueue('a@example.com', 'Welcome', 'Hello')
+        sleep = mock.Mock(side_effect=[None, KeyboardInterrupt])
+        with mock.patch('accounts.management.commands.send_outbox.time.sleep', sleep), \
+                self.assertLogs('accounts.management.commands.send_outbox', 'ERROR') as logs:
+            call_command(
+                'send_outbox', '--backend', 'accounts.tests.UnreachableBackend', stdout=io.StringIO(),
+            )
+        # Backed off twice (30s, 60s) instead of exiting
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [30, 60])
+        self.assertIn('retrying in 30s', logs.output[0])
+        self.assertEqual(OutboxEmail.objects.get().attempts, 0)
+
+        with self.assertRaisesMessage(CommandError, 'Connection refused'):
+            call_command('send_outbox', '--once', '--backend', 'accounts.tests.UnreachableBackend')
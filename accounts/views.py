@@ -5,11 +5,13 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.middleware.csrf import get_token
 from .models import Profile, FreelancerProfile, ClientProfile
+from .avatars import AvatarError, staged_avatar, store_avatar
+from .stats import get_user_stats
+from workhub.replicas import replica_reads
 from jobs.models import Application, Job
 from django.http import JsonResponse
 from django.urls import reverse
-from payments.models import Wallet
-from django.db import models
+from django.db import models, transaction
 
 def register(request):
     if request.user.is_authenticated:
@@ -43,9 +45,10 @@ def register(request):
             })
 
         try:
-            # Create user
-            user = User.objects.create_user(username=username, email=email, password=password1)
-            Profile.objects.create(user=user)
+            # Create user (the welcome email is queued in the same transaction)
+            with transaction.atomic():
+                user = User.objects.create_user(username=username, email=email, password=password1)
+                Profile.objects.create(user=user)
             login(request, user)
 
             csrf_token = get_token(request)
@@ -73,7 +76,9 @@ def save_role(request):
             return JsonResponse({"success": False, "message": "Please select a role"})
         
         # Update profile with role
-        profile = Profile.objects.get(user=request.user)
+        profile = request.workhub_user.profile
+        if profile is None:
+            return JsonResponse({"success": False, "message": "Please register first"})
         profile.role = role
         profile.save()
         
@@ -81,39 +86,36 @@ def save_role(request):
 
 @login_required  
 def setup_profile(request):
-    profile = Profile.objects.filter(user=request.user).first()
+    profile = request.workhub_user.profile
     
     if not profile or not profile.role:
         return redirect("register")
 
     if request.method == "POST":
-        if profile.role == "freelancer":
-            title = request.POST.get("title")
-            bio = request.POST.get("bio")
-            skills = request.POST.get("skills")
-            hourly_rate = request.POST.get("hourly_rate")
-            picture = request.FILES.get("profile_picture")
-
-            FreelancerProfile.objects.create(
-                profile=profile,
-                title=title,
-                bio=bio,
-                skills=skills,
-                hourly_rate=hourly_rate,
-                profile_picture=picture
-            )
-            
-        elif profile.role == "client":
-            first_name = request.POST.get("first_name")
-            last_name = request.POST.get("last_name")
-            company_name = request.POST.get("company_name")
-
-            ClientProfile.objects.create(
-                profile=profile,
-                first_name=first_name,
-                last_name=last_name,
-                company_name=company_name
-            )
+        picture = request.FILES.get("profile_picture")
+        try:
+            with staged_avatar(picture) as avatar, transaction.atomic():
+                if profile.role == "freelancer":
+                    role_profile = FreelancerProfile(
+                        profile=profile,
+                        title=request.POST.get("title"),
+                        bio=request.POST.get("bio"),
+                        skills=request.POST.get("skills"),
+                        hourly_rate=request.POST.get("hourly_rate"),
+                    )
+                elif profile.role == "client":
+                    role_profile = ClientProfile(
+                        profile=profile,
+                        first_name=request.POST.get("first_name"),
+                        last_name=request.POST.get("last_name"),
+                        company_name=request.POST.get("company_name"),
+                    )
+                if avatar:
+                    store_avatar(role_profile, avatar)
+                role_profile.save()
+        except AvatarError as e:
+            messages.error(request, str(e))
+            return redirect("setup_profile")
 
         messages.success(request, "Profile setup completed!")
         return redirect("dashboard")
@@ -144,40 +146,24 @@ def logout_view(request):
     return render(request, "accounts/logout.html")
 
 @login_required
+@replica_reads
 def dashboard(request):
-    profile = Profile.objects.filter(user=request.user).first()
+    profile = request.workhub_user.profile
 
     if not profile or not profile.role:
         return redirect("register")
     
-    # Create wallet if it doesn't exist
-    wallet, created = Wallet.objects.get_or_create(user=request.user)
+    wallet = request.workhub_user.wallet
     
     # Check if profile setup is complete
     if profile.role == "freelancer":
-        freelancer_profile = FreelancerProfile.objects.filter(profile=profile).first()
+        freelancer_profile = request.workhub_user.role_profile
         if not freelancer_profile:
             return redirect("setup_profile")
         
-        # Calculate freelancer statistics
-        total_applications = request.user.application_set.count()
-        completed_jobs = request.user.assigned_jobs.filter(status='completed').count()
-        in_progress_jobs = request.user.assigned_jobs.filter(status='in_progress').count()
-        
-        # Get earnings (completed payments)
-        from payments.models import Payment
-        total_earnings = Payment.objects.filter(
-            to_user=request.user,
-            status='completed',
-            payment_type='job_payment'
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
-        
-        pending_earnings = Payment.objects.filter(
-            to_user=request.user,
-            status='on_hold',
-            payment_type='job_payment'
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
-        
+        # Dashboard numbers are kept up to date in UserStats
+        stats = get_user_stats(request.user)
+
         # Split skills into a list
         skills_list = []
         if freelancer_profile.skills:
@@ -187,62 +173,40 @@ def dashboard(request):
             'profile': profile,
             'freelancer_profile': freelancer_profile,
             'skills_list': skills_list,
-            'total_applications': total_applications,
-            'completed_jobs': completed_jobs,
-            'in_progress_jobs': in_progress_jobs,
+            'total_applications': stats.total_applications,
+            'completed_jobs': stats.assigned_completed,
+            'in_progress_jobs': stats.assigned_in_progress,
             'wallet': wallet,
-            'total_earnings': total_earnings,
-            'pending_earnings': pending_earnings,
+            'total_earnings': stats.total_earnings,
+            'pending_earnings': stats.pending_earnings,
         }
         
         return render(request, "accounts/freelancer_dashboard.html", context)
     
     elif profile.role == "client":
-        client_profile = ClientProfile.objects.filter(profile=profile).first()
+        client_profile = request.workhub_user.role_profile
         if not client_profile:
             return redirect("setup_profile")
         
-        # Calculate client statistics
-        posted_jobs_count = request.user.posted_jobs.count()
-        completed_jobs_count = request.user.posted_jobs.filter(status='completed').count()
-        in_progress_jobs_count = request.user.posted_jobs.filter(status='in_progress').count()
-        
-        # Calculate total applications received on user's jobs
-        total_applications = 0
-        for job in request.user.posted_jobs.all():
-            total_applications += job.applications.count()
-        
-        # Calculate total spent and pending payments
-        from payments.models import Payment
-        total_spent = Payment.objects.filter(
-            from_user=request.user,
-            status='completed',
-            payment_type='job_payment'
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
-        
-        pending_payments = Payment.objects.filter(
-            from_user=request.user,
-            status='on_hold',
-            payment_type='job_payment'
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
-        
+        stats = get_user_stats(request.user)
+
         context = {
             'profile': profile,
             'client_profile': client_profile,
-            'posted_jobs_count': posted_jobs_count,
-            'completed_jobs_count': completed_jobs_count,
-            'in_progress_jobs_count': in_progress_jobs_count,
-            'total_applications': total_applications,
+            'posted_jobs_count': stats.posted_jobs,
+            'completed_jobs_count': stats.posted_completed,
+            'in_progress_jobs_count': stats.posted_in_progress,
+            'total_applications': stats.applications_received,
             'wallet': wallet,
-            'total_spent': total_spent,
-            'pending_payments': pending_payments,
+            'total_spent': stats.total_spent,
+            'pending_payments': stats.pending_payments,
         }
         
         return render(request, "accounts/client_dashboard.html", context)
     
 @login_required
 def edit_profile(request):
-    profile = Profile.objects.filter(user=request.user).first()
+    profile = request.workhub_user.profile
 
     if not profile:
         return redirect("register")
@@ -250,21 +214,19 @@ def edit_profile(request):
     context = {"profile": profile}
     
     if profile.role == "freelancer":
-        freelancer_profile = FreelancerProfile.objects.filter(profile=profile).first()
+        freelancer_profile = request.workhub_user.role_profile
         if not freelancer_profile:
             return redirect("setup_profile")
         context["freelancer_profile"] = freelancer_profile
         
     elif profile.role == "client":
-        client_profile = ClientProfile.objects.filter(profile=profile).first()
+        client_profile = request.workhub_user.role_profile
         if not client_profile:
             return redirect("setup_profile")
         context["client_profile"] = client_profile
 
     if request.method == "POST":
         if profile.role == "freelancer":
-            freelancer_profile = FreelancerProfile.objects.get(profile=profile)
-            
             freelancer_profile.first_name = request.POST.get("first_name", freelancer_profile.first_name) 
             freelancer_profile.last_name = request.POST.get("last_name", freelancer_profile.last_name) 
             freelancer_profile.title = request.POST.get("title", freelancer_profile.title)
@@ -276,23 +238,29 @@ def edit_profile(request):
             if hourly_rate:
                 freelancer_profile.hourly_rate = hourly_rate
             profile_picture = request.FILES.get("profile_picture")
-            if profile_picture:
-                freelancer_profile.profile_picture = profile_picture
-            
-            freelancer_profile.save()
+            try:
+                with staged_avatar(profile_picture) as avatar, transaction.atomic():
+                    if avatar:
+                        store_avatar(freelancer_profile, avatar)
+                    freelancer_profile.save()
+            except AvatarError as e:
+                messages.error(request, str(e))
+                return redirect("edit_profile")
             
         elif profile.role == "client":
-            client_profile = ClientProfile.objects.get(profile=profile)
-            
             client_profile.first_name = request.POST.get("first_name", client_profile.first_name)
             client_profile.last_name = request.POST.get("last_name", client_profile.last_name)
             client_profile.company_name = request.POST.get("company_name", client_profile.company_name)
             client_profile.phone_number = request.POST.get("phone_number", client_profile.phone_number)
             profile_picture = request.FILES.get("profile_picture")
-            if profile_picture:
-                client_profile.profile_picture = profile_picture
-            
-            client_profile.save()
+            try:
+                with staged_avatar(profile_picture) as avatar, transaction.atomic():
+                    if avatar:
+                        store_avatar(client_profile, avatar)
+                    client_profile.save()
+            except AvatarError as e:
+                messages.error(request, str(e))
+                return redirect("edit_profile")
 
         messages.success(request, "Profile updated successfully!")
         return redirect("dashboard")
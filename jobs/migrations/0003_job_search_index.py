@@ -0,0 +1,90 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS jobs_job_fts USING fts5(
+        title, description, category, tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jobs_job_fts_insert AFTER INSERT ON jobs_job BEGIN
+        INSERT INTO jobs_job_fts(rowid, title, description, category)
+        VALUES (new.id, new.title, new.description, replace(new.category, '_', ' '));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jobs_job_fts_update
+    AFTER UPDATE OF title, description, category ON jobs_job BEGIN
+        DELETE FROM jobs_job_fts WHERE rowid = old.id;
+        INSERT INTO jobs_job_fts(rowid, title, description, category)
+        VALUES (new.id, new.title, new.description, replace(new.category, '_', ' '));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS jobs_job_fts_delete AFTER DELETE ON jobs_job BEGIN
+        DELETE FROM jobs_job_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO jobs_job_fts(rowid, title, description, category)
+    SELECT id, title, description, replace(category, '_', ' ') FROM jobs_job
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS jobs_job_fts_insert",
+    "DROP TRIGGER IF EXISTS jobs_job_fts_update",
+    "DROP TRIGGER IF EXISTS jobs_job_fts_delete",
+    "DROP TABLE IF EXISTS jobs_job_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE jobs_job ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('english', replace(category, '_', ' ')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX jobs_job_search_vector_idx ON jobs_job USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS jobs_job_search_vector_idx",
+    "ALTER TABLE jobs_job DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        connection = schema_editor.connection
+        statements = statements_by_vendor.get(connection.vendor)
+        if not statements:
+            return
+        if connection.vendor == 'sqlite' and not _sqlite_has_fts5(connection):
+            # jobs.search falls back to substring matching without FTS5
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_alter_job_status_worksubmission_workfile'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:27
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_job_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='job',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_job_ordering_tiebreak'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['job', 'status'], name='jobs_app_job_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'created_at'], name='jobs_job_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['client', 'status', 'created_at'], name='jobs_job_client_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['freelancer', 'status', 'created_at'], name='jobs_job_freelancer_status_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:47
+
+import uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_application_jobs_app_job_status_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='workfile',
+            name='file',
+            field=models.FileField(storage=uploads.storage.BlobStorage(), upload_to='work_submissions/%Y/%m/%d/'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0006_alter_workfile_file'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workfile',
+            index=models.Index(fields=['file'], name='jobs_workfile_file_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_workfile_jobs_workfile_file_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workfile',
+            name='preview',
+            field=models.FileField(blank=True, editable=False, max_length=255, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='workfile',
+            name='preview_status',
+            field=models.CharField(choices=[('none', 'No preview'), ('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='workfile',
+            name='thumbnail',
+            field=models.FileField(blank=True, editable=False, max_length=255, upload_to=''),
+        ),
+        migrations.AddIndex(
+            model_name='workfile',
+            index=models.Index(fields=['preview_status'], name='jobs_workfile_preview_idx'),
+        ),
+    ]
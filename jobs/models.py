@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from uploads.previews import PREVIEW_STATUS_CHOICES, initial_preview_status
+from uploads.storage import blob_storage
 import os
 
 class Job(models.Model):
@@ -27,8 +29,12 @@ class Job(models.Model):
     budget = models.DecimalField(max_digits=10, decimal_places=2)
     deadline = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
-    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posted_jobs')
-    freelancer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_jobs')
+    # Indexed by the (client|freelancer, status, created_at) indexes below,
+    # which also serve plain lookups of a user's jobs
+    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posted_jobs', db_index=False)
+    freelancer = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_jobs', db_index=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -36,7 +42,14 @@ class Job(models.Model):
         return self.title
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Job board: status filter plus (created_at, id) keyset ordering
+            models.Index(fields=['status', 'created_at'], name='jobs_job_status_created_idx'),
+            # My jobs / dashboards: a user's jobs in a given status, newest first
+            models.Index(fields=['client', 'status', 'created_at'], name='jobs_job_client_status_idx'),
+            models.Index(fields=['freelancer', 'status', 'created_at'], name='jobs_job_freelancer_status_idx'),
+        ]
 
 class Application(models.Model):
     STATUS_CHOICES = [
@@ -59,6 +72,9 @@ class Application(models.Model):
     class Meta:
         unique_together = ['job', 'freelancer']
         ordering = ['-applied_at']
+        indexes = [
+            models.Index(fields=['job', 'status'], name='jobs_app_job_status_idx'),
+        ]
 
 class WorkSubmission(models.Model):
     STATUS_CHOICES = [
@@ -94,14 +110,24 @@ class WorkSubmission(models.Model):
 
 class WorkFile(models.Model):
     work_submission = models.ForeignKey(WorkSubmission, on_delete=models.CASCADE, related_name='work_files')
-    file = models.FileField(upload_to='work_submissions/%Y/%m/%d/')
+    # Stored once per distinct content; the user's file name is original_name
+    file = models.FileField(upload_to='work_submissions/%Y/%m/%d/', storage=blob_storage)
     original_name = models.CharField(max_length=255)
     file_size = models.PositiveIntegerField(help_text="File size in bytes")
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Image variants rendered by uploads.previews (generate_previews command)
+    preview_status = models.CharField(max_length=10, choices=PREVIEW_STATUS_CHOICES, default='none')
+    thumbnail = models.FileField(max_length=255, blank=True, editable=False)
+    preview = models.FileField(max_length=255, blank=True, editable=False)
     
     def __str__(self):
         return f"{self.original_name} - {self.work_submission.job.title}"
     
+    def save(self, *args, **kwargs):
+        if self.file and not self.file._committed:
+            self.preview_status = initial_preview_status(self.original_name)
+        super().save(*args, **kwargs)
+    
     def get_file_extension(self):
         """Get file extension"""
         return os.path.splitext(self.original_name)[1].lower()
@@ -155,4 +181,10 @@ class WorkFile(models.Model):
             return 'fa-file text-muted'
     
     class Meta:
-        ordering = ['-uploaded_at']
\ No newline at end of file
+        ordering = ['-uploaded_at']
+        indexes = [
+            # Media serving: find the rows that reference a stored file
+            models.Index(fields=['file'], name='jobs_workfile_file_idx'),
+            # generate_previews: the pending queue
+            models.Index(fields=['preview_status'], name='jobs_workfile_preview_idx'),
+        ]
\ No newline at end of file
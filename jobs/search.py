@@ -0,0 +1,141 @@
+"""
+Full-text search over open jobs.
+
+The index itself lives in the database and is created by migration 0003:
+SQLite gets an FTS5 table (``jobs_job_fts``) kept in sync with ``jobs_job``
+by triggers, PostgreSQL gets a generated ``search_vector`` column with a GIN
+index. Saving or deleting a Job therefore updates the index in the same
+statement, including queryset ``update()``/``delete()`` calls that bypass
+model signals.
+
+``search_jobs`` returns an object that can be handed straight to Django's
+``Paginator`` so only the requested page is ever loaded.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Job
+
+FTS_TABLE = 'jobs_job_fts'
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_fts_available = {}
+
+
+def _has_fts_table():
+    """Check (once per database alias) whether the FTS5 table exists"""
+    alias = connection.alias
+    if alias not in _fts_available:
+        _fts_available[alias] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available[alias]
+
+
+def _fts_match_expression(query):
+    """Turn free text into a safe FTS5 MATCH expression with prefix matching"""
+    terms = _WORD_RE.findall(query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _open_jobs(category=None):
+    jobs = Job.objects.filter(status='open').select_related('client')
+    if category:
+        jobs = jobs.filter(category=category)
+    return jobs
+
+
+class RankedJobResults:
+    """
+    Lazily evaluated, rank-ordered FTS5 results.
+
+    Implements ``count()`` and slicing so ``Paginator`` can fetch a single
+    page with LIMIT/OFFSET and a separate COUNT query.
+    """
+
+    def __init__(self, match, category=None):
+        self.match = match
+        self.category = category
+        self._count = None
+
+    def _where(self):
+        sql = f"{FTS_TABLE} MATCH %s AND j.status = 'open'"
+        params = [self.match]
+        if self.category:
+            sql += " AND j.category = %s"
+            params.append(self.category)
+        return sql, params
+
+    def count(self):
+        if self._count is None:
+            where, params = self._where()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {FTS_TABLE} "
+                    f"JOIN jobs_job j ON j.id = {FTS_TABLE}.rowid WHERE {where}",
+                    params,
+                )
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+
+        start = key.start or 0
+        limit = -1 if key.stop is None else max(key.stop - start, 0)
+        where, params = self._where()
+        with connection.cursor() as cursor:
+            # bm25 weights: title matches count most, then description, then category
+            cursor.execute(
+                f"SELECT {FTS_TABLE}.rowid, bm25({FTS_TABLE}, 10.0, 4.0, 1.0) AS rank "
+                f"FROM {FTS_TABLE} JOIN jobs_job j ON j.id = {FTS_TABLE}.rowid "
+                f"WHERE {where} ORDER BY rank, j.created_at DESC LIMIT %s OFFSET %s",
+                params + [limit, start],
+            )
+            ranked = cursor.fetchall()
+
+        jobs = Job.objects.select_related('client').in_bulk([job_id for job_id, _ in ranked])
+        results = []
+        for job_id, rank in ranked:
+            job = jobs.get(job_id)
+            if job is not None:
+                # bm25() is "lower is better"; expose "higher is better" like ts_rank
+                job.search_rank = -rank
+                results.append(job)
+        return results
+
+
+def search_jobs(query, category=None):
+    """
+    Search open jobs by title, description and category.
+
+    Returns a queryset (or queryset-like object) ordered by relevance when a
+    query is given, and by newest first otherwise.
+    """
+    query = (query or '').strip()
+    if not query:
+        return _open_jobs(category)
+
+    if connection.vendor == 'sqlite' and _has_fts_table():
+        match = _fts_match_expression(query)
+        if not match:
+            return _open_jobs(category)
+        return RankedJobResults(match, category)
+
+    if connection.vendor == 'postgresql':
+        tsquery = "websearch_to_tsquery('english', %s)"
+        return _open_jobs(category).filter(
+            RawSQL(f"jobs_job.search_vector @@ {tsquery}", [query], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f"ts_rank_cd(jobs_job.search_vector, {tsquery})", [query], output_field=FloatField())
+        ).order_by('-search_rank', '-created_at')
+
+    # No index available: plain substring matching
+    return _open_jobs(category).filter(
+        Q(title__icontains=query) | Q(description__icontains=query) | Q(category__icontains=query)
+    )
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from jobs.models import Application, Job
+from payments.models import Payment
+from workhub.cache import OPEN_JOBS, invalidate, job_namespace
+
+
+@receiver([post_save, post_delete], sender=Job)
+def invalidate_job_cache(sender, instance, **kwargs):
+    invalidate(job_namespace(instance.pk), OPEN_JOBS)
+
+
+@receiver([post_save, post_delete], sender=Application)
+def invalidate_job_applicants(sender, instance, **kwargs):
+    """The cached job detail knows who has applied"""
+    invalidate(job_namespace(instance.job_id))
+
+
+@receiver([post_save, post_delete], sender=Payment)
+def invalidate_job_payments(sender, instance, **kwargs):
+    """Escrow and payouts move a job along; keep its cached entries in step"""
+    if instance.job_id:
+        invalidate(job_namespace(instance.job_id))
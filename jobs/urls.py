@@ -3,6 +3,8 @@ from . import views
 
 urlpatterns = [
     path('jobs/', views.job_list, name='job_list'),
+    path('jobs/search/', views.job_search, name='job_search'),
+    path('api/jobs/', views.job_feed, name='job_feed'),
     path('post/', views.post_job, name='post_job'),
     path('job/<int:job_id>/', views.get_job_detail, name='job_detail'),
     path('apply/<int:job_id>/', views.apply_job, name='apply_job'),
@@ -10,5 +12,7 @@ urlpatterns = [
     path('update-application-status/', views.update_application_status, name='update_application_status'),
     path('submit-work/', views.submit_work, name='submit_work'),
     path('view-work-submission/<int:job_id>/', views.view_work_submission, name='view_work_submission'),
+    path('view-work-submission/<int:job_id>/download/', views.download_work_submission, name='download_work_submission'),
     path('my-jobs/', views.my_jobs, name='my_jobs'),
+    path('my-jobs/<slug:tab>/', views.my_jobs_tab, name='my_jobs_tab'),
 ]
\ No newline at end of file
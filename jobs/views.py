@@ -1,22 +1,171 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.contrib import messages
 from .models import Job, Application, WorkSubmission, WorkFile
-from payments.models import Wallet, Payment, Transaction
+from payments.models import Payment
+from payments.wallet import InsufficientFunds, credit, debit, settle_payment
 from reviews.models import Review
 from django.db import transaction
+from django.db.models import Count, Q
 from django.utils import timezone
 from django.core.files.storage import default_storage
 from django.conf import settings
+from django.core.paginator import Paginator
+from .search import search_jobs
+from workhub.cache import OPEN_JOBS, cached, etag_generation, job_namespace
+from workhub.conditional import revalidate, user_etag
+from workhub.pagination import InvalidCursor, keyset_paginate
+from workhub.replicas import replica_reads
+from workhub.storage import discard_files, stage_files
+from workhub.zipstream import stream_zip, unique_names
+from uploads.models import UploadError, claim_uploads
+from uploads.previews import initial_preview_status
+from urllib.parse import urlencode
 import json
 import os
 from django.core.serializers import serialize
 
+JOBS_PER_PAGE = 20
+JOB_FEED_MAX_LIMIT = 100
+
+# Fields the JSON feed can return, mapped to the model fields they read
+JOB_FEED_FIELDS = {
+    'id': ('id',),
+    'title': ('title',),
+    'description': ('description',),
+    'category': ('category',),
+    'budget': ('budget',),
+    'deadline': ('deadline',),
+    'status': ('status',),
+    'client': ('client__username',),
+    'created_at': ('created_at',),
+}
+
+def _serialize_job_field(job, field):
+    if field == 'category':
+        return job.get_category_display()
+    if field == 'budget':
+        return str(job.budget)
+    if field == 'deadline':
+        return job.deadline.strftime('%Y-%m-%d')
+    if field == 'client':
+        return job.client.username
+    if field == 'created_at':
+        return job.created_at.isoformat()
+    return getattr(job, field)
+
+def _open_jobs_page(category, cursor):
+    """``(jobs, next_cursor, total)`` of a job board page, cached until a job changes"""
+    def compute():
+        open_jobs = search_jobs('', category=category)
+        try:
+            jobs, next_cursor = keyset_paginate(open_jobs, cursor, JOBS_PER_PAGE)
+        except InvalidCursor:
+            jobs, next_cursor = keyset_paginate(open_jobs, None, JOBS_PER_PAGE)
+        return jobs, next_cursor, open_jobs.count() if category else None
+
+    return cached(OPEN_JOBS, ('page', category, cursor or ''), compute)
+
+@replica_reads
 def job_list(request):
+    """
+    Job board. Browsing pages through open jobs with a (created_at, id)
+    cursor; with ?q= it shows only the matching page of search results.
+    """
+    query = request.GET.get('q', '').strip()
+    category = request.GET.get('category', '')
+    total = None
+
+    if query:
+        page_obj = Paginator(search_jobs(query, category=category), JOBS_PER_PAGE).get_page(request.GET.get('page'))
+        jobs = page_obj
+        total = page_obj.paginator.count
+        next_params = {'q': query, 'category': category, 'page': page_obj.next_page_number()} if page_obj.has_next() else None
+    else:
+        jobs, next_cursor, total = _open_jobs_page(category, request.GET.get('cursor'))
+        next_params = {'category': category, 'cursor': next_cursor} if next_cursor else None
+
+    context = {
+        'jobs': jobs,
+        'total': total,
+        'next_query': urlencode(next_params) if next_params else '',
+        'query': query,
+        'category': category,
+    }
+
+    # Search-as-you-type and "load more" ask for just the result cards
+    if request.GET.get('partial'):
+        return render(request, 'jobs/job_cards.html', context)
+    return render(request, 'jobs/job_list.html', context)
+
+@replica_reads
+def job_feed(request):
+    """
+    JSON feed of open jobs, newest first, paginated with an opaque cursor.
+    ?fields=id,title,budget limits both the payload and the columns loaded.
+    """
+    requested = request.GET.get('fields')
+    fields = [f for f in requested.split(',') if f in JOB_FEED_FIELDS] if requested else list(JOB_FEED_FIELDS)
+    if not fields:
+        return JsonResponse({'error': f"Unknown fields. Choose from: {', '.join(JOB_FEED_FIELDS)}"}, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', JOBS_PER_PAGE)), 1), JOB_FEED_MAX_LIMIT)
+    except ValueError:
+        limit = JOBS_PER_PAGE
+
+    columns = {'id', 'created_at'}
+    for field in fields:
+        columns.update(JOB_FEED_FIELDS[field])
+
     jobs = Job.objects.filter(status='open')
-    return render(request, 'jobs/job_list.html', {'jobs': jobs})
+    if request.GET.get('category'):
+        jobs = jobs.filter(category=request.GET['category'])
+    if 'client' in fields:
+        jobs = jobs.select_related('client')
+    jobs = jobs.only(*columns)
+
+    try:
+        page, next_cursor = keyset_paginate(jobs, request.GET.get('cursor'), limit)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'results': [{field: _serialize_job_field(job, field) for field in fields} for job in page],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+    })
+
+@replica_reads
+def job_search(request):
+    """AJAX endpoint for ranked, paginated job search"""
+    query = request.GET.get('q', '').strip()
+    category = request.GET.get('category', '')
+    results = search_jobs(query, category=category)
+    page_obj = Paginator(results, JOBS_PER_PAGE).get_page(request.GET.get('page'))
+
+    return JsonResponse({
+        'query': query,
+        'total': page_obj.paginator.count,
+        'page': page_obj.number,
+        'num_pages': page_obj.paginator.num_pages,
+        'has_next': page_obj.has_next(),
+        'results': [
+            {
+                'id': job.id,
+                'title': job.title,
+                'description': job.description,
+                'category': job.get_category_display(),
+                'budget': str(job.budget),
+                'deadline': job.deadline.strftime('%Y-%m-%d'),
+                'client': job.client.username,
+                'rank': getattr(job, 'search_rank', None),
+            }
+            for job in page_obj
+        ],
+    })
 
 @login_required
 def post_job(request):
@@ -34,27 +183,35 @@ def post_job(request):
     
     return render(request, 'jobs/post_job.html')
 
+def _job_detail_etag(request, job_id):
+    # The job's cache generation changes with the job and its applications
+    current = etag_generation(job_namespace(job_id))
+    return None if current is None else user_etag(request, 'job', job_id, current)
+
+@replica_reads
+@revalidate(etag_func=_job_detail_etag)
 def get_job_detail(request, job_id):
     """AJAX endpoint to get job details"""
-    job = get_object_or_404(Job, id=job_id)
-    
-    # Check if user has already applied
-    has_applied = False
-    if request.user.is_authenticated:
-        has_applied = Application.objects.filter(job=job, freelancer=request.user).exists()
-    
-    job_data = {
-        'id': job.id,
-        'title': job.title,
-        'description': job.description,
-        'category': job.get_category_display(),
-        'budget': str(job.budget),
-        'deadline': job.deadline.strftime('%Y-%m-%d'),
-        'client': job.client.username,
-        'created_at': job.created_at.strftime('%B %d, %Y'),
-        'has_applied': has_applied,
-        'is_owner': request.user.is_authenticated and job.client == request.user
-    }
+    def compute():
+        job = get_object_or_404(Job.objects.select_related('client'), id=job_id)
+        return {
+            'id': job.id,
+            'title': job.title,
+            'description': job.description,
+            'category': job.get_category_display(),
+            'budget': str(job.budget),
+            'deadline': job.deadline.strftime('%Y-%m-%d'),
+            'client': job.client.username,
+            'client_id': job.client_id,
+            'created_at': job.created_at.strftime('%B %d, %Y'),
+            'applicant_ids': set(job.applications.values_list('freelancer_id', flat=True)),
+        }
+
+    # Shared by every visitor; invalidated when the job or its applications change
+    detail = cached(job_namespace(job_id), ('detail',), compute)
+    job_data = {key: value for key, value in detail.items() if key not in ('client_id', 'applicant_ids')}
+    job_data['has_applied'] = request.user.is_authenticated and request.user.id in detail['applicant_ids']
+    job_data['is_owner'] = request.user.is_authenticated and detail['client_id'] == request.user.id
     
     return JsonResponse(job_data)
 
@@ -116,18 +273,9 @@ def update_application_status(request):
     
     if status in ['accepted', 'declined']:
         if status == 'accepted':
-            # Check if client has sufficient balance before accepting
             try:
-                wallet, created = Wallet.objects.get_or_create(user=request.user)
                 amount = application.proposed_budget
                 
-                if not wallet.can_withdraw(amount):
-                    return JsonResponse({
-                        'success': False, 
-                        'error': f'Insufficient balance. You need ${amount} but only have ${wallet.balance}. Please top up your wallet first.',
-                        'insufficient_funds': True
-                    })
-                
                 with transaction.atomic():
                     # Update application status
                     application.status = status
@@ -139,9 +287,6 @@ def update_application_status(request):
                     application.job.save()
                     
                     # Create payment on hold
-                    if not wallet.deduct_funds(amount):
-                        return JsonResponse({'success': False, 'error': 'Failed to deduct funds'})
-                    
                     payment = Payment.objects.create(
                         job=application.job,
                         from_user=request.user,
@@ -152,24 +297,24 @@ def update_application_status(request):
                         description=f'Payment for job: {application.job.title}'
                     )
                     
-                    # Create transaction record for client (debit)
-                    Transaction.objects.create(
-                        wallet=wallet,
-                        payment=payment,
-                        amount=amount,
-                        transaction_type='debit',
-                        description=f'Payment on hold for job: {application.job.title}',
-                        balance_after=wallet.balance
-                    )
+                    # Deduct from client's wallet, with its transaction record;
+                    # rolls all of the above back if the balance doesn't cover it
+                    debit(request.user, amount, f'Payment on hold for job: {application.job.title}', payment=payment)
                     
                     # Decline other applications for this job
-                    Application.objects.filter(job=application.job).exclude(id=application_id).update(status='declined')
+                    Application.objects.filter(job=application.job, status='pending').exclude(id=application_id).update(status='declined')
                 
                 return JsonResponse({
                     'success': True, 
                     'message': f'Application accepted and payment of ${amount} placed on hold'
                 })
                 
+            except InsufficientFunds as e:
+                return JsonResponse({
+                    'success': False, 
+                    'error': f'{e}. Please top up your wallet first.',
+                    'insufficient_funds': True
+                })
             except Exception as e:
                 return JsonResponse({'success': False, 'error': str(e)})
         else:
@@ -183,7 +328,12 @@ def update_application_status(request):
 @login_required
 @require_POST
 def submit_work(request):
-    """Handle work submission with files, description, and automatic payment release"""
+    """
+    Handle work submission with files, description, and automatic payment release.
+
+    Files come either in the request (``work_files_{i}``) or as the ids of
+    finalized resumable uploads (``upload_ids``).
+    """
     try:
         job_id = request.POST.get('job_id')
         work_description = request.POST.get('work_description')
@@ -207,118 +357,159 @@ def submit_work(request):
         if WorkSubmission.objects.filter(job=job).exists():
             return JsonResponse({'success': False, 'error': 'Work already submitted for this job'})
         
-        with transaction.atomic():
-            # Create work submission
-            work_submission = WorkSubmission.objects.create(
-                job=job,
-                freelancer=request.user,
-                description=work_description,
-                additional_notes=additional_notes,
-                status='approved'  # Automatically approved since payment was already held
-            )
-            
-            # Handle file uploads
-            uploaded_files = []
-            for i in range(file_count):
-                file_key = f'work_files_{i}'
-                if file_key in request.FILES:
-                    uploaded_file = request.FILES[file_key]
-                    
-                    # Validate file size (50MB limit)
-                    if uploaded_file.size > 50 * 1024 * 1024:
-                        return JsonResponse({
-                            'success': False, 
-                            'error': f'File {uploaded_file.name} is too large. Maximum size is 50MB.'
-                        })
-                    
-                    # Save file
-                    file_path = f'work_submissions/{job.id}/{uploaded_file.name}'
-                    saved_path = default_storage.save(file_path, uploaded_file)
-                    
-                    # Create work file record
-                    WorkFile.objects.create(
-                        work_submission=work_submission,
-                        file=saved_path,
-                        original_name=uploaded_file.name,
-                        file_size=uploaded_file.size
-                    )
-                    
-                    uploaded_files.append(uploaded_file.name)
-            
-            # Mark job as completed and release payment automatically
-            job.status = 'completed'
-            job.save()
-            
-            # Find and release payment
-            payment = Payment.objects.filter(
-                job=job, 
-                status='on_hold', 
-                to_user=job.freelancer
-            ).first()
-            
-            if payment:
-                # Create or get freelancer's wallet
-                freelancer_wallet, created = Wallet.objects.get_or_create(user=job.freelancer)
-                
-                # Add funds to freelancer's wallet
-                freelancer_wallet.add_funds(payment.amount)
+        # Validate every file before anything is written
+        uploads = []
+        for i in range(file_count):
+            file_key = f'work_files_{i}'
+            if file_key in request.FILES:
+                uploaded_file = request.FILES[file_key]
                 
-                # Update payment status
-                payment.status = 'completed'
-                payment.completed_at = timezone.now()
-                payment.save()
-                
-                # Create transaction record for freelancer (credit)
-                Transaction.objects.create(
-                    wallet=freelancer_wallet,
-                    payment=payment,
-                    amount=payment.amount,
-                    transaction_type='credit',
-                    description=f'Payment received for job: {job.title}',
-                    balance_after=freelancer_wallet.balance
+                # Validate file size (50MB limit)
+                if uploaded_file.size > 50 * 1024 * 1024:
+                    return JsonResponse({
+                        'success': False, 
+                        'error': f'File {uploaded_file.name} is too large. Maximum size is 50MB.'
+                    })
+                uploads.append(uploaded_file)
+        
+        # Files sent earlier through the resumable upload API; their size was
+        # checked when the upload session was created
+        try:
+            uploads += claim_uploads(request.user, request.POST.getlist('upload_ids'))
+        except UploadError as e:
+            return JsonResponse({'success': False, 'error': str(e)})
+        
+        # Write the files to storage before taking the database write lock
+        storage = WorkFile._meta.get_field('file').storage
+        staged_paths = stage_files(
+            ((f'work_submissions/{job.id}/{uploaded_file.name}', uploaded_file) for uploaded_file in uploads),
+            storage=storage,
+        )
+        
+        try:
+            with transaction.atomic():
+                response = _record_work_submission(
+                    request, job, work_description, additional_notes, list(zip(uploads, staged_paths))
                 )
-            
-            return JsonResponse({
-                'success': True,
-                'message': f'Work submitted successfully! Payment of ${payment.amount if payment else job.budget} has been released to your account. Uploaded {len(uploaded_files)} files.',
-                'files': uploaded_files,
-                'payment_released': payment.amount if payment else job.budget
-            })
+        except Exception:
+            discard_files(staged_paths, storage=storage)
+            raise
+        return response
             
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
+
+
+def _record_work_submission(request, job, work_description, additional_notes, files):
+    """Create the submission and file rows for already-stored files, complete the job and release payment"""
+    # Create work submission
+    work_submission = WorkSubmission.objects.create(
+        job=job,
+        freelancer=request.user,
+        description=work_description,
+        additional_notes=additional_notes,
+        status='approved'  # Automatically approved since payment was already held
+    )
     
-@login_required
-def my_jobs(request):
-    # Jobs posted by user (client)
-    posted_jobs = Job.objects.filter(client=request.user)
-    
-    # Jobs assigned to user (freelancer) - only in progress ones
-    assigned_jobs = Job.objects.filter(freelancer=request.user, status='in_progress')
+    WorkFile.objects.bulk_create([
+        WorkFile(
+            work_submission=work_submission,
+            file=saved_path,
+            original_name=uploaded_file.name,
+            file_size=uploaded_file.size,
+            preview_status=initial_preview_status(uploaded_file.name),
+        )
+        for uploaded_file, saved_path in files
+    ])
+    uploaded_files = [uploaded_file.name for uploaded_file, _ in files]
     
-    # Completed jobs for freelancer
-    completed_jobs = Job.objects.filter(freelancer=request.user, status='completed')
+    # Mark job as completed and release payment automatically
+    job.status = 'completed'
+    job.save()
     
-    # Jobs with submitted work (for client review)
-    jobs_under_review = Job.objects.filter(
-        client=request.user, 
-        status__in=['under_review', 'completed']
-    ).filter(work_submission__isnull=False)
+    # Find and release payment
+    payment = Payment.objects.filter(
+        job=job, 
+        status='on_hold', 
+        to_user=job.freelancer
+    ).first()
     
-    # Calculate counts for client
-    pending_jobs = posted_jobs.filter(status__in=['open', 'in_progress', 'under_review'])
-    completed_client_jobs = posted_jobs.filter(status='completed')
+    # Update payment status, unless another request released it first,
+    # and add the funds to the freelancer's wallet (credit)
+    if payment and settle_payment(payment, 'completed'):
+        credit(job.freelancer, payment.amount, f'Payment received for job: {job.title}', payment=payment)
     
+    return JsonResponse({
+        'success': True,
+        'message': f'Work submitted successfully! Payment of ${payment.amount if payment else job.budget} has been released to your account. Uploaded {len(uploaded_files)} files.',
+        'files': uploaded_files,
+        'payment_released': payment.amount if payment else job.budget
+    })
+
+
+PENDING_JOB_STATUSES = ['open', 'in_progress', 'under_review']
+
+# My Jobs tabs: tab id -> (whose jobs, which statuses)
+MY_JOBS_TABS = {
+    'all-jobs': ('client', None),
+    'pending-jobs': ('client', PENDING_JOB_STATUSES),
+    'completed-client': ('client', ['completed']),
+    'all-freelancer-jobs': ('freelancer', ['in_progress', 'completed']),
+    'working': ('freelancer', ['in_progress']),
+    'completed': ('freelancer', ['completed']),
+}
+
+def _my_jobs_counts(user, role):
+    """Badge counts of every My Jobs tab for ``role``, in one conditional aggregate"""
+    if role == 'client':
+        return Job.objects.filter(client=user).aggregate(
+            posted=Count('id'),
+            pending=Count('id', filter=Q(status__in=PENDING_JOB_STATUSES)),
+            completed_client=Count('id', filter=Q(status='completed')),
+        )
+    return Job.objects.filter(
+        freelancer=user, status__in=['in_progress', 'completed']
+    ).aggregate(
+        all_freelancer=Count('id'),
+        working=Count('id', filter=Q(status='in_progress')),
+        completed=Count('id', filter=Q(status='completed')),
+    )
+
+def _my_jobs_tab_jobs(user, tab):
+    """The jobs listed on a My Jobs tab, with what their cards show"""
+    owner, statuses = MY_JOBS_TABS[tab]
+    jobs = Job.objects.filter(**{owner: user})
+    if statuses:
+        jobs = jobs.filter(status__in=statuses)
+    return jobs.select_related('client', 'freelancer', 'work_submission').annotate(
+        application_count=Count('applications', distinct=True),
+        files_count=Count('work_submission__work_files', distinct=True),
+    )
+
+@login_required
+def my_jobs(request):
+    """Tab badges come from one conditional aggregate; tab contents load on demand"""
+    counts = _my_jobs_counts(request.user, request.workhub_user.role)
+    return render(request, 'jobs/my_jobs.html', {'counts': counts})
+
+@login_required
+def my_jobs_tab(request, tab):
+    """One cursor-paginated page of cards for a My Jobs tab"""
+    if tab not in MY_JOBS_TABS:
+        raise Http404('Unknown tab')
+
+    jobs = _my_jobs_tab_jobs(request.user, tab)
+    try:
+        page, next_cursor = keyset_paginate(jobs, request.GET.get('cursor'), JOBS_PER_PAGE)
+    except InvalidCursor:
+        raise Http404('Invalid cursor')
+
     context = {
-        'posted_jobs': posted_jobs,
-        'assigned_jobs': assigned_jobs,
-        'completed_jobs': completed_jobs,
-        'jobs_under_review': jobs_under_review,
-        'pending_jobs': pending_jobs,
-        'completed_client_jobs': completed_client_jobs,
+        'tab': tab,
+        'jobs': page,
+        'next_cursor': next_cursor,
     }
-    
-    return render(request, 'jobs/my_jobs.html', context)
+    return render(request, 'jobs/my_jobs_tab.html', context)
 
 @login_required
 def view_work_submission(request, job_id):
@@ -348,4 +539,37 @@ def view_work_submission(request, job_id):
         
     except WorkSubmission.DoesNotExist:
         messages.error(request, 'No work submission found for this job.')
-        return redirect('my_jobs')
\ No newline at end of file
+        return redirect('my_jobs')
+
+
+@login_required
+def download_work_submission(request, job_id):
+    """Stream all of a submission's files as one ZIP, built while the files are read"""
+    job = get_object_or_404(Job, id=job_id)
+    
+    # Check authorization
+    if request.user != job.client and request.user != job.freelancer:
+        messages.error(request, 'You are not authorized to view this submission.')
+        return redirect('my_jobs')
+    
+    work_submission = WorkSubmission.objects.filter(job=job).first()
+    if work_submission is None:
+        messages.error(request, 'No work submission found for this job.')
+        return redirect('my_jobs')
+    
+    work_files = list(work_submission.work_files.order_by('id'))
+    names = unique_names(work_file.original_name for work_file in work_files)
+    entries = (
+        (
+            name,
+            work_file.file,
+            work_file.file_size,
+            # Already compressed formats are stored as is
+            not (work_file.is_archive() or work_file.is_video() or work_file.is_image()),
+        )
+        for name, work_file in zip(names, work_files)
+    )
+    
+    response = StreamingHttpResponse(stream_zip(entries), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="work-submission-{job.id}.zip"'
+    return response
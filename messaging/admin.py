@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Conversation, Message, MessageNotification
+from .models import Conversation, ConversationParticipant, Message, MessageNotification
+
+
+class ConversationParticipantInline(admin.TabularInline):
+    model = ConversationParticipant
+    extra = 0
 
 
 @admin.register(Conversation)
@@ -7,7 +12,8 @@ class ConversationAdmin(admin.ModelAdmin):
     list_display = ('id', 'subject', 'get_participants', 'created_at', 'updated_at')
     search_fields = ('subject', 'participants__username')
     list_filter = ('created_at', 'updated_at')
-    filter_horizontal = ('participants', 'deleted_by')
+    filter_horizontal = ('deleted_by',)
+    inlines = [ConversationParticipantInline]
     ordering = ('-updated_at',)
 
     def get_participants(self, obj):
@@ -17,9 +23,9 @@ class ConversationAdmin(admin.ModelAdmin):
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
-    list_display = ('id', 'conversation', 'sender', 'short_content', 'is_read', 'created_at')
+    list_display = ('id', 'conversation', 'sender', 'short_content', 'created_at')
     search_fields = ('sender__username', 'conversation__subject', 'content')
-    list_filter = ('is_read', 'created_at')
+    list_filter = ('created_at',)
     ordering = ('-created_at',)
 
     def short_content(self, obj):
@@ -29,7 +35,7 @@ class MessageAdmin(admin.ModelAdmin):
 
 @admin.register(MessageNotification)
 class MessageNotificationAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'message', 'is_read', 'created_at')
+    list_display = ('id', 'user', 'message', 'created_at')
     search_fields = ('user__username', 'message__content')
-    list_filter = ('is_read', 'created_at')
+    list_filter = ('created_at',)
     ordering = ('-created_at',)
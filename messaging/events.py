@@ -0,0 +1,138 @@
+"""
+Unread-count change notifications for the server-sent events stream.
+
+Views and signal handlers call ``notify_unread_changed(user_id)`` whenever
+something that affects a user's unread count changes; the SSE view
+subscribes to that user's channel and recomputes the count only when told
+to, instead of every open tab polling the database.
+
+The broker is pluggable through ``MESSAGING_EVENTS_BROKER`` (a dotted path
+to a ``Broker`` subclass). The default ``InProcessBroker`` only reaches
+streams served by the same process; a multi-process deployment needs a
+broker backed by something shared, e.g. Redis pub/sub.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from workhub.cache import invalidate, unread_namespace
+
+
+def unread_channel(user_id):
+    return f'unread:{user_id}'
+
+
+class Broker:
+    """Publish/subscribe interface used by the messaging event stream"""
+
+    def publish(self, channel, message):
+        """Deliver ``message`` to every current subscriber of ``channel``"""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Return a ``Subscription`` for ``channel``"""
+        raise NotImplementedError
+
+
+class Subscription:
+    """An async source of messages for one channel; close it when done"""
+
+    async def get(self, timeout=None):
+        """Wait for the next message; raise ``asyncio.TimeoutError`` after ``timeout`` seconds"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InProcessSubscription(Subscription):
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=100)
+
+    def deliver(self, message):
+        # Called from any thread; hand the message over to our event loop
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        if self.queue.full():
+            # A slow consumer only needs to know that *something* changed
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class InProcessBroker(Broker):
+    """Fan messages out to subscribers living in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.deliver(message)
+            except RuntimeError:
+                # Event loop already closed; the stream is gone
+                subscription.close()
+
+    def subscribe(self, channel):
+        subscription = InProcessSubscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'MESSAGING_EVENTS_BROKER', 'messaging.events.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def notify_unread_changed(*user_ids):
+    """
+    Tell the users' open streams to refresh, and change their unread
+    version, once the current transaction commits
+    """
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return
+
+    def publish():
+        broker = get_broker()
+        for user_id in user_ids:
+            broker.publish(unread_channel(user_id), 'changed')
+
+    transaction.on_commit(publish)
+    # New version for the unread_count endpoint's ETag
+    invalidate(*(unread_namespace(user_id) for user_id in user_ids))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_conversation_deleted_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'is_read', 'sender'], name='messaging_msg_conv_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='messagenotification',
+            index=models.Index(fields=['user', 'is_read'], name='messaging_notif_user_read_idx'),
+        ),
+    ]
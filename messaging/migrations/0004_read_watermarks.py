@@ -0,0 +1,96 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, Min, Q
+
+
+def watermarks_from_is_read(apps, schema_editor):
+    """
+    Set each participant's watermark just below the oldest message from
+    someone else they have not read, or to the newest message if they have
+    read everything.
+    """
+    Message = apps.get_model('messaging', 'Message')
+    ConversationParticipant = apps.get_model('messaging', 'ConversationParticipant')
+
+    per_sender = {}
+    rows = Message.objects.order_by().values('conversation_id', 'sender_id').annotate(
+        oldest_unread=Min('id', filter=Q(is_read=False)),
+        newest=Max('id'),
+    )
+    for row in rows:
+        per_sender.setdefault(row['conversation_id'], []).append(row)
+
+    memberships = list(ConversationParticipant.objects.all())
+    for membership in memberships:
+        senders = per_sender.get(membership.conversation_id, [])
+        unread = [
+            row['oldest_unread'] for row in senders
+            if row['sender_id'] != membership.user_id and row['oldest_unread'] is not None
+        ]
+        if unread:
+            membership.last_read_message_id = min(unread) - 1
+        else:
+            membership.last_read_message_id = max((row['newest'] for row in senders), default=0)
+    ConversationParticipant.objects.bulk_update(memberships, ['last_read_message_id'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_message_messaging_msg_conv_read_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Turn the implicit participants table into an explicit through model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ConversationParticipant',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='messaging.conversation')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_memberships', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'messaging_conversation_participants',
+                        'unique_together': {('conversation', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='conversation',
+                    name='participants',
+                    field=models.ManyToManyField(related_name='conversations', through='messaging.ConversationParticipant', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(watermarks_from_is_read, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='messaging_msg_conv_read_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='messagenotification',
+            name='messaging_notif_user_read_idx',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='messagenotification',
+            name='is_read',
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'id'], name='messaging_msg_conv_id_idx'),
+        ),
+    ]
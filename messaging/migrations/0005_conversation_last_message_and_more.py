@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:37
+
+import os
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_last_message(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    Message = apps.get_model('messaging', 'Message')
+
+    newest_ids = Message.objects.order_by().values('conversation').annotate(newest=Max('id')).values_list('newest', flat=True)
+    for message in Message.objects.filter(id__in=list(newest_ids)).iterator():
+        preview = ' '.join((message.content or '').split())
+        if not preview and message.attachment:
+            preview = f"Attachment: {os.path.basename(message.attachment.name)}"
+        if len(preview) > 120:
+            preview = preview[:117].rstrip() + '...'
+        # update() leaves updated_at (auto_now) untouched
+        Conversation.objects.filter(pk=message.conversation_id).update(
+            last_message=message,
+            last_message_sender_id=message.sender_id,
+            last_message_preview=preview,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_read_watermarks'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:47
+
+import os
+
+import uploads.storage
+from django.db import migrations, models
+
+
+def backfill_attachment_name(apps, schema_editor):
+    Message = apps.get_model('messaging', 'Message')
+    messages = []
+    for message in Message.objects.exclude(attachment='').exclude(attachment=None).only('id', 'attachment'):
+        message.attachment_name = os.path.basename(message.attachment.name)
+        messages.append(message)
+    Message.objects.bulk_update(messages, ['attachment_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0005_conversation_last_message_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='attachment_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, storage=uploads.storage.BlobStorage(), upload_to='message_attachments/'),
+        ),
+        migrations.RunPython(backfill_attachment_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0006_message_attachment_name_alter_message_attachment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['attachment'], name='messaging_msg_attachment_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0007_message_messaging_msg_attachment_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='preview',
+            field=models.FileField(blank=True, editable=False, max_length=255, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='preview_status',
+            field=models.CharField(choices=[('none', 'No preview'), ('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='thumbnail',
+            field=models.FileField(blank=True, editable=False, max_length=255, upload_to=''),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['preview_status'], name='messaging_msg_preview_idx'),
+        ),
+    ]
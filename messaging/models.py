@@ -1,14 +1,40 @@
 from django.db import models
+from django.db.models import F, Subquery
 from django.contrib.auth.models import User
 from django.utils import timezone
 import os
 
+from uploads.previews import PREVIEW_STATUS_CHOICES, initial_preview_status
+from uploads.storage import blob_storage
+from workhub.replicas import note_write
+
+from .events import notify_unread_changed
+
+PREVIEW_LENGTH = 120
+
+
+def unread_message_count(user):
+    """Messages from others past the user's read watermarks, ignoring deleted conversations"""
+    return Message.objects.filter(
+        conversation__memberships__user=user,
+        id__gt=F('conversation__memberships__last_read_message_id'),
+    ).exclude(
+        sender=user
+    ).exclude(
+        conversation__deleted_by=user
+    ).count()
+
+
 class Conversation(models.Model):
-    participants = models.ManyToManyField(User, related_name='conversations')
+    participants = models.ManyToManyField(User, through='ConversationParticipant', related_name='conversations')
     subject = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     deleted_by = models.ManyToManyField(User, related_name='deleted_conversations', blank=True)
+    # Denormalized summary of the newest message, maintained by record_message()
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True)
     
     class Meta:
         ordering = ['-updated_at']
@@ -18,55 +44,124 @@ class Conversation(models.Model):
     
     def get_last_message(self):
         return self.messages.first()
+
+    def record_message(self, message):
+        """Point the conversation summary at a newly sent message"""
+        self.last_message = message
+        self.last_message_sender_id = message.sender_id
+        self.last_message_preview = message.get_preview()
+        self.updated_at = message.created_at
+        Conversation.objects.filter(pk=self.pk).update(
+            last_message=message,
+            last_message_sender_id=message.sender_id,
+            last_message_preview=self.last_message_preview,
+            updated_at=message.created_at,
+        )
     
     def get_other_participant(self, user):
         """Get the other participant in a 2-person conversation"""
         return self.participants.exclude(id=user.id).first()
     
     def mark_as_read(self, user):
-        """Mark all messages in conversation as read for a user"""
-        self.messages.filter(is_read=False).exclude(sender=user).update(is_read=True)
-        # Also mark notifications as read
-        MessageNotification.objects.filter(
-            user=user,
-            message__conversation=self,
-            is_read=False
-        ).update(is_read=True)
+        """Move the user's read watermark up to the newest message (one UPDATE)"""
+        newest = Subquery(self.messages.order_by('-id').values('id')[:1])
+        updated = ConversationParticipant.objects.filter(
+            conversation=self, user=user, last_read_message_id__lt=newest
+        ).update(last_read_message_id=newest)
+        if updated:
+            # Viewing a conversation (a GET) marks it read
+            note_write()
+            notify_unread_changed(user.id)
+
+    def last_read_message_id(self, user):
+        """The user's read watermark: every message with an id up to it has been read"""
+        return self.memberships.filter(user=user).values_list('last_read_message_id', flat=True).first() or 0
     
     def soft_delete_for_user(self, user):
         """Soft delete conversation for a specific user"""
         self.deleted_by.add(user)
+        notify_unread_changed(user.id)
+    
+    def restore_for_user(self, user):
+        """Undo soft_delete_for_user; its unread messages count again"""
+        self.deleted_by.remove(user)
+        notify_unread_changed(user.id)
     
     def is_deleted_for_user(self, user):
         """Check if conversation is deleted for a specific user"""
         return self.deleted_by.filter(id=user.id).exists()
 
 
+class ConversationParticipant(models.Model):
+    """
+    A user's membership of a conversation. ``last_read_message_id`` is a
+    watermark: messages with a higher id are unread for this user.
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversation_memberships')
+    last_read_message_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'messaging_conversation_participants'
+        unique_together = ['conversation', 'user']
+
+    def __str__(self):
+        return f"{self.user.username} in conversation {self.conversation_id}"
+
+
 class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
-    attachment = models.FileField(upload_to='message_attachments/', blank=True, null=True)
-    is_read = models.BooleanField(default=False)
+    # Stored once per distinct content; the user's file name is attachment_name
+    attachment = models.FileField(upload_to='message_attachments/', storage=blob_storage, blank=True, null=True)
+    attachment_name = models.CharField(max_length=255, blank=True)
+    # Image variants rendered by uploads.previews (generate_previews command)
+    preview_status = models.CharField(max_length=10, choices=PREVIEW_STATUS_CHOICES, default='none')
+    thumbnail = models.FileField(max_length=255, blank=True, editable=False)
+    preview = models.FileField(max_length=255, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread counts: messages past a read watermark are an id range per conversation
+            models.Index(fields=['conversation', 'id'], name='messaging_msg_conv_id_idx'),
+            # Media serving: find the messages that reference a stored file
+            models.Index(fields=['attachment'], name='messaging_msg_attachment_idx'),
+            # generate_previews: the pending queue
+            models.Index(fields=['preview_status'], name='messaging_msg_preview_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.username} at {self.created_at}"
     
+    def save(self, *args, **kwargs):
+        if self.attachment and not self.attachment._committed:
+            # Remember the uploaded name; storage names the file by its content
+            self.attachment_name = os.path.basename(self.attachment.name)
+            self.preview_status = initial_preview_status(self.attachment_name)
+        super().save(*args, **kwargs)
+    
+    def get_preview(self):
+        """Short text shown for this message in the inbox"""
+        text = ' '.join((self.content or '').split())
+        if not text and self.attachment:
+            text = f"Attachment: {self.get_attachment_name()}"
+        if len(text) > PREVIEW_LENGTH:
+            text = text[:PREVIEW_LENGTH - 3].rstrip() + '...'
+        return text
+
     def get_attachment_name(self):
         """Get just the filename without the directory path"""
         if self.attachment:
-            return os.path.basename(self.attachment.name)
+            return self.attachment_name or os.path.basename(self.attachment.name)
         return None
 
 
 class MessageNotification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='message_notifications')
     message = models.ForeignKey(Message, on_delete=models.CASCADE)
-    is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .events import notify_unread_changed
+from .models import Message, MessageNotification
+
+
+@receiver([post_save, post_delete], sender=Message)
+def message_changed(sender, instance, **kwargs):
+    """New, read or deleted messages change the other participants' unread count"""
+    recipients = instance.conversation.participants.exclude(id=instance.sender_id).values_list('id', flat=True)
+    notify_unread_changed(*recipients)
+
+
+@receiver([post_save, post_delete], sender=MessageNotification)
+def notification_changed(sender, instance, **kwargs):
+    notify_unread_changed(instance.user_id)
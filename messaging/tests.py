@@ -1,3 +1,146 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .models import Conversation, Message, unread_message_count
+
+
+class MessagingTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'password')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'password')
+        cls.conversation = Conversation.objects.create()
+        cls.conversation.participants.add(cls.alice, cls.bob)
+
+    def send(self, sender, content='Hello', conversation=None):
+        return Message.objects.create(conversation=conversation or self.conversation, sender=sender, content=content)
+
+
+class UnreadCountTests(MessagingTestCase):
+
+    def test_mark_as_read_clears_the_count(self):
+        self.send(self.alice)
+        self.send(self.alice)
+        self.send(self.bob)
+        self.assertEqual(unread_message_count(self.bob), 2)
+        self.assertEqual(unread_message_count(self.alice), 1)
+
+        self.conversation.mark_as_read(self.bob)
+
+        self.assertEqual(unread_message_count(self.bob), 0)
+        self.assertEqual(unread_message_count(self.alice), 1)
+        self.send(self.alice)
+        self.assertEqual(unread_message_count(self.bob), 1)
+
+    def test_watermark(self):
+        first, second, third = self.send(self.alice), self.send(self.alice), self.send(self.alice)
+        self.client.force_login(self.bob)
+
+        self.client.post(reverse('mark_message_read', args=[second.id]))
+        self.assertEqual(self.conversation.last_read_message_id(self.bob), second.id)
+        self.assertEqual(unread_message_count(self.bob), 1)
+
+        # Marking an older message never moves the watermark back
+        self.client.post(reverse('mark_message_read', args=[first.id]))
+        self.assertEqual(self.conversation.last_read_message_id(self.bob), second.id)
+
+        self.client.post(reverse('mark_message_read', args=[third.id]))
+        self.assertEqual(unread_message_count(self.bob), 0)
+
+    def test_own_messages_do_not_move_the_watermark(self):
+        mine = self.send(self.bob)
+        self.client.force_login(self.bob)
+        self.client.post(reverse('mark_message_read', args=[mine.id]))
+        self.assertEqual(self.conversation.last_read_message_id(self.bob), 0)
+
+    def test_deleted_conversations_are_not_counted(self):
+        self.send(self.alice)
+        self.conversation.soft_delete_for_user(self.bob)
+        self.assertEqual(unread_message_count(self.bob), 0)
+
+    def test_unread_count_api(self):
+        # A shared cache, so the view sends an ETag (see etag_generation)
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        file_cache = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+        self.send(self.alice)
+        self.client.force_login(self.bob)
+        url = reverse('unread_count')
+
+        with override_settings(CACHES=file_cache):
+            response = self.client.get(url)
+            self.assertEqual(response.json(), {'unread_count': 1})
+            etag = response['ETag']
+            self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.conversation.mark_as_read(self.bob)
+
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), {'unread_count': 0})
+
+
+class MessagesSinceTests(MessagingTestCase):
+
+    def get(self, since):
+        return self.client.get(reverse('conversation_messages_since', args=[self.conversation.id]), {'since': since})
+
+    def test_returns_newer_messages_oldest_first(self):
+        first = self.send(self.alice, 'one')
+        self.send(self.alice, 'two')
+        self.send(self.bob, 'three')
+        self.client.force_login(self.bob)
+
+        data = self.get(first.id).json()
+
+        self.assertEqual([m['content'] for m in data['messages']], ['two', 'three'])
+        self.assertEqual([m['is_mine'] for m in data['messages']], [False, True])
+        self.assertFalse(data['has_more'])
+
+    def test_moves_the_watermark(self):
+        self.send(self.alice)
+        newest = self.send(self.alice)
+        self.client.force_login(self.bob)
+
+        self.get(0)
+
+        self.assertEqual(self.conversation.last_read_message_id(self.bob), newest.id)
+        self.assertEqual(unread_message_count(self.bob), 0)
+
+    def test_has_more(self):
+        sent = [self.send(self.alice, str(i)) for i in range(3)]
+        self.client.force_login(self.bob)
+
+        with mock.patch('messaging.views.SINCE_LIMIT', 2):
+            data = self.get(0).json()
+
+        self.assertEqual([m['id'] for m in data['messages']], [sent[0].id, sent[1].id])
+        self.assertTrue(data['has_more'])
+        # Only what was returned counts as read
+        self.assertEqual(unread_message_count(self.bob), 1)
+
+    def test_invalid_since(self):
+        self.client.force_login(self.bob)
+        self.assertEqual(self.get('abc').status_code, 400)
+
+    def test_other_users_conversation(self):
+        carol = User.objects.create_user('carol', 'carol@example.com', 'password')
+        self.client.force_login(carol)
+        self.assertEqual(self.get(0).status_code, 404)
+
+
+class CursorTests(MessagingTestCase):
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        self.client.force_login(self.alice)
+        for url in [reverse('inbox'), reverse('conversation_history', args=[self.conversation.id])]:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'cursor': 'not-a-cursor'})
+                self.assertEqual(response.status_code, 400)
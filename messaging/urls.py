@@ -5,7 +5,10 @@ urlpatterns = [
     path('inbox/', views.inbox, name='inbox'),
     path('conversation/<int:conversation_id>/', views.conversation_detail, name='conversation_detail'),
     path('conversation/<int:conversation_id>/delete/', views.delete_conversation, name='delete_conversation'),
+    path('conversation/<int:conversation_id>/history/', views.conversation_history, name='conversation_history'),
+    path('api/conversation/<int:conversation_id>/messages/', views.conversation_messages_since, name='conversation_messages_since'),
     path('start-conversation/<int:user_id>/', views.start_conversation_with_user, name='start_conversation_with_user'),
     path('api/unread-count/', views.unread_count, name='unread_count'),
+    path('api/unread-count/stream/', views.unread_count_stream, name='unread_count_stream'),
     path('api/message/<int:message_id>/mark-read/', views.mark_as_read, name='mark_message_read'),
 ]
\ No newline at end of file
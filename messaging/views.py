@@ -1,29 +1,71 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import JsonResponse
-from django.db.models import Q, Count, Max
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db.models import Q, Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib import messages as django_messages
-from .models import Conversation, Message, MessageNotification
+from uploads.models import UploadError, claim_uploads
+from workhub.cache import etag_generation, unread_namespace
+from workhub.conditional import revalidate, user_etag
+from workhub.pagination import InvalidCursor, keyset_paginate
+from workhub.replicas import note_write, replica_reads
+from .events import get_broker, notify_unread_changed, unread_channel
+from .models import Conversation, ConversationParticipant, Message, MessageNotification, unread_message_count
+
+INBOX_PAGE_SIZE = 20
+MESSAGE_PAGE_SIZE = 30
+# Most messages returned by one "since" poll; the client asks again if has_more
+SINCE_LIMIT = 100
+
 
 @login_required
+@replica_reads
 def inbox(request):
-    """Display all conversations for the logged-in user"""
+    """Display the logged-in user's conversations, most recent first, a page at a time"""
+    unread = Message.objects.filter(
+        conversation=OuterRef('pk'),
+        id__gt=OuterRef('memberships__last_read_message_id'),
+    ).exclude(
+        sender=request.user
+    ).order_by().values('conversation').annotate(count=Count('id')).values('count')
+
     conversations = Conversation.objects.filter(
-        participants=request.user
+        memberships__user=request.user
     ).exclude(
         deleted_by=request.user  # Exclude conversations deleted by this user
     ).annotate(
-        unread_count=Count('messages', filter=Q(messages__is_read=False) & ~Q(messages__sender=request.user))
-    ).prefetch_related('participants', 'messages').order_by('-updated_at')  # Sort by most recent first
-    
-    # Add other_participant to each conversation for easier template access
+        unread_count=Coalesce(Subquery(unread), 0)
+    ).select_related('last_message_sender')
+
+    try:
+        conversations, next_cursor = keyset_paginate(
+            conversations, request.GET.get('cursor'), limit=INBOX_PAGE_SIZE, field='updated_at'
+        )
+    except InvalidCursor as e:
+        return HttpResponse(str(e), status=400)
+
+    # Other participants for the whole page in one query
+    others = {
+        membership.conversation_id: membership.user
+        for membership in ConversationParticipant.objects.filter(
+            conversation__in=conversations
+        ).exclude(user=request.user).select_related('user')
+    }
     for conversation in conversations:
-        conversation.other_participant = conversation.get_other_participant(request.user)
+        conversation.other_participant = others.get(conversation.id)
     
     context = {
         'conversations': conversations,
+        'next_cursor': next_cursor,
     }
+    if request.GET.get('partial'):
+        return render(request, 'messaging/conversation_list.html', context)
     return render(request, 'messaging/inbox.html', context)
 
 
@@ -44,6 +86,17 @@ def conversation_detail(request, conversation_id):
     if request.method == 'POST':
         content = request.POST.get('content')
         attachment = request.FILES.get('attachment')
+        upload_id = request.POST.get('upload_id')
+        
+        if upload_id and not attachment:
+            # Attachment sent earlier through the resumable upload API
+            try:
+                attachment, = claim_uploads(request.user, [upload_id])
+            except UploadError as e:
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse({'success': False, 'error': str(e)}, status=400)
+                django_messages.error(request, str(e))
+                return redirect('conversation_detail', conversation_id=conversation.id)
         
         if content or attachment:
             message = Message.objects.create(
@@ -63,16 +116,20 @@ def conversation_detail(request, conversation_id):
             # If the conversation was deleted by the other participant, restore it
             for participant in conversation.participants.exclude(id=request.user.id):
                 if conversation.is_deleted_for_user(participant):
-                    conversation.deleted_by.remove(participant)
+                    conversation.restore_for_user(participant)
             
-            conversation.updated_at = message.created_at
-            conversation.save()
+            conversation.record_message(message)
             
             # Clear any Django messages before redirect to prevent notification display
             storage = django_messages.get_messages(request)
             storage.used = True
             
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return JsonResponse({'success': True, 'message': _serialize_message(message, request.user)})
             return redirect('conversation_detail', conversation_id=conversation.id)
+
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({'success': False, 'error': 'Message cannot be empty'}, status=400)
     
     # Mark messages as read
     conversation.mark_as_read(request.user)
@@ -81,16 +138,99 @@ def conversation_detail(request, conversation_id):
     storage = django_messages.get_messages(request)
     storage.used = True
     
-    messages = conversation.messages.select_related('sender').all()
+    # Newest page only; older messages are loaded as the user scrolls up
+    messages, older_cursor = keyset_paginate(
+        conversation.messages.select_related('sender'), limit=MESSAGE_PAGE_SIZE
+    )
+    messages.reverse()
     other_participant = conversation.get_other_participant(request.user)
+    # Messages up to the other participant's watermark show as read
+    other_last_read = conversation.last_read_message_id(other_participant) if other_participant else 0
     
     context = {
         'conversation': conversation,
         'messages': messages,
+        'older_cursor': older_cursor,
         'other_participant': other_participant,
+        'other_last_read': other_last_read,
     }
     return render(request, 'messaging/conversation.html', context)
 
+
+@login_required
+def conversation_history(request, conversation_id):
+    """Render the page of messages older than ``cursor``, oldest first"""
+    conversation = get_object_or_404(Conversation, id=conversation_id, participants=request.user)
+
+    try:
+        messages, older_cursor = keyset_paginate(
+            conversation.messages.select_related('sender'),
+            request.GET.get('cursor'),
+            limit=MESSAGE_PAGE_SIZE,
+        )
+    except InvalidCursor as e:
+        return HttpResponse(str(e), status=400)
+    messages.reverse()
+
+    other_participant = conversation.get_other_participant(request.user)
+    context = {
+        'messages': messages,
+        'older_cursor': older_cursor,
+        'other_last_read': conversation.last_read_message_id(other_participant) if other_participant else 0,
+    }
+    return render(request, 'messaging/message_list.html', context)
+
+
+def _serialize_message(message, user):
+    return {
+        'id': message.id,
+        'sender': message.sender.username,
+        'is_mine': message.sender_id == user.id,
+        'content': message.content,
+        'attachment_url': message.attachment.url if message.attachment else None,
+        'attachment_name': message.get_attachment_name(),
+        'thumbnail_url': message.thumbnail.url if message.thumbnail else None,
+        'preview_url': message.preview.url if message.preview else None,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+@login_required
+def conversation_messages_since(request, conversation_id):
+    """
+    API endpoint returning messages newer than ``since`` (a message id),
+    oldest first. Viewing them moves the caller's read watermark.
+    """
+    conversation = get_object_or_404(Conversation, id=conversation_id, participants=request.user)
+
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid since parameter'}, status=400)
+
+    messages = list(
+        conversation.messages.filter(id__gt=since).select_related('sender').order_by('id')[:SINCE_LIMIT + 1]
+    )
+    has_more = len(messages) > SINCE_LIMIT
+    messages = messages[:SINCE_LIMIT]
+
+    if messages:
+        newest_id = messages[-1].id
+        updated = ConversationParticipant.objects.filter(
+            conversation=conversation, user=request.user, last_read_message_id__lt=newest_id
+        ).update(last_read_message_id=newest_id)
+        if updated:
+            note_write()
+            notify_unread_changed(request.user.id)
+
+    other_participant = conversation.get_other_participant(request.user)
+    return JsonResponse({
+        'success': True,
+        'messages': [_serialize_message(message, request.user) for message in messages],
+        'has_more': has_more,
+        'other_last_read': conversation.last_read_message_id(other_participant) if other_participant else 0,
+    })
+
 @login_required
 def delete_conversation(request, conversation_id):
     """Soft delete a conversation for the current user"""
@@ -122,7 +262,7 @@ def start_conversation_with_user(request, user_id):
     if existing_conversation:
         # If conversation was deleted by current user, restore it
         if existing_conversation.is_deleted_for_user(request.user):
-            existing_conversation.deleted_by.remove(request.user)
+            existing_conversation.restore_for_user(request.user)
         
         # Redirect to existing conversation
         return redirect('conversation_detail', conversation_id=existing_conversation.id)
@@ -134,28 +274,77 @@ def start_conversation_with_user(request, user_id):
     # Redirect to the new conversation
     return redirect('conversation_detail', conversation_id=conversation.id)
 
+def _unread_count_etag(request):
+    # Bumped by notify_unread_changed whenever the count may have changed
+    current = etag_generation(unread_namespace(request.user.id))
+    return None if current is None else user_etag(request, 'unread', current)
+
 @login_required
+@revalidate(etag_func=_unread_count_etag)
 def unread_count(request):
     """API endpoint to get unread message count"""
-    count = Message.objects.filter(
-        conversation__participants=request.user,
-        is_read=False
-    ).exclude(
-        sender=request.user
-    ).exclude(
-        conversation__deleted_by=request.user  # Exclude messages from deleted conversations
-    ).count()
+    count = unread_message_count(request.user)
     
     return JsonResponse({'unread_count': count})
 
 
+# Seconds between keep-alive comments on an idle stream, so proxies don't
+# time the connection out and dead clients are noticed
+UNREAD_STREAM_KEEPALIVE = 20
+
+
+@login_required
+async def unread_count_stream(request):
+    """
+    Server-sent events stream of the unread message count.
+
+    Sends the current count on connect and again whenever it changes.
+    Only served under ASGI: a WSGI worker would be tied up for the life of
+    the connection, so there the client is told to fall back to polling.
+    """
+    if not isinstance(request, ASGIRequest):
+        # 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    count_for_user = sync_to_async(unread_message_count)
+
+    async def events():
+        subscription = get_broker().subscribe(unread_channel(user.id))
+        try:
+            last_count = await count_for_user(user)
+            yield f"retry: 5000\nevent: unread\ndata: {json.dumps({'unread_count': last_count})}\n\n"
+            while True:
+                try:
+                    await subscription.get(timeout=UNREAD_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                count = await count_for_user(user)
+                if count != last_count:
+                    last_count = count
+                    yield f"event: unread\ndata: {json.dumps({'unread_count': count})}\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def mark_as_read(request, message_id):
-    """Mark a specific message as read"""
+    """Mark a specific message (and everything before it) as read"""
     message = get_object_or_404(Message, id=message_id, conversation__participants=request.user)
     
     if message.sender != request.user:
-        message.is_read = True
-        message.save()
+        updated = ConversationParticipant.objects.filter(
+            conversation_id=message.conversation_id,
+            user=request.user,
+            last_read_message_id__lt=message.id
+        ).update(last_read_message_id=message.id)
+        if updated:
+            notify_unread_changed(request.user.id)
     
     return JsonResponse({'success': True})
\ No newline at end of file
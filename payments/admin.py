@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Wallet, Payment, Transaction
+from .models import Wallet, Payment, Transaction, BalanceCheckpoint
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
@@ -22,4 +22,15 @@ class TransactionAdmin(admin.ModelAdmin):
     list_filter = ['transaction_type', 'created_at']
     search_fields = ['wallet__user__username', 'description']
     readonly_fields = ['created_at']
-    raw_id_fields = ['wallet', 'payment']
\ No newline at end of file
+    raw_id_fields = ['wallet', 'payment']
+    
+    def has_change_permission(self, request, obj=None):
+        # The ledger is append-only
+        return False
+
+@admin.register(BalanceCheckpoint)
+class BalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['wallet', 'balance', 'last_transaction', 'created_at']
+    search_fields = ['wallet__user__username']
+    readonly_fields = ['created_at']
+    raw_id_fields = ['wallet', 'last_transaction']
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Wallet ledger reconciliation.
+
+``Transaction`` rows are the wallet ledger: append-only, one per balance
+change (see ``payments.wallet``), so a wallet's balance must equal its
+credits minus its debits. A ``BalanceCheckpoint`` records a balance
+verified against the ledger up to one transaction, so checking or
+recomputing a wallet replays only the rows after its latest checkpoint
+instead of its whole history.
+
+Transaction ids order a wallet's ledger: changes to one wallet serialize
+on its row lock, so they are inserted and committed in id order.
+
+``reconcile`` compares the stored balances of a range of wallets with their
+ledgers in a single statement, so balances and ledger rows come from one
+snapshot even while payments go on, and checkpoints the wallets that agree.
+See the ``reconcile_wallets`` command, which shards wallets over processes.
+"""
+from decimal import Decimal
+
+from django.db.models import BigIntegerField, Case, DecimalField, F, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import BalanceCheckpoint, Transaction, Wallet
+
+# Wider than the balance columns: a ledger sums many of them
+MONEY = DecimalField(max_digits=20, decimal_places=2)
+CENT = Decimal('0.01')
+
+
+def _latest_checkpoint(field):
+    return Subquery(
+        BalanceCheckpoint.objects.filter(wallet=OuterRef('pk'))
+        .order_by('-last_transaction_id').values(field)[:1]
+    )
+
+
+def with_ledger(wallets, full=False):
+    """
+    Annotate ``wallets`` with ``ledger_balance``, the balance their ledger
+    adds up to, ``last_transaction``, the id of its newest row replayed
+    (None without any), and ``checkpoint_transaction``, the id of their
+    latest checkpoint (0 without one). ``full`` replays every wallet from
+    its first transaction instead of its latest checkpoint.
+    """
+    wallets = wallets.annotate(
+        checkpoint_transaction=Coalesce(
+            _latest_checkpoint('last_transaction_id'), Value(0), output_field=BigIntegerField(),
+        ),
+        checkpoint_balance=Coalesce(_latest_checkpoint('balance'), Value(0), output_field=MONEY),
+    )
+    start = Value(0) if full else OuterRef('checkpoint_transaction')
+    opening = Value(0, output_field=MONEY) if full else F('checkpoint_balance')
+
+    replayed = (
+        Transaction.objects.filter(wallet=OuterRef('pk'), id__gt=start)
+        .order_by().values('wallet')
+    )
+    change = replayed.annotate(total=Sum(Case(
+        When(transaction_type='debit', then=-F('amount')),
+        default=F('amount'),
+        output_field=MONEY,
+    ))).values('total')
+    return wallets.annotate(
+        ledger_balance=opening + Coalesce(Subquery(change), Value(0), output_field=MONEY),
+        last_transaction=Subquery(replayed.annotate(last=Max('id')).values('last')),
+    )
+
+
+def ledger_balance(wallet_id):
+    """The balance ``wallet_id``'s ledger adds up to"""
+    return with_ledger(Wallet.objects.filter(pk=wallet_id)).values_list('ledger_balance', flat=True).get()
+
+
+def reconcile(first_id, last_id, full=False, checkpoint=True):
+    """
+    Check the wallets with ids ``first_id`` to ``last_id`` against their
+    ledgers; ``(wallets checked, checkpoints written, drift)``, where drift
+    lists ``(wallet id, user id, balance, ledger balance)`` of the wallets
+    that disagree. Unless ``checkpoint`` is False, every wallet that agrees
+    and has new transactions gets a checkpoint at its newest one.
+    """
+    rows = with_ledger(Wallet.objects.filter(pk__range=(first_id, last_id)), full).values_list(
+        'pk', 'user_id', 'balance', 'ledger_balance', 'checkpoint_transaction', 'last_transaction',
+    )
+    checked = 0
+    checkpoints = []
+    drift = []
+    for wallet_id, user_id, balance, ledger, checkpoint_transaction, last_transaction in rows.iterator():
+        checked += 1
+        # SQLite sums decimals as floats
+        ledger = ledger.quantize(CENT)
+        if balance != ledger:
+            drift.append((wallet_id, user_id, balance, ledger))
+        elif checkpoint and last_transaction and last_transaction > checkpoint_transaction:
+            checkpoints.append(BalanceCheckpoint(
+                wallet_id=wallet_id, last_transaction_id=last_transaction, balance=ledger,
+            ))
+    # Another run may have checkpointed the same transaction meanwhile
+    BalanceCheckpoint.objects.bulk_create(checkpoints, batch_size=500, ignore_conflicts=True)
+    return checked, len(checkpoints), drift
@@ -0,0 +1,58 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+
+from payments.ledger import reconcile
+from payments.models import Wallet
+
+
+def _reconcile(shard):
+    first_id, last_id, full, checkpoint = shard
+    return reconcile(first_id, last_id, full=full, checkpoint=checkpoint)
+
+
+class Command(BaseCommand):
+    help = "Check every wallet balance against its transaction ledger on a pool of worker processes, checkpointing the wallets that agree"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Worker processes (default: one per CPU)")
+        parser.add_argument('--shard-size', type=int, default=1000,
+                            help="Wallet ids per shard")
+        parser.add_argument('--full', action='store_true',
+                            help="Replay every ledger from its first transaction instead of the latest checkpoint")
+        parser.add_argument('--no-checkpoint', action='store_true',
+                            help="Only report drift, don't write checkpoints")
+
+    def handle(self, *args, **options):
+        bounds = Wallet.objects.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            self.stdout.write("No wallets")
+            return
+        size = options['shard_size']
+        shards = [
+            (start, start + size - 1, options['full'], not options['no_checkpoint'])
+            for start in range(bounds['first'], bounds['last'] + 1, size)
+        ]
+        self.stdout.write(f"{len(shards)} shard(s) of up to {size} wallets")
+
+        # Forked workers open their own connections instead of sharing ours
+        connections.close_all()
+        checked = checkpointed = drifted = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for shard_checked, shard_checkpointed, drift in pool.map(_reconcile, shards):
+                checked += shard_checked
+                checkpointed += shard_checkpointed
+                drifted += len(drift)
+                for wallet_id, user_id, balance, ledger in drift:
+                    self.stderr.write(
+                        f"Wallet {wallet_id} (user {user_id}): balance ${balance}, "
+                        f"ledger ${ledger}, off by ${balance - ledger}"
+                    )
+
+        summary = f"{checked} wallet(s) checked, {drifted} drifted, {checkpointed} checkpoint(s) written"
+        if drifted:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(f"Done: {summary}"))
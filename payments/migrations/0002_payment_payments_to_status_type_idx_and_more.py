@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_application_jobs_app_job_status_idx_and_more'),
+        ('payments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['to_user', 'status', 'payment_type'], name='payments_to_status_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['from_user', 'status'], name='payments_from_status_idx'),
+        ),
+    ]
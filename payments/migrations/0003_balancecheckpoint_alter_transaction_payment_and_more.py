@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_payment_payments_to_status_type_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-last_transaction_id'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='payment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='transactions', to='payments.payment'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['wallet', 'id'], name='payments_txn_wallet_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='balancecheckpoint',
+            name='last_transaction',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='payments.transaction'),
+        ),
+        migrations.AddField(
+            model_name='balancecheckpoint',
+            name='wallet',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='payments.wallet'),
+        ),
+        migrations.AddConstraint(
+            model_name='balancecheckpoint',
+            constraint=models.UniqueConstraint(fields=('wallet', 'last_transaction'), name='payments_checkpoint_unique'),
+        ),
+    ]
@@ -15,20 +15,6 @@ class Wallet(models.Model):
     def can_withdraw(self, amount):
         """Check if user has sufficient balance for withdrawal"""
         return self.balance >= amount
-    
-    def add_funds(self, amount):
-        """Add funds to wallet"""
-        self.balance += amount
-        self.save()
-        return self.balance
-    
-    def deduct_funds(self, amount):
-        """Deduct funds from wallet if sufficient balance exists"""
-        if self.can_withdraw(amount):
-            self.balance -= amount
-            self.save()
-            return True
-        return False
 
 class Payment(models.Model):
     STATUS_CHOICES = [
@@ -62,6 +48,12 @@ class Payment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Earnings / pending earnings for freelancers
+            models.Index(fields=['to_user', 'status', 'payment_type'], name='payments_to_status_type_idx'),
+            # Spending / payments on hold for clients
+            models.Index(fields=['from_user', 'status'], name='payments_from_status_idx'),
+        ]
 
 class Transaction(models.Model):
     TRANSACTION_TYPE_CHOICES = [
@@ -70,7 +62,8 @@ class Transaction(models.Model):
     ]
     
     wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='transactions')
-    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='transactions', null=True, blank=True)
+    # SET_NULL: deleting a payment (or the job it paid for) keeps its ledger rows
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, related_name='transactions', null=True, blank=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPE_CHOICES)
     description = models.CharField(max_length=255)
@@ -80,5 +73,31 @@ class Transaction(models.Model):
     def __str__(self):
         return f"{self.transaction_type.title()}: ${self.amount} - {self.wallet.user.username}"
     
+    def save(self, *args, **kwargs):
+        # The ledger is append-only: a correction is a new transaction
+        if not self._state.adding:
+            raise ValueError("Ledger transactions can't be changed")
+        super().save(*args, **kwargs)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # A wallet's ledger in id order, replayed from its last checkpoint
+            models.Index(fields=['wallet', 'id'], name='payments_txn_wallet_id_idx'),
+        ]
+
+class BalanceCheckpoint(models.Model):
+    """A wallet's balance verified against its ledger up to and including ``last_transaction``"""
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='checkpoints')
+    last_transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='+')
+    balance = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.wallet.user.username}: ${self.balance} at transaction {self.last_transaction_id}"
+    
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-last_transaction_id']
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'last_transaction'], name='payments_checkpoint_unique'),
+        ]
\ No newline at end of file
@@ -38,57 +38,6 @@ function releasePayment(jobId) {
         console.error('Error:', error);
     });
 }
-/**
- * Update navbar notification dot
- */
-function updateNavbarBadge(count) {
-    const navLinks = document.querySelectorAll('.navbar a[href*="inbox"]');
-    
-    navLinks.forEach(link => {
-        let dot = link.querySelector('.unread-dot');
-        
-        if (count > 0) {
-            if (!dot) {
-                dot = document.createElement('span');
-                dot.className = 'unread-dot';
-                link.appendChild(dot);
-            }
-        } else {
-            if (dot) {
-                dot.remove();
-            }
-        }
-    });
-}
-
-/**
- * Check unread message count
- */
-function checkUnreadMessages() {
-    const inboxLink = document.querySelector('.navbar a[href*="inbox"]');
-    if (!inboxLink) return;
-    
-    const csrftoken = getCookie('csrftoken');
-    
-    fetch('/api/unread-count/', {
-        method: 'GET',
-        headers: {
-            'X-Requested-With': 'XMLHttpRequest',
-            'X-CSRFToken': csrftoken
-        }
-    })
-    .then(response => {
-        if (!response.ok) throw new Error('Network error');
-        return response.json();
-    })
-    .then(data => {
-        updateNavbarBadge(data.unread_count);
-    })
-    .catch(error => {
-        // Silently fail
-    });
-}
-
 /**
  * Helper function to get cookie
  */
@@ -106,14 +55,3 @@ function getCookie(name) {
     }
     return cookieValue;
 }
-
-/**
- * Initialize - Add to your DOMContentLoaded
- */
-document.addEventListener('DOMContentLoaded', function() {
-    const inboxLink = document.querySelector('.navbar a[href*="inbox"]');
-    if (inboxLink) {
-        checkUnreadMessages();
-        setInterval(checkUnreadMessages, 5000);
-    }
-});
\ No newline at end of file
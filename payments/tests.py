@@ -1,3 +1,193 @@
-from django.test import TestCase
+import io
+import threading
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from accounts.models import UserStats
+from accounts.stats import rebuild_user_stats
+from jobs.models import Job
+from .ledger import ledger_balance, reconcile
+from .models import Payment, Transaction, Wallet
+from .wallet import InsufficientFunds, credit, debit, settle_payment
+
+STATS_FIELDS = ('total_earnings', 'pending_earnings', 'total_spent', 'pending_payments')
+
+
+class WalletTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', 'client@example.com', 'password')
+        cls.freelancer = User.objects.create_user('freelancer', 'freelancer@example.com', 'password')
+
+    def balance(self, user):
+        return Wallet.objects.get(user=user).balance
+
+    def test_credit_and_debit_record_the_new_balance(self):
+        entry = credit(self.client_user, Decimal('100.00'), 'Top-up')
+        self.assertEqual(entry.balance_after, Decimal('100.00'))
+        entry = debit(self.client_user, Decimal('30.25'), 'Withdrawal')
+        self.assertEqual((entry.transaction_type, entry.balance_after), ('debit', Decimal('69.75')))
+        self.assertEqual(self.balance(self.client_user), Decimal('69.75'))
+        self.assertEqual(Transaction.objects.filter(wallet__user=self.client_user).count(), 2)
+
+    def test_debit_refuses_to_overdraw(self):
+        credit(self.client_user, Decimal('10.00'), 'Top-up')
+        with self.assertRaises(InsufficientFunds) as raised:
+            debit(self.client_user, Decimal('10.01'), 'Withdrawal')
+        self.assertEqual(raised.exception.balance, Decimal('10.00'))
+        self.assertEqual(self.balance(self.client_user), Decimal('10.00'))
+        self.assertEqual(Transaction.objects.filter(transaction_type='debit').count(), 0)
+
+    def test_credit_creates_a_missing_wallet(self):
+        Wallet.objects.filter(user=self.freelancer).delete()
+        credit(self.freelancer, Decimal('5.00'), 'Payment')
+        self.assertEqual(self.balance(self.freelancer), Decimal('5.00'))
+
+    def test_settle_payment_once(self):
+        payment = Payment.objects.create(
+            from_user=self.client_user, to_user=self.freelancer, amount=Decimal('40.00'), status='on_hold',
+        )
+        self.assertTrue(settle_payment(payment, 'completed'))
+        self.assertFalse(settle_payment(Payment.objects.get(pk=payment.pk), 'refunded'))
+        self.assertEqual(Payment.objects.get(pk=payment.pk).status, 'completed')
+
+    def test_settle_payment_keeps_stats_current(self):
+        job = Job.objects.create(
+            title='Logo', description='A logo', category='design', budget=40,
+            deadline='2030-01-01', client=self.client_user, freelancer=self.freelancer, status='in_progress',
+        )
+        payments = [
+            Payment.objects.create(
+                job=job, from_user=self.client_user, to_user=self.freelancer,
+                amount=Decimal('40.00'), status='on_hold',
+            )
+            for _ in range(2)
+        ]
+        settle_payment(payments[0], 'completed')
+        settle_payment(payments[1], 'refunded')
+
+        incremental = {
+            stats.user_id: [getattr(stats, field) for field in STATS_FIELDS]
+            for stats in UserStats.objects.all()
+        }
+        rebuild_user_stats()
+        rebuilt = {
+            stats.user_id: [getattr(stats, field) for field in STATS_FIELDS]
+            for stats in UserStats.objects.all()
+        }
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(rebuilt[self.freelancer.id], [Decimal('40.00'), 0, 0, 0])
+        self.assertEqual(rebuilt[self.client_user.id], [0, 0, Decimal('40.00'), 0])
+
+
+class WalletConcurrencyTests(TransactionTestCase):
+    # Needs a test database the threads can share with locking, not SQLite's
+    # in-memory one (settings give SQLite a TEST NAME file)
+
+    def test_concurrent_debits_neither_lose_updates_nor_overdraw(self):
+        user = User.objects.create_user('agency', 'agency@example.com', 'password')
+        credit(user, Decimal('100.00'), 'Top-up')
+        succeeded = []
+
+        def spend():
+            try:
+                for _ in range(30):
+                    try:
+                        debit(user, Decimal('1.10'), 'Escrow')
+                        succeeded.append(1)
+                    except InsufficientFunds:
+                        pass
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=spend) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(succeeded), 90)
+        self.assertEqual(Wallet.objects.get(user=user).balance, Decimal('1.00'))
+
+
+class LedgerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', 'client@example.com', 'password')
+        cls.freelancer = User.objects.create_user('freelancer', 'freelancer@example.com', 'password')
+
+    def test_deleting_a_job_keeps_its_ledger_rows(self):
+        job = Job.objects.create(
+            title='Logo', description='A logo', category='design', budget=40,
+            deadline='2030-01-01', client=self.client_user,
+        )
+        credit(self.client_user, Decimal('50.00'), 'Top-up')
+        payment = Payment.objects.create(
+            job=job, from_user=self.client_user, to_user=self.freelancer, amount=Decimal('40.00'), status='on_hold',
+        )
+        debit(self.client_user, Decimal('40.00'), 'Escrow', payment=payment)
+
+        job.delete()
+        self.assertFalse(Payment.objects.filter(pk=payment.pk).exists())
+        self.assertEqual(
+            list(Transaction.objects.filter(wallet__user=self.client_user).order_by('id').values_list('payment', 'amount')),
+            [(None, Decimal('50.00')), (None, Decimal('40.00'))],
+        )
+
+    def test_reconcile_reports_drift_and_checkpoints_the_rest(self):
+        credit(self.client_user, Decimal('100.10'), 'Top-up')
+        debit(self.client_user, Decimal('0.20'), 'Withdrawal')
+        credit(self.freelancer, Decimal('5.00'), 'Payment')
+        client_wallet = Wallet.objects.get(user=self.client_user)
+        freelancer_wallet = Wallet.objects.get(user=self.freelancer)
+        self.assertEqual(ledger_balance(client_wallet.pk), Decimal('99.90'))
+
+        self.assertEqual(reconcile(0, client_wallet.pk + freelancer_wallet.pk), (2, 2, []))
+        # Nothing new since the checkpoints
+        self.assertEqual(reconcile(0, client_wallet.pk + freelancer_wallet.pk), (2, 0, []))
+
+        # A balance changed without a ledger entry
+        Wallet.objects.filter(pk=freelancer_wallet.pk).update(balance=Decimal('7.00'))
+        debit(self.client_user, Decimal('9.90'), 'Withdrawal')
+        checked, checkpointed, drift = reconcile(0, client_wallet.pk + freelancer_wallet.pk)
+        self.assertEqual((checked, checkpointed), (2, 1))
+        self.assertEqual(drift, [(freelancer_wallet.pk, self.freelancer.pk, Decimal('7.00'), Decimal('5.00'))])
+
+        latest = client_wallet.checkpoints.order_by('-last_transaction_id').first()
+        self.assertEqual(latest.balance, Decimal('90.00'))
+        self.assertEqual(latest.last_transaction_id, Transaction.objects.filter(wallet=client_wallet).latest('id').id)
+
+    def test_checkpointed_balance_only_replays_newer_transactions(self):
+        credit(self.client_user, Decimal('10.00'), 'Top-up')
+        wallet = Wallet.objects.get(user=self.client_user)
+        reconcile(wallet.pk, wallet.pk)
+        # A checkpoint is trusted: replaying from it can't see rows before it
+        wallet.checkpoints.update(balance=Decimal('12.00'))
+        credit(self.client_user, Decimal('1.00'), 'Top-up')
+
+        self.assertEqual(ledger_balance(wallet.pk), Decimal('13.00'))
+        checked, checkpointed, drift = reconcile(wallet.pk, wallet.pk, full=True)
+        self.assertEqual(drift, [])
+        self.assertEqual(checkpointed, 1)
+
+
+class ReconcileCommandTests(TransactionTestCase):
+    # The command closes this process's connections and forks workers that
+    # open their own, which a TestCase transaction wouldn't survive
+
+    def test_reports_drift(self):
+        client_user = User.objects.create_user('client', 'client@example.com', 'password')
+        freelancer = User.objects.create_user('freelancer', 'freelancer@example.com', 'password')
+        credit(client_user, Decimal('10.00'), 'Top-up')
+        Wallet.objects.filter(user=freelancer).update(balance=Decimal('1.00'))
+        stderr = io.StringIO()
+        with self.assertRaisesMessage(CommandError, '2 wallet(s) checked, 1 drifted, 1 checkpoint(s) written'):
+            call_command('reconcile_wallets', '--workers', '1', stdout=io.StringIO(), stderr=stderr)
+        self.assertIn(f'user {freelancer.pk}): balance $1.00, ledger $0.00', stderr.getvalue())
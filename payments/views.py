@@ -5,15 +5,16 @@ from django.contrib import messages
 from django.db import transaction, models
 from django.utils import timezone
 from decimal import Decimal
-from .models import Wallet, Payment, Transaction
+from .models import Payment, Transaction
+from .wallet import InsufficientFunds, credit, debit, settle_payment
 from jobs.models import Job, Application
 import json
 
 @login_required
 def wallet_view(request):
     """Display user's wallet and transaction history"""
-    wallet, created = Wallet.objects.get_or_create(user=request.user)
-    transactions = Transaction.objects.filter(wallet=wallet).order_by('-created_at')[:20]  # Last 20 transactions
+    wallet = request.workhub_user.wallet
+    transactions = Transaction.objects.filter(wallet=wallet).order_by('-created_at')[:20] if wallet.pk else []  # Last 20 transactions
     
     # Get pending payments (money on hold)
     pending_payments_sent = Payment.objects.filter(
@@ -27,7 +28,7 @@ def wallet_view(request):
     )
     
     # Calculate stats based on user role
-    if hasattr(request.user, 'profile') and request.user.profile.role == 'freelancer':
+    if request.workhub_user.role == 'freelancer':
         # For freelancers: total earned (completed payments) and pending earnings
         total_earnings = Payment.objects.filter(
             to_user=request.user, 
@@ -74,7 +75,7 @@ def wallet_view(request):
 def top_up_wallet(request):
     """Add funds to user's wallet (simulation) - Only for clients"""
     # Check if user is a client
-    if hasattr(request.user, 'profile') and request.user.profile.role != 'client':
+    if request.workhub_user.profile and request.workhub_user.role != 'client':
         messages.error(request, 'Only clients can add funds to their wallet')
         return redirect('payments:wallet')
     
@@ -92,8 +93,6 @@ def top_up_wallet(request):
                 return redirect('payments:wallet')
             
             with transaction.atomic():
-                wallet, created = Wallet.objects.get_or_create(user=request.user)
-                
                 # Create payment record
                 payment = Payment.objects.create(
                     from_user=request.user,
@@ -104,25 +103,14 @@ def top_up_wallet(request):
                     completed_at=timezone.now()
                 )
                 
-                # Add funds to wallet
-                old_balance = wallet.balance
-                wallet.add_funds(amount)
-                
-                # Create transaction record
-                Transaction.objects.create(
-                    wallet=wallet,
-                    payment=payment,
-                    amount=amount,
-                    transaction_type='credit',
-                    description=f'Wallet top-up',
-                    balance_after=wallet.balance
-                )
+                # Add funds to wallet, with its transaction record
+                entry = credit(request.user, amount, 'Wallet top-up', payment=payment)
                 
                 # Store success message in session for transaction success page
                 request.session['transaction_success'] = {
                     'type': 'top_up',
                     'amount': str(amount),
-                    'new_balance': str(wallet.balance)
+                    'new_balance': str(entry.balance_after)
                 }
                 
                 return redirect('payments:transaction_success')
@@ -178,19 +166,6 @@ def make_payment(request):
             amount = application.proposed_budget
             
             with transaction.atomic():
-                wallet, created = Wallet.objects.get_or_create(user=request.user)
-                
-                # Check if user has sufficient balance
-                if not wallet.can_withdraw(amount):
-                    return JsonResponse({
-                        'success': False, 
-                        'error': f'Insufficient balance. You need ${amount} but only have ${wallet.balance}'
-                    })
-                
-                # Deduct from client's wallet
-                if not wallet.deduct_funds(amount):
-                    return JsonResponse({'success': False, 'error': 'Failed to deduct funds'})
-                
                 # Create payment on hold
                 payment = Payment.objects.create(
                     job=job,
@@ -202,20 +177,14 @@ def make_payment(request):
                     description=f'Payment for job: {job.title}'
                 )
                 
-                # Create transaction record for client (debit)
-                Transaction.objects.create(
-                    wallet=wallet,
-                    payment=payment,
-                    amount=amount,
-                    transaction_type='debit',
-                    description=f'Payment on hold for job: {job.title}',
-                    balance_after=wallet.balance
-                )
+                # Deduct from client's wallet, with its transaction record;
+                # rolls the payment back if the balance doesn't cover it
+                debit(request.user, amount, f'Payment on hold for job: {job.title}', payment=payment)
                 
-                return JsonResponse({
-                    'success': True, 
-                    'message': f'Payment of ${amount} has been placed on hold'
-                })
+            return JsonResponse({
+                'success': True, 
+                'message': f'Payment of ${amount} has been placed on hold'
+            })
                 
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)})
@@ -251,26 +220,12 @@ def release_payment(request):
                 return JsonResponse({'success': False, 'error': 'No payment found on hold for this job'})
             
             with transaction.atomic():
-                # Create or get freelancer's wallet
-                freelancer_wallet, created = Wallet.objects.get_or_create(user=request.user)
+                # Update payment status, unless another request released it first
+                if not settle_payment(payment, 'completed'):
+                    return JsonResponse({'success': False, 'error': 'No payment found on hold for this job'})
                 
-                # Add funds to freelancer's wallet
-                freelancer_wallet.add_funds(payment.amount)
-                
-                # Update payment status
-                payment.status = 'completed'
-                payment.completed_at = timezone.now()
-                payment.save()
-                
-                # Create transaction record for freelancer (credit)
-                Transaction.objects.create(
-                    wallet=freelancer_wallet,
-                    payment=payment,
-                    amount=payment.amount,
-                    transaction_type='credit',
-                    description=f'Payment received for job: {job.title}',
-                    balance_after=freelancer_wallet.balance
-                )
+                # Add funds to freelancer's wallet (credit)
+                credit(request.user, payment.amount, f'Payment received for job: {job.title}', payment=payment)
                 
                 return JsonResponse({
                     'success': True, 
@@ -285,7 +240,7 @@ def release_payment(request):
 @login_required
 def payment_history(request):
     """Display user's payment history based on role"""
-    user_role = getattr(request.user.profile, 'role', None) if hasattr(request.user, 'profile') else None
+    user_role = request.workhub_user.role
     
     if user_role == 'freelancer':
         # Freelancer only sees received payments with total amount
@@ -323,7 +278,7 @@ def payment_history(request):
 def withdraw_funds(request):
     """Allow freelancer to withdraw funds from wallet"""
     # Check if user is a freelancer
-    if hasattr(request.user, 'profile') and request.user.profile.role != 'freelancer':
+    if request.workhub_user.profile and request.workhub_user.role != 'freelancer':
         messages.error(request, 'Only freelancers can withdraw funds')
         return redirect('payments:wallet')
     
@@ -336,46 +291,31 @@ def withdraw_funds(request):
                 messages.error(request, 'Amount must be greater than 0')
                 return redirect('payments:wallet')
             
-            wallet, created = Wallet.objects.get_or_create(user=request.user)
-            
-            if not wallet.can_withdraw(amount):
-                messages.error(request, f'Insufficient balance. You have ${wallet.balance}')
-                return redirect('payments:wallet')
-            
             with transaction.atomic():
-                # Deduct funds from wallet
-                if wallet.deduct_funds(amount):
-                    # Create payment record for withdrawal
-                    payment = Payment.objects.create(
-                        from_user=request.user,
-                        amount=amount,
-                        status='completed',
-                        payment_type='withdrawal',
-                        description=f'Withdrawal of ${amount}',
-                        completed_at=timezone.now()
-                    )
-                    
-                    # Create transaction record
-                    Transaction.objects.create(
-                        wallet=wallet,
-                        payment=payment,
-                        amount=amount,
-                        transaction_type='debit',
-                        description=f'Funds withdrawal',
-                        balance_after=wallet.balance
-                    )
-                    
-                    # Store success message in session
-                    request.session['transaction_success'] = {
-                        'type': 'withdrawal',
-                        'amount': str(amount),
-                        'new_balance': str(wallet.balance)
-                    }
-                    
-                    return redirect('payments:transaction_success')
-                else:
-                    messages.error(request, 'Failed to process withdrawal')
+                # Create payment record for withdrawal
+                payment = Payment.objects.create(
+                    from_user=request.user,
+                    amount=amount,
+                    status='completed',
+                    payment_type='withdrawal',
+                    description=f'Withdrawal of ${amount}',
+                    completed_at=timezone.now()
+                )
+                
+                # Deduct funds from wallet, with its transaction record
+                entry = debit(request.user, amount, 'Funds withdrawal', payment=payment)
+                
+            # Store success message in session
+            request.session['transaction_success'] = {
+                'type': 'withdrawal',
+                'amount': str(amount),
+                'new_balance': str(entry.balance_after)
+            }
+            
+            return redirect('payments:transaction_success')
                     
+        except InsufficientFunds as e:
+            messages.error(request, f'Insufficient balance. You have ${e.balance}')
         except (ValueError, TypeError):
             messages.error(request, 'Invalid amount entered')
         except Exception as e:
@@ -405,24 +345,15 @@ def cancel_payment(request):
                 return JsonResponse({'success': False, 'error': 'Job must be cancelled first'})
             
             with transaction.atomic():
-                client_wallet = Wallet.objects.get(user=request.user)
-                
-                # Refund to client's wallet
-                client_wallet.add_funds(payment.amount)
-                
-                # Update payment status
-                payment.status = 'refunded'
-                payment.completed_at = timezone.now()
-                payment.save()
+                # Update payment status, unless another request settled it first
+                if not settle_payment(payment, 'refunded'):
+                    return JsonResponse({'success': False, 'error': 'Payment cannot be cancelled'})
                 
-                # Create transaction record for client (credit/refund)
-                Transaction.objects.create(
-                    wallet=client_wallet,
+                # Refund to client's wallet (credit)
+                credit(
+                    request.user, payment.amount,
+                    f'Refund for cancelled job: {payment.job.title if payment.job else "N/A"}',
                     payment=payment,
-                    amount=payment.amount,
-                    transaction_type='credit',
-                    description=f'Refund for cancelled job: {payment.job.title if payment.job else "N/A"}',
-                    balance_after=client_wallet.balance
                 )
                 
                 return JsonResponse({
@@ -0,0 +1,104 @@
+"""
+Wallet balance changes.
+
+``credit`` and ``debit`` change a balance with one conditional UPDATE,
+``balance = balance - x WHERE balance >= x`` for a debit, instead of
+loading the wallet, changing it in Python and saving it back. Concurrent
+payments on one wallet therefore never overwrite each other's change nor
+overdraw it, and nothing needs a lock held across the view. The new
+balance is read back under the row lock the UPDATE took, and the ledger
+``Transaction`` recording it is written in the same database transaction.
+
+``settle_payment`` takes a payment out of escrow with the same kind of
+conditional UPDATE, so two requests releasing or refunding one payment
+can't both pay it out.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.stats import apply_change, payment_contributions
+from workhub.cache import invalidate, job_namespace
+
+from .models import Payment, Transaction, Wallet
+
+
+class InsufficientFunds(ValueError):
+
+    def __init__(self, amount, balance):
+        self.amount = amount
+        self.balance = balance
+        super().__init__(f'Insufficient balance. You need ${amount} but only have ${balance}')
+
+
+def balance(user_id):
+    return Wallet.objects.filter(user_id=user_id).values_list('balance', flat=True).first() or 0
+
+
+def _apply(user_id, delta):
+    """``(wallet id, new balance)`` after adding ``delta``, or None if no row matched"""
+    wallet = Wallet.objects.filter(user_id=user_id)
+    covered = wallet.filter(balance__gte=-delta) if delta < 0 else wallet
+    with transaction.atomic():
+        # update() skips auto_now
+        if not covered.update(balance=F('balance') + delta, updated_at=timezone.now()):
+            return None
+        return wallet.values_list('id', 'balance').get()
+
+
+def _record(row, amount, transaction_type, description, payment):
+    wallet_id, balance_after = row
+    return Transaction.objects.create(
+        wallet_id=wallet_id,
+        payment=payment,
+        amount=amount,
+        transaction_type=transaction_type,
+        description=description,
+        balance_after=balance_after,
+    )
+
+
+def credit(user, amount, description, payment=None):
+    """Add ``amount`` to ``user``'s wallet, creating it if missing; returns the ledger ``Transaction``"""
+    with transaction.atomic():
+        row = _apply(user.pk, amount)
+        if row is None:
+            Wallet.objects.get_or_create(user=user)
+            row = _apply(user.pk, amount)
+        return _record(row, amount, 'credit', description, payment)
+
+
+def debit(user, amount, description, payment=None):
+    """
+    Take ``amount`` from ``user``'s wallet; returns the ledger ``Transaction``.
+    Raises ``InsufficientFunds`` if the balance doesn't cover it.
+    """
+    with transaction.atomic():
+        row = _apply(user.pk, -amount)
+        if row is None:
+            raise InsufficientFunds(amount, balance(user.pk))
+        return _record(row, amount, 'debit', description, payment)
+
+
+def settle_payment(payment, status):
+    """
+    Move an ``on_hold`` payment to ``status`` ('completed' or 'refunded');
+    False if it is no longer on hold, e.g. another request settled it first
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        if not Payment.objects.filter(pk=payment.pk, status='on_hold').update(
+            status=status, completed_at=now, updated_at=now,
+        ):
+            return False
+        # update() sends no pre_save/post_save: do what the receivers in
+        # accounts.signals and jobs.signals would have done
+        stats = (payment.from_user_id, payment.to_user_id)
+        apply_change(
+            payment_contributions(*stats, 'on_hold', payment.payment_type, payment.amount),
+            payment_contributions(*stats, status, payment.payment_type, payment.amount),
+        )
+        if payment.job_id:
+            invalidate(job_namespace(payment.job_id))
+    payment.status, payment.completed_at, payment.updated_at = status, now, now
+    return True
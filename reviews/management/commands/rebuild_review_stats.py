@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from reviews.stats import rebuild_review_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute every freelancer's review statistics from one grouped aggregation"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Number of threads writing profile batches")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_review_stats(workers=options['workers'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt review stats for {count} profile(s)"))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:39
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_sum(apps, schema_editor):
+    FreelancerProfile = apps.get_model('reviews', 'FreelancerProfile')
+    Review = apps.get_model('reviews', 'Review')
+
+    public_sum = Review.objects.filter(
+        reviewee_id=OuterRef('user_id'), is_public=True
+    ).order_by().values('reviewee_id').annotate(total=Sum('rating')).values('total')
+    FreelancerProfile.objects.update(rating_sum=Coalesce(Subquery(public_sum), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='freelancerprofile',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_sum, migrations.RunPython.noop),
+    ]
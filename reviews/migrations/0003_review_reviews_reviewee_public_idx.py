@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_workfile_preview_workfile_preview_status_and_more'),
+        ('reviews', '0002_freelancerprofile_rating_sum'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['reviewee', 'is_public', 'created_at'], name='reviews_reviewee_public_idx'),
+        ),
+    ]
@@ -1,10 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Avg
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 
+from workhub.cache import invalidate, reviews_namespace
+from .stats import apply_review_change, rebuild_review_stats, review_contribution
+
 class Review(models.Model):
     job = models.OneToOneField('jobs.Job', on_delete=models.CASCADE, related_name='review')
     reviewer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews_given')
@@ -24,6 +26,10 @@ class Review(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['job', 'reviewer'] 
+        indexes = [
+            # A freelancer's public reviews, newest first, (created_at, id) keyset pages
+            models.Index(fields=['reviewee', 'is_public', 'created_at'], name='reviews_reviewee_public_idx'),
+        ]
     
     def __str__(self):
         return f"Review for {self.reviewee.username} by {self.reviewer.username} - {self.rating} stars"
@@ -46,34 +52,16 @@ class FreelancerProfile(models.Model):
     three_star_count = models.IntegerField(default=0)
     two_star_count = models.IntegerField(default=0)
     one_star_count = models.IntegerField(default=0)
+    # Sum of public ratings, so the average can be maintained incrementally
+    rating_sum = models.IntegerField(default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def update_review_stats(self):
-        """Update review statistics for this freelancer"""
-        reviews = Review.objects.filter(reviewee=self.user, is_public=True)
-        
-        self.total_reviews = reviews.count()
-        
-        if self.total_reviews > 0:
-            self.average_rating = reviews.aggregate(Avg('rating'))['rating__avg'] or 0
-            
-            # Count ratings by stars
-            self.five_star_count = reviews.filter(rating=5).count()
-            self.four_star_count = reviews.filter(rating=4).count()
-            self.three_star_count = reviews.filter(rating=3).count()
-            self.two_star_count = reviews.filter(rating=2).count()
-            self.one_star_count = reviews.filter(rating=1).count()
-        else:
-            self.average_rating = 0.00
-            self.five_star_count = 0
-            self.four_star_count = 0
-            self.three_star_count = 0
-            self.two_star_count = 0
-            self.one_star_count = 0
-        
-        self.save()
+        """Recompute review statistics for this freelancer from scratch"""
+        rebuild_review_stats([self.user_id])
+        self.refresh_from_db()
     
     def __str__(self):
         return f"{self.user.username} - {self.average_rating:.1f}★ ({self.total_reviews} reviews)"
@@ -103,10 +91,31 @@ def create_freelancer_profile(sender, instance, created, **kwargs):
     if created:
         FreelancerProfile.objects.get_or_create(user=instance)
 
+@receiver(pre_save, sender=Review)
+def remember_review_state(sender, instance, **kwargs):
+    """Keep the stored rating/visibility so post_save can apply a delta"""
+    instance._stats_previous = None
+    if instance.pk:
+        instance._stats_previous = Review.objects.filter(pk=instance.pk).values(
+            'reviewee_id', 'rating', 'is_public'
+        ).first()
+
+
 @receiver(post_save, sender=Review)
 def update_freelancer_stats(sender, instance, created, **kwargs):
-    """Update freelancer statistics when a review is created or updated"""
-    freelancer_profile, created = FreelancerProfile.objects.get_or_create(
-        user=instance.reviewee
-    )
-    freelancer_profile.update_review_stats()
\ No newline at end of file
+    """Adjust freelancer statistics when a review is created or updated"""
+    previous = getattr(instance, '_stats_previous', None)
+    old = review_contribution(**previous) if previous else {}
+    apply_review_change(old, review_contribution(instance.reviewee_id, instance.rating, instance.is_public))
+
+
+@receiver(post_delete, sender=Review)
+def remove_freelancer_stats(sender, instance, **kwargs):
+    """Take a deleted review out of the freelancer statistics"""
+    apply_review_change(review_contribution(instance.reviewee_id, instance.rating, instance.is_public), {})
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review_cache(sender, instance, **kwargs):
+    """Drop the reviewee's cached review page and stats"""
+    invalidate(reviews_namespace(instance.reviewee_id))
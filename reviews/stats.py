@@ -0,0 +1,143 @@
+"""
+Review statistics on ``FreelancerProfile``.
+
+Each public review contributes one to ``total_reviews``, its rating to
+``rating_sum`` and one to the matching star counter. ``apply_review_change``
+moves a freelancer's counters from a review's old contribution to its new
+one with a single ``F()`` UPDATE, recomputing ``average_rating`` from the
+updated sum and count in the same statement, so concurrent reviews never
+lose an update.
+
+``rebuild_review_stats`` recomputes everything with one grouped aggregate
+over all public reviews; see the ``rebuild_review_stats`` command.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from workhub.cache import invalidate, reviews_namespace
+
+STAR_FIELDS = {
+    5: 'five_star_count',
+    4: 'four_star_count',
+    3: 'three_star_count',
+    2: 'two_star_count',
+    1: 'one_star_count',
+}
+
+
+def review_contribution(reviewee_id, rating, is_public):
+    """The counters one review adds to its reviewee's profile"""
+    if not is_public or rating not in STAR_FIELDS:
+        return {}
+    return {reviewee_id: {'total_reviews': 1, 'rating_sum': rating, STAR_FIELDS[rating]: 1}}
+
+
+def _average(total_delta, sum_delta):
+    """AVG after the update, computed from the pre-update column values"""
+    new_total = F('total_reviews') + total_delta
+    new_sum = F('rating_sum') + sum_delta
+    return Case(
+        When(total_reviews__lte=-total_delta, then=Value(0)),
+        default=Cast(new_sum, FloatField()) / Cast(new_total, FloatField()),
+        output_field=DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
+def apply_review_change(old, new):
+    """Replace the ``old`` review contribution with the ``new`` one"""
+    from .models import FreelancerProfile
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    for sign, contribution in ((-1, old), (1, new)):
+        for user_id, fields in contribution.items():
+            for field, value in fields.items():
+                deltas[user_id][field] += sign * value
+
+    with transaction.atomic():
+        for user_id, fields in deltas.items():
+            changes = {field: F(field) + value for field, value in fields.items() if value}
+            if not changes:
+                continue
+            changes['average_rating'] = _average(fields['total_reviews'], fields['rating_sum'])
+            # update() skips auto_now, and review_api_stats validates on it
+            changes['updated_at'] = timezone.now()
+            if not FreelancerProfile.objects.filter(user_id=user_id).update(**changes):
+                # Profile missing (e.g. created before profiles existed): build it
+                rebuild_review_stats([user_id])
+
+
+def rebuild_review_stats(user_ids=None, workers=1, batch_size=500):
+    """
+    Recompute review stats for ``user_ids`` (default: every profile and
+    every reviewed user) from one grouped aggregate over public reviews.
+
+    Profiles are written in batches; with ``workers > 1`` the batches are
+    written concurrently, each on its own database connection.
+    """
+    from django.contrib.auth.models import User
+    from .models import FreelancerProfile, Review
+
+    reviews = Review.objects.filter(is_public=True)
+    if user_ids is not None:
+        reviews = reviews.filter(reviewee_id__in=user_ids)
+    aggregates = {
+        row.pop('reviewee_id'): row
+        for row in reviews.order_by().values('reviewee_id').annotate(
+            total_reviews=Count('id'),
+            rating_sum=Sum('rating'),
+            **{field: Count('id', filter=Q(rating=stars)) for stars, field in STAR_FIELDS.items()},
+        )
+    }
+
+    if user_ids is None:
+        user_ids = set(FreelancerProfile.objects.values_list('user_id', flat=True)) | set(aggregates)
+    else:
+        user_ids = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+
+    profiles = []
+    for user_id in sorted(user_ids):
+        row = aggregates.get(user_id, {})
+        total = row.get('total_reviews', 0)
+        rating_sum = row.get('rating_sum') or 0
+        profiles.append(FreelancerProfile(
+            user_id=user_id,
+            total_reviews=total,
+            rating_sum=rating_sum,
+            average_rating=round(rating_sum / total, 2) if total else 0,
+            **{field: row.get(field, 0) for field in STAR_FIELDS.values()},
+        ))
+
+    batches = [profiles[i:i + batch_size] for i in range(0, len(profiles), batch_size)]
+    if workers > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_write_profiles_in_thread, batches))
+    else:
+        for batch in batches:
+            _write_profiles(batch)
+    invalidate(*(reviews_namespace(user_id) for user_id in user_ids))
+    return len(profiles)
+
+
+def _write_profiles(profiles):
+    from .models import FreelancerProfile
+
+    FreelancerProfile.objects.bulk_create(
+        profiles,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['total_reviews', 'rating_sum', 'average_rating', *STAR_FIELDS.values(), 'updated_at'],
+    )
+
+
+def _write_profiles_in_thread(profiles):
+    from django.db import connection
+
+    try:
+        _write_profiles(profiles)
+    finally:
+        connection.close()
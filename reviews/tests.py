@@ -1,3 +1,61 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
 
-# Create your tests here.
+from workhub.replicas import PIN_COOKIE
+from workhub.tests import ReplicaMixin
+from jobs.models import Job
+from .models import FreelancerProfile, Review
+from .views import REVIEWS_PER_PAGE
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FreelancerReviewsPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        client = User.objects.create_user('client', 'client@example.com', 'password')
+        cls.freelancer = User.objects.create_user('freelancer', 'freelancer@example.com', 'password')
+        for i in range(REVIEWS_PER_PAGE + 6):
+            job = Job.objects.create(
+                title=f'Job {i}', description='A job', category='design', budget=40,
+                deadline='2030-01-01', client=client, freelancer=cls.freelancer, status='completed',
+            )
+            Review.objects.create(
+                job=job, reviewer=client, reviewee=cls.freelancer, rating=5,
+                feedback='Great work, thanks', is_public=i != 0,
+            )
+
+    def test_pages(self):
+        first = self.client.get('/freelancer/freelancer/')
+        self.assertEqual(first.context['total_reviews'], REVIEWS_PER_PAGE + 5)
+        self.assertEqual(len(first.context['reviews']), REVIEWS_PER_PAGE)
+        self.assertEqual(first.context['latest_review'], first.context['reviews'][0])
+
+        second = self.client.get('/freelancer/freelancer/', {'cursor': first.context['next_cursor']})
+        self.assertEqual(len(second.context['reviews']), 5)
+        self.assertIsNone(second.context['next_cursor'])
+        seen = {review.pk for page in (first, second) for review in page.context['reviews']}
+        self.assertEqual(seen, set(Review.objects.filter(is_public=True).values_list('pk', flat=True)))
+        self.assertEqual(second.context['latest_review'], first.context['latest_review'])
+
+    def test_invalid_cursor_shows_the_first_page(self):
+        response = self.client.get('/freelancer/freelancer/', {'cursor': 'nonsense'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['reviews']), REVIEWS_PER_PAGE)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FreelancerReviewsTests(ReplicaMixin, TransactionTestCase):
+
+    def test_get_creates_no_profile_and_does_not_pin(self):
+        freelancer = User.objects.create_user('freelancer', 'freelancer@example.com', 'password')
+        FreelancerProfile.objects.filter(user=freelancer).delete()
+
+        response = self.client.get('/freelancer/freelancer/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['freelancer_profile'].total_reviews, 0)
+        self.assertFalse(FreelancerProfile.objects.filter(user=freelancer).exists())
+        self.assertNotIn(PIN_COOKIE, response.cookies)
@@ -7,6 +7,12 @@ from django.http import Http404
 from django.db.models import Q
 from .models import Review, FreelancerProfile
 from jobs.models import Job
+from workhub.cache import cached, reviews_namespace
+from workhub.conditional import revalidate
+from workhub.pagination import InvalidCursor, keyset_paginate
+from workhub.replicas import replica_reads
+
+REVIEWS_PER_PAGE = 20
 
 
 @login_required
@@ -147,28 +153,41 @@ def view_review(request, job_id):
     return render(request, 'reviews/view_review.html', context)
 
 
+@replica_reads
 def freelancer_reviews(request, username):
-    """View all public reviews for a specific freelancer"""
+    """View the public reviews for a specific freelancer, newest first, a page at a time"""
     freelancer = get_object_or_404(User, username=username)
-    
-    # Get freelancer profile
-    freelancer_profile, created = FreelancerProfile.objects.get_or_create(
-        user=freelancer
-    )
-    
-    # Get all public reviews for this freelancer
-    reviews = Review.objects.filter(
-        reviewee=freelancer, 
+    public_reviews = Review.objects.filter(
+        reviewee=freelancer,
         is_public=True
-    ).select_related('reviewer', 'job').order_by('-created_at')
+    ).select_related('reviewer', 'job')
+    
+    def compute():
+        # Get freelancer profile; a GET doesn't create one
+        freelancer_profile = (
+            FreelancerProfile.objects.filter(user=freelancer).first()
+            or FreelancerProfile(user=freelancer)
+        )
+        reviews, next_cursor = keyset_paginate(public_reviews, None, REVIEWS_PER_PAGE)
+        return freelancer_profile, reviews, next_cursor
     
-    total_reviews = reviews.count()
+    # Only the stats and the first page are cached; older pages are one indexed range scan
+    freelancer_profile, first_page, next_cursor = cached(reviews_namespace(freelancer.id), ('first_page',), compute)
+    reviews = first_page
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            reviews, next_cursor = keyset_paginate(public_reviews, cursor, REVIEWS_PER_PAGE)
+        except InvalidCursor:
+            pass
     
     context = {
         'freelancer': freelancer,
         'freelancer_profile': freelancer_profile,
         'reviews': reviews,
-        'total_reviews': total_reviews,
+        'total_reviews': freelancer_profile.total_reviews,
+        'next_cursor': next_cursor,
+        'latest_review': first_page[0] if first_page else None,
     }
     return render(request, 'reviews/freelancer_reviews.html', context)
 
@@ -210,32 +229,44 @@ def my_reviews(request):
     return render(request, 'reviews/my_reviews.html', context)
 
 
+def _review_stats_etag(request, username):
+    updated_at = FreelancerProfile.objects.filter(
+        user__username=username
+    ).values_list('updated_at', flat=True).first()
+    # Microsecond timestamps, unlike Last-Modified, tell apart two reviews in the same second
+    return f'stats-{updated_at.timestamp()}' if updated_at else None
+
+
+@replica_reads
+@revalidate(etag_func=_review_stats_etag)
 def review_api_stats(request, username):
     """API endpoint to get freelancer review statistics"""
     from django.http import JsonResponse
     
     freelancer = get_object_or_404(User, username=username)
-    freelancer_profile = FreelancerProfile.objects.filter(user=freelancer).first()
     
-    if not freelancer_profile:
-        return JsonResponse({
-            'total_reviews': 0,
-            'average_rating': 0,
+    def compute():
+        freelancer_profile = FreelancerProfile.objects.filter(user=freelancer).first()
+        
+        if not freelancer_profile:
+            return {
+                'total_reviews': 0,
+                'average_rating': 0,
+                'rating_breakdown': {
+                    '5': 0, '4': 0, '3': 0, '2': 0, '1': 0
+                }
+            }
+        
+        return {
+            'total_reviews': freelancer_profile.total_reviews,
+            'average_rating': float(freelancer_profile.average_rating),
             'rating_breakdown': {
-                '5': 0, '4': 0, '3': 0, '2': 0, '1': 0
+                '5': freelancer_profile.five_star_count,
+                '4': freelancer_profile.four_star_count,
+                '3': freelancer_profile.three_star_count,
+                '2': freelancer_profile.two_star_count,
+                '1': freelancer_profile.one_star_count,
             }
-        })
-    
-    data = {
-        'total_reviews': freelancer_profile.total_reviews,
-        'average_rating': float(freelancer_profile.average_rating),
-        'rating_breakdown': {
-            '5': freelancer_profile.five_star_count,
-            '4': freelancer_profile.four_star_count,
-            '3': freelancer_profile.three_star_count,
-            '2': freelancer_profile.two_star_count,
-            '1': freelancer_profile.one_star_count,
         }
-    }
     
-    return JsonResponse(data)
\ No newline at end of file
+    return JsonResponse(cached(reviews_namespace(freelancer.id), ('stats',), compute))
\ No newline at end of file
@@ -6,7 +6,6 @@ let openSubmitWorkModal;
 document.addEventListener('DOMContentLoaded', function() {
     console.log('Job & Applications JavaScript loaded');
 
-    const jobCards = document.querySelectorAll('.job-card');
     const detailPanel = document.getElementById('job-detail-panel');
     const detailContent = document.getElementById('job-detail-content');
     const closeDetailBtn = document.getElementById('close-detail');
@@ -40,31 +39,47 @@ document.addEventListener('DOMContentLoaded', function() {
 
     /** ---------------- JOB LIST ---------------- **/
     function initJobList() {
-        jobCards.forEach(card => {
-            card.addEventListener('click', function() {
-                const jobId = this.dataset.jobId;
-                loadJobDetail(jobId);
+        const jobListings = document.getElementById('job-listings');
+
+        // Delegate so cards swapped in by search stay clickable
+        if (jobListings) {
+            jobListings.addEventListener('click', function(event) {
+                const card = event.target.closest('.job-card');
+                if (!card) return;
+
+                loadJobDetail(card.dataset.jobId);
 
-                jobCards.forEach(c => c.classList.remove('selected'));
-                this.classList.add('selected');
+                jobListings.querySelectorAll('.job-card').forEach(c => c.classList.remove('selected'));
+                card.classList.add('selected');
             });
-        });
+        }
 
         if (closeDetailBtn) {
             closeDetailBtn.addEventListener('click', function() {
                 detailPanel.style.display = 'none';
-                jobCards.forEach(c => c.classList.remove('selected'));
+                document.querySelectorAll('.job-card').forEach(c => c.classList.remove('selected'));
             });
         }
     }
 
+    // Job details already shown, with their ETags, so reopening a job only revalidates
+    const jobDetails = new Map();
+
     function loadJobDetail(jobId) {
         showLoading(true);
 
-        fetch(`/job/${jobId}/`)
+        const cached = jobDetails.get(jobId);
+        fetch(`/job/${jobId}/`, {
+            headers: cached ? { 'If-None-Match': cached.etag } : {}
+        })
             .then(response => {
+                if (response.status === 304) return cached.data;
                 if (!response.ok) throw new Error('Network response was not ok');
-                return response.json();
+                return response.json().then(data => {
+                    const etag = response.headers.get('ETag');
+                    if (etag) jobDetails.set(jobId, { etag: etag, data: data });
+                    return data;
+                });
             })
             .then(data => {
                 displayJobDetail(data);
@@ -97,97 +112,81 @@ document.addEventListener('DOMContentLoaded', function() {
         `;
     }
 
-    /** ---------------- SEARCH (FIXED CATEGORY FILTERING) ---------------- **/
+    /** ---------------- SEARCH (SERVER-SIDE) ---------------- **/
     function initSearchFeatures() {
         const searchInput = document.getElementById('job-search');
         const categoryFilter = document.getElementById('category-filter');
         const clearSearchBtn = document.getElementById('clear-search');
-        const resetSearchBtn = document.getElementById('reset-search');
-        const noResultsMessage = document.getElementById('no-results-message');
         const searchResultsInfo = document.getElementById('search-results-info');
         const resultsCount = document.getElementById('results-count');
         const searchTermDisplay = document.getElementById('search-term-display');
         const jobListings = document.getElementById('job-listings');
 
-        if (!searchInput || !categoryFilter) return;
+        if (!searchInput || !categoryFilter || !jobListings) return;
 
+        const searchUrl = jobListings.dataset.searchUrl || '/jobs/';
         let searchTimeout;
+        let searchController = null;
+
         function performSearch() {
-            const searchTerm = searchInput.value.toLowerCase().trim();
+            const searchTerm = searchInput.value.trim();
             const selectedCategory = categoryFilter.value;
-            let visibleCount = 0;
-
-            jobCards.forEach(card => {
-                const title = card.querySelector('.job-title')?.textContent.toLowerCase() || '';
-                const description = card.querySelector('.job-description')?.textContent.toLowerCase() || '';
-                const categoryText = card.querySelector('.job-category')?.textContent.toLowerCase() || '';
-                const categoryValue = card.getAttribute('data-category') || '';
-                const categoryDisplayText = card.querySelector('.job-category')?.textContent || '';
-
-                const textMatch = !searchTerm || 
-                    title.includes(searchTerm) || 
-                    description.includes(searchTerm) || 
-                    categoryText.includes(searchTerm);
-
-                let categoryMatch = true;
-                if (selectedCategory) {
-                    const directMatch = categoryValue === selectedCategory;
-                    const categoryNames = {
-                        'web-development': ['web development', 'web dev'],
-                        'mobile-development': ['mobile development', 'mobile dev', 'mobile app'],
-                        'design': ['design', 'graphic design', 'ui/ux'],
-                        'writing': ['writing', 'content writing', 'copywriting'],
-                        'marketing': ['marketing', 'digital marketing'],
-                        'data-entry': ['data entry', 'data processing'],
-                        'other': ['other', 'miscellaneous']
-                    };
-                    
-                    const fallbackMatch = categoryNames[selectedCategory]?.some(name => 
-                        categoryDisplayText.toLowerCase().includes(name)
-                    ) || false;
-                    
-                    categoryMatch = directMatch || fallbackMatch;
-                }
+            const params = new URLSearchParams({ q: searchTerm, category: selectedCategory });
 
-                if (textMatch && categoryMatch) {
-                    card.style.display = 'block';
-                    visibleCount++;
-                } else {
-                    card.style.display = 'none';
-                }
-            });
+            // Drop responses for keystrokes the user has already typed past
+            if (searchController) searchController.abort();
+            searchController = new AbortController();
 
-            // Update UI
-            if (resultsCount) resultsCount.textContent = visibleCount;
+            fetch(`${searchUrl}?${params}&partial=1`, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                signal: searchController.signal
+            })
+                .then(response => {
+                    if (!response.ok) throw new Error('Network response was not ok');
+                    return response.text();
+                })
+                .then(html => {
+                    jobListings.innerHTML = html;
+                    if (detailPanel) detailPanel.style.display = 'none';
+                    window.history.replaceState(null, '', `${searchUrl}?${params}`);
+                    updateSearchInfo(searchTerm, selectedCategory);
+                    observeLoadMore();
+                })
+                .catch(error => {
+                    if (error.name !== 'AbortError') console.error('Error searching jobs:', error);
+                });
+        }
+
+        function updateSearchInfo(searchTerm, selectedCategory) {
+            const results = jobListings.querySelector('.job-results');
+            const total = results ? results.dataset.total : '';
+            if (resultsCount) resultsCount.textContent = total;
 
-            const hasActiveSearch = searchTerm || selectedCategory;
+            const hasActiveSearch = (searchTerm || selectedCategory) && total !== '';
             if (searchResultsInfo) {
                 searchResultsInfo.style.display = hasActiveSearch ? 'block' : 'none';
             }
-            
-            const shouldShowNoResults = hasActiveSearch && visibleCount === 0;
-            if (noResultsMessage) {
-                noResultsMessage.style.display = shouldShowNoResults ? 'block' : 'none';
-            }
-            
-            if (jobListings) {
-                jobListings.style.display = shouldShowNoResults ? 'none' : 'block';
-            }
 
-            // Update search term display
             if (searchTermDisplay) {
                 let displayText = '';
+                const categoryText = categoryFilter.options[categoryFilter.selectedIndex].text;
                 if (searchTerm && selectedCategory) {
-                    displayText = ` for "${searchTerm}" in category "${categoryFilter.options[categoryFilter.selectedIndex].text}"`;
+                    displayText = ` for "${searchTerm}" in category "${categoryText}"`;
                 } else if (searchTerm) {
                     displayText = ` for "${searchTerm}"`;
                 } else if (selectedCategory) {
-                    displayText = ` in category "${categoryFilter.options[categoryFilter.selectedIndex].text}"`;
+                    displayText = ` in category "${categoryText}"`;
                 }
                 searchTermDisplay.textContent = displayText;
             }
         }
 
+        function resetSearch() {
+            searchInput.value = '';
+            categoryFilter.value = '';
+            performSearch();
+        }
+
         // Event listeners
         searchInput.addEventListener('input', () => {
             clearTimeout(searchTimeout);
@@ -196,24 +195,66 @@ document.addEventListener('DOMContentLoaded', function() {
         
         categoryFilter.addEventListener('change', performSearch);
         
-        if (clearSearchBtn) {
-            clearSearchBtn.addEventListener('click', () => {
-                searchInput.value = '';
-                categoryFilter.value = '';
-                performSearch();
-            });
+        if (clearSearchBtn) clearSearchBtn.addEventListener('click', resetSearch);
+
+        // Append the next page of cards in place of the "load more" link
+        let loadingMore = false;
+        function loadMore(link) {
+            if (loadingMore) return;
+            loadingMore = true;
+            link.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Loading...';
+
+            fetch(`${searchUrl}?${link.dataset.next}&partial=1`, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            })
+                .then(response => {
+                    if (!response.ok) throw new Error('Network response was not ok');
+                    return response.text();
+                })
+                .then(html => {
+                    const page = document.createElement('div');
+                    page.innerHTML = html;
+                    const results = jobListings.querySelector('.job-results');
+                    link.closest('.job-load-more').remove();
+                    page.querySelectorAll('.job-card, .job-load-more').forEach(el => results.appendChild(el));
+                    observeLoadMore();
+                })
+                .catch(error => {
+                    console.error('Error loading more jobs:', error);
+                    link.innerHTML = '<i class="fas fa-chevron-down"></i> Load more jobs';
+                })
+                .finally(() => { loadingMore = false; });
         }
-        
-        if (resetSearchBtn) {
-            resetSearchBtn.addEventListener('click', () => {
-                searchInput.value = '';
-                categoryFilter.value = '';
-                performSearch();
-            });
+
+        // Load the next page automatically when the link scrolls into view
+        const loadMoreObserver = 'IntersectionObserver' in window
+            ? new IntersectionObserver(entries => {
+                entries.forEach(entry => { if (entry.isIntersecting) loadMore(entry.target); });
+            }, { rootMargin: '400px' })
+            : null;
+
+        function observeLoadMore() {
+            if (!loadMoreObserver) return;
+            loadMoreObserver.disconnect();
+            const link = jobListings.querySelector('.job-load-more-link');
+            if (link) loadMoreObserver.observe(link);
         }
 
-        // Initial search to set up the display
-        performSearch();
+        // Reset button and "load more" link live inside the swapped-in results
+        jobListings.addEventListener('click', event => {
+            if (event.target.closest('#reset-search')) {
+                resetSearch();
+                return;
+            }
+            const loadMoreLink = event.target.closest('.job-load-more-link');
+            if (loadMoreLink) {
+                event.preventDefault();
+                loadMore(loadMoreLink);
+            }
+        });
+
+        observeLoadMore();
+        updateSearchInfo(searchInput.value.trim(), categoryFilter.value);
     }
 
     /** ---------------- APPLICATIONS WITH MODAL POPUPS ---------------- **/
@@ -399,6 +440,37 @@ document.addEventListener('DOMContentLoaded', function() {
             return true;
         }
         
+        // Add the selected files to the submission, through the chunked
+        // upload API when it is available
+        async function uploadWorkFiles(formData) {
+            if (!window.ChunkedUpload) {
+                selectedFiles.forEach((file, index) => {
+                    formData.append(`work_files_${index}`, file);
+                });
+                formData.append('file_count', selectedFiles.length);
+                return;
+            }
+            
+            const totalBytes = selectedFiles.reduce((sum, file) => sum + file.size, 0);
+            let doneBytes = 0;
+            for (let file of selectedFiles) {
+                const uploadId = await window.ChunkedUpload.upload(file, {
+                    onProgress: (sent) => {
+                        if (submitBtn && totalBytes) {
+                            const percent = Math.floor((doneBytes + sent) * 100 / totalBytes);
+                            submitBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Uploading ${percent}%...`;
+                        }
+                    }
+                });
+                doneBytes += file.size;
+                formData.append('upload_ids', uploadId);
+            }
+            formData.append('file_count', 0);
+            if (submitBtn) {
+                submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Submitting...';
+            }
+        }
+        
         // Form submission
         if (form) {
             form.addEventListener('submit', function(e) {
@@ -430,20 +502,15 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (workDescription) formData.append('work_description', workDescription.value);
                 if (additionalNotes) formData.append('additional_notes', additionalNotes.value);
                 
-                // Add files
-                selectedFiles.forEach((file, index) => {
-                    formData.append(`work_files_${index}`, file);
-                });
-                formData.append('file_count', selectedFiles.length);
-                
-                // Submit to server
-                fetch('/submit-work/', {
+                // Upload files in resumable chunks first, then submit their ids
+                uploadWorkFiles(formData)
+                .then(() => fetch('/submit-work/', {
                     method: 'POST',
                     body: formData,
                     headers: {
                         'X-CSRFToken': csrfToken ? csrfToken.value : ''
                     }
-                })
+                }))
                 .then(response => {
                     if (!response.ok) {
                         throw new Error(`HTTP error! status: ${response.status}`);
@@ -862,57 +929,6 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
-/**
- * Update navbar notification dot
- */
-function updateNavbarBadge(count) {
-    const navLinks = document.querySelectorAll('.navbar a[href*="inbox"]');
-    
-    navLinks.forEach(link => {
-        let dot = link.querySelector('.unread-dot');
-        
-        if (count > 0) {
-            if (!dot) {
-                dot = document.createElement('span');
-                dot.className = 'unread-dot';
-                link.appendChild(dot);
-            }
-        } else {
-            if (dot) {
-                dot.remove();
-            }
-        }
-    });
-}
-
-/**
- * Check unread message count
- */
-function checkUnreadMessages() {
-    const inboxLink = document.querySelector('.navbar a[href*="inbox"]');
-    if (!inboxLink) return;
-    
-    const csrftoken = getCookie('csrftoken');
-    
-    fetch('/api/unread-count/', {
-        method: 'GET',
-        headers: {
-            'X-Requested-With': 'XMLHttpRequest',
-            'X-CSRFToken': csrftoken
-        }
-    })
-    .then(response => {
-        if (!response.ok) throw new Error('Network error');
-        return response.json();
-    })
-    .then(data => {
-        updateNavbarBadge(data.unread_count);
-    })
-    .catch(error => {
-        // Silently fail
-    });
-}
-
 /**
  * Helper function to get cookie
  */
@@ -930,12 +946,3 @@ function getCookie(name) {
     }
     return cookieValue;
 }
-
-// Check for unread messages on page load
-document.addEventListener('DOMContentLoaded', function() {
-    const inboxLink = document.querySelector('.navbar a[href*="inbox"]');
-    if (inboxLink) {
-        checkUnreadMessages();
-        setInterval(checkUnreadMessages, 5000);
-    }
-});
\ No newline at end of file
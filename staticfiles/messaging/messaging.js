@@ -8,7 +8,9 @@ const MessagingApp = (function() {
 
     let config = {
         unreadCountUrl: null,
+        unreadStreamUrl: null,
         checkNewMessagesUrl: null,
+        historyUrl: null,
         conversationId: null,
         currentPage: null,
         refreshInterval: 2000, // 2 seconds
@@ -38,8 +40,8 @@ const MessagingApp = (function() {
             initInboxPage();
         }
 
-        // Always check for unread count
-        startUnreadCountPolling();
+        // Always keep the unread count up to date
+        startUnreadCountUpdates();
 
         // Handle page visibility
         handlePageVisibility();
@@ -68,120 +70,307 @@ const MessagingApp = (function() {
         // Start polling for new messages
         startNewMessagesPolling();
 
+        // Load older messages when scrolling to the top
+        setupHistoryScroll();
+
         // Handle form submission with AJAX
         setupAjaxMessageSubmit();
     }
 
+    /**
+     * Infinite scroll backwards: when the "load older" marker at the top of
+     * the thread comes into view, prepend the previous page of messages
+     */
+    function setupHistoryScroll() {
+        const container = document.getElementById('messages-container');
+        if (!container || !config.historyUrl || !('IntersectionObserver' in window)) return;
+
+        let loading = false;
+        const observer = new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) loadOlderMessages(entry.target);
+            });
+        }, { root: container });
+
+        function watchMarker() {
+            const marker = container.querySelector('.messages-load-older');
+            if (marker) observer.observe(marker);
+        }
+
+        function loadOlderMessages(marker) {
+            if (loading) return;
+            loading = true;
+            observer.unobserve(marker);
+
+            fetch(`${config.historyUrl}?cursor=${encodeURIComponent(marker.dataset.cursor)}`, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            })
+            .then(response => {
+                if (!response.ok) throw new Error('Network error');
+                return response.text();
+            })
+            .then(html => {
+                // Keep the visible messages where they are while content grows above them
+                const previousHeight = container.scrollHeight;
+                marker.remove();
+                container.insertAdjacentHTML('afterbegin', html);
+                container.scrollTop += container.scrollHeight - previousHeight;
+                watchMarker();
+            })
+            .catch(error => {
+                console.error('Error loading older messages:', error);
+                observer.observe(marker);
+            })
+            .finally(() => {
+                loading = false;
+            });
+        }
+
+        watchMarker();
+    }
+
     /**
      * Initialize inbox page functionality
      */
     function initInboxPage() {
         // Start polling for conversation updates
         startInboxPolling();
+
+        // Load older conversations a page at a time
+        setupInboxLoadMore();
+    }
+
+    /**
+     * Append the next page of conversations when "Load older" is clicked
+     */
+    function setupInboxLoadMore() {
+        const list = document.getElementById('conversations-list');
+        if (!list) return;
+
+        list.addEventListener('click', function(e) {
+            const link = e.target.closest('.conversations-load-more-link');
+            if (!link) return;
+            e.preventDefault();
+
+            const wrapper = link.closest('.conversations-load-more');
+            link.classList.add('disabled');
+
+            fetch(`?partial=1&cursor=${encodeURIComponent(link.dataset.cursor)}`, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
+            })
+            .then(response => {
+                if (!response.ok) throw new Error('Network error');
+                return response.text();
+            })
+            .then(html => {
+                wrapper.remove();
+                list.insertAdjacentHTML('beforeend', html);
+                config.inboxPagesLoaded = (config.inboxPagesLoaded || 1) + 1;
+            })
+            .catch(error => {
+                console.error('Error loading conversations:', error);
+                link.classList.remove('disabled');
+            });
+        });
+    }
+
+    /**
+     * Keep the unread count up to date: listen to the server-sent event
+     * stream, falling back to polling with backoff when it is unavailable
+     */
+    function startUnreadCountUpdates() {
+        if (config.unreadStreamUrl && window.EventSource) {
+            const source = new EventSource(config.unreadStreamUrl);
+            let connected = false;
+            source.addEventListener('unread', function(event) {
+                connected = true;
+                updateUnreadBadge(JSON.parse(event.data).unread_count);
+            });
+            source.onerror = function() {
+                // EventSource reconnects by itself after a dropped connection;
+                // only poll if the stream never worked or was closed for good
+                if (!connected || source.readyState === EventSource.CLOSED) {
+                    source.close();
+                    startUnreadCountPolling();
+                }
+            };
+            return;
+        }
+        startUnreadCountPolling();
     }
 
     /**
-     * Poll for unread message count
+     * Poll for unread message count, backing off while nothing changes
      */
     function startUnreadCountPolling() {
         if (!config.unreadCountUrl) return;
 
+        const minDelay = 5000;
+        const maxDelay = 60000;
+        let delay = minDelay;
+        let lastCount = null;
+        let lastData = null;
+        let etag = null;
+
         const checkUnreadCount = () => {
-            if (!config.isActive) return;
+            if (!config.isActive) {
+                setTimeout(checkUnreadCount, delay);
+                return;
+            }
+
+            const headers = {
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-CSRFToken': getCSRFToken()
+            };
+            if (etag) headers['If-None-Match'] = etag;
 
             fetch(config.unreadCountUrl, {
                 method: 'GET',
-                headers: {
-                    'X-Requested-With': 'XMLHttpRequest',
-                    'X-CSRFToken': getCSRFToken()
-                }
+                headers: headers
+            })
+            .then(response => {
+                // 304: nothing changed since the last answer
+                if (response.status === 304) return lastData;
+                etag = response.headers.get('ETag');
+                return response.json().then(data => (lastData = data));
             })
-            .then(response => response.json())
             .then(data => {
                 updateUnreadBadge(data.unread_count);
+                delay = data.unread_count !== lastCount ? minDelay : Math.min(delay * 2, maxDelay);
+                lastCount = data.unread_count;
+            })
+            .catch(error => {
+                console.error('Error checking unread count:', error);
+                delay = Math.min(delay * 2, maxDelay);
             })
-            .catch(error => console.error('Error checking unread count:', error));
+            .finally(() => setTimeout(checkUnreadCount, delay));
         };
 
-        // Check immediately
         checkUnreadCount();
-
-        // Then poll every 2 seconds
-        const intervalId = setInterval(checkUnreadCount, config.refreshInterval);
-        intervals.push(intervalId);
     }
 
     /**
-     * Poll for new messages in conversation
+     * Poll for messages newer than the last one shown
      */
     function startNewMessagesPolling() {
         if (!config.checkNewMessagesUrl) return;
 
-        const checkNewMessages = () => {
-            if (!config.isActive) return;
-
-            fetch(config.checkNewMessagesUrl, {
-                method: 'GET',
-                headers: {
-                    'X-Requested-With': 'XMLHttpRequest',
-                    'X-CSRFToken': getCSRFToken()
-                }
-            })
-            .then(response => response.text())
-            .then(html => {
-                // Parse the HTML response
-                const parser = new DOMParser();
-                const doc = parser.parseFromString(html, 'text/html');
-                const newMessages = doc.querySelectorAll('[data-message-id]');
-                
-                if (newMessages.length > 0) {
-                    const lastNewMessage = newMessages[newMessages.length - 1];
-                    const lastNewMessageId = lastNewMessage.getAttribute('data-message-id');
-                    
-                    // Check if there are new messages
-                    if (config.lastMessageId !== lastNewMessageId) {
-                        // Find messages newer than our last message
-                        let foundNew = false;
-                        const container = document.getElementById('messages-container');
-                        
-                        Array.from(newMessages).forEach(messageEl => {
-                            const messageId = messageEl.getAttribute('data-message-id');
-                            
-                            if (foundNew || messageId > config.lastMessageId) {
-                                foundNew = true;
-                                
-                                // Check if message already exists
-                                if (!document.querySelector(`[data-message-id="${messageId}"]`)) {
-                                    // Clone and append the message
-                                    const clonedMessage = messageEl.cloneNode(true);
-                                    container.appendChild(clonedMessage);
-                                }
-                            }
-                        });
-                        
-                        config.lastMessageId = lastNewMessageId;
-                        scrollToBottom(true);
-                    }
-                }
-            })
-            .catch(error => console.error('Error checking new messages:', error));
-        };
-
         const intervalId = setInterval(checkNewMessages, config.refreshInterval);
         intervals.push(intervalId);
     }
 
+    let checkingNewMessages = false;
+
+    function checkNewMessages() {
+        if (!config.isActive || checkingNewMessages) return;
+        checkingNewMessages = true;
+
+        const since = config.lastMessageId || 0;
+        fetch(`${config.checkNewMessagesUrl}?since=${since}`, {
+            method: 'GET',
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-CSRFToken': getCSRFToken()
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) return;
+
+            data.messages.forEach(appendMessage);
+            updateReadReceipts(data.other_last_read);
+
+            if (data.messages.length > 0) {
+                scrollToBottom(true);
+            }
+            if (data.has_more) {
+                setTimeout(checkNewMessages, 0);
+            }
+        })
+        .catch(error => console.error('Error checking new messages:', error))
+        .finally(() => {
+            checkingNewMessages = false;
+        });
+    }
+
+    /**
+     * Append a message returned by the "since" API to the thread
+     */
+    function appendMessage(message) {
+        const container = document.getElementById('messages-container');
+        if (!container || container.querySelector(`[data-message-id="${message.id}"]`)) return;
+
+        const item = document.createElement('div');
+        item.className = `message-item ${message.is_mine ? 'sent' : 'received'}`;
+        item.setAttribute('data-message-id', message.id);
+
+        const timestamp = new Date(message.created_at).toLocaleString([], {
+            month: 'short', day: '2-digit', year: 'numeric', hour: 'numeric', minute: '2-digit'
+        });
+        let html = `
+            <div class="message-bubble">
+                <div class="message-header">
+                    <span class="message-sender-name">${message.is_mine ? 'You' : escapeHtml(message.sender)}</span>
+                    <span class="message-timestamp">${escapeHtml(timestamp)}</span>
+                </div>
+                <div class="message-body">${escapeHtml(message.content || '')}</div>`;
+        if (message.attachment_url) {
+            html += `
+                <div class="message-attachment">${message.thumbnail_url ? `
+                    <a href="${escapeHtml(message.preview_url || message.attachment_url)}" target="_blank">
+                        <img src="${escapeHtml(message.thumbnail_url)}" alt="${escapeHtml(message.attachment_name)}" class="attachment-thumbnail" loading="lazy" decoding="async">
+                    </a>` : ''}
+                    <a href="${escapeHtml(message.attachment_url)}" target="_blank" class="attachment-link" download="${escapeHtml(message.attachment_name)}">
+                        <i class="fas fa-paperclip"></i> ${escapeHtml(message.attachment_name)}
+                    </a>
+                </div>`;
+        }
+        if (message.is_mine) {
+            html += `
+                <div class="message-status"><i class="fas fa-check"></i> Sent</div>`;
+        }
+        html += `
+            </div>`;
+        item.innerHTML = html;
+        container.appendChild(item);
+
+        if (!config.lastMessageId || message.id > Number(config.lastMessageId)) {
+            config.lastMessageId = message.id;
+        }
+    }
+
+    /**
+     * Mark sent messages up to the other participant's watermark as read
+     */
+    function updateReadReceipts(lastReadId) {
+        if (!lastReadId) return;
+        document.querySelectorAll('.message-item.sent').forEach(item => {
+            const status = item.querySelector('.message-status');
+            if (status && Number(item.getAttribute('data-message-id')) <= lastReadId && !status.dataset.read) {
+                status.dataset.read = '1';
+                status.innerHTML = '<i class="fas fa-check-double text-primary"></i> Read';
+            }
+        });
+    }
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text == null ? '' : String(text);
+        return div.innerHTML;
+    }
+
     /**
      * Poll for inbox updates
      */
     function startInboxPolling() {
+        let lastInboxHtml = null;
+
         const checkInboxUpdates = () => {
             if (!config.isActive) return;
+            // Only the first page is refreshed; don't drop older pages the user loaded
+            if ((config.inboxPagesLoaded || 1) > 1) return;
 
-            // Reload the page content to update conversations
-            const currentUrl = window.location.href;
-            
-            fetch(currentUrl, {
+            fetch('?partial=1', {
                 method: 'GET',
                 headers: {
                     'X-Requested-With': 'XMLHttpRequest',
@@ -190,16 +379,12 @@ const MessagingApp = (function() {
             })
             .then(response => response.text())
             .then(html => {
-                const parser = new DOMParser();
-                const doc = parser.parseFromString(html, 'text/html');
-                const newConversationsList = doc.getElementById('conversations-list');
                 const currentConversationsList = document.getElementById('conversations-list');
                 
-                if (newConversationsList && currentConversationsList) {
-                    // Only update if content has changed
-                    if (newConversationsList.innerHTML !== currentConversationsList.innerHTML) {
-                        currentConversationsList.innerHTML = newConversationsList.innerHTML;
-                    }
+                // Only update if content has changed since the last poll
+                if (currentConversationsList && html !== lastInboxHtml) {
+                    currentConversationsList.innerHTML = html;
+                    lastInboxHtml = html;
                 }
             })
             .catch(error => console.error('Error updating inbox:', error));
@@ -256,6 +441,27 @@ const MessagingApp = (function() {
         });
     }
 
+    /**
+     * Send the form's attachment through the resumable chunked upload API
+     * (when available) and replace it with the finalized upload id
+     */
+    async function uploadAttachment(formData, sendBtn) {
+        const attachment = formData.get('attachment');
+        if (!window.ChunkedUpload || !(attachment instanceof File) || !attachment.name) {
+            return;
+        }
+
+        const uploadId = await window.ChunkedUpload.upload(attachment, {
+            onProgress: (sent, total) => {
+                const percent = total ? Math.floor(sent * 100 / total) : 100;
+                sendBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Uploading ${percent}%...`;
+            }
+        });
+        formData.delete('attachment');
+        formData.append('upload_id', uploadId);
+        sendBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Sending...';
+    }
+
     /**
      * Set up AJAX message submission
      */
@@ -280,16 +486,23 @@ const MessagingApp = (function() {
             sendBtn.disabled = true;
             sendBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Sending...';
 
-            fetch(form.action || window.location.href, {
+            uploadAttachment(formData, sendBtn)
+            .then(() => fetch(form.action || window.location.href, {
                 method: 'POST',
                 body: formData,
                 headers: {
                     'X-CSRFToken': getCSRFToken(),
                     'X-Requested-With': 'XMLHttpRequest'
                 }
-            })
+            }))
             .then(response => {
                 if (response.ok) {
+                    return response.json();
+                }
+                throw new Error('Failed to send message');
+            })
+            .then(data => {
+                if (data.success) {
                     // Clear form
                     input.value = '';
                     input.style.height = 'auto';
@@ -306,8 +519,9 @@ const MessagingApp = (function() {
                         attachmentPreview.classList.remove('active');
                     }
 
-                    // Reload page to show new message
-                    window.location.reload();
+                    // Show the new message without reloading the page
+                    appendMessage(data.message);
+                    scrollToBottom(true);
                 } else {
                     throw new Error('Failed to send message');
                 }
@@ -0,0 +1,130 @@
+/**
+ * Navbar unread-message dot
+ *
+ * Loaded by the app layouts. On pages whose navbar has an inbox link, keeps
+ * the dot up to date from the server-sent event stream, and falls back to
+ * polling with backoff when the stream is unavailable (e.g. the site is
+ * served over WSGI). Polls revalidate with If-None-Match, so an unchanged
+ * count costs a 304.
+ */
+(function() {
+    'use strict';
+
+    const COUNT_URL = '/api/unread-count/';
+    const STREAM_URL = '/api/unread-count/stream/';
+    const INBOX_LINKS = '.navbar a[href*="inbox"]';
+
+    // Last unread count response
+    let lastUnreadCount = { etag: null, data: null };
+
+    /**
+     * Update navbar notification dot
+     */
+    function updateNavbarBadge(count) {
+        document.querySelectorAll(INBOX_LINKS).forEach(link => {
+            let dot = link.querySelector('.unread-dot');
+
+            if (count > 0) {
+                if (!dot) {
+                    dot = document.createElement('span');
+                    dot.className = 'unread-dot';
+                    link.appendChild(dot);
+                }
+            } else if (dot) {
+                dot.remove();
+            }
+        });
+    }
+
+    /**
+     * Check unread message count; resolves to the count, or null on failure
+     */
+    function checkUnreadMessages() {
+        const headers = { 'X-Requested-With': 'XMLHttpRequest' };
+        if (lastUnreadCount.etag) headers['If-None-Match'] = lastUnreadCount.etag;
+
+        return fetch(COUNT_URL, { method: 'GET', headers: headers })
+        .then(response => {
+            // 304: the count we already have is current
+            if (response.status === 304) return lastUnreadCount.data;
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json().then(data => {
+                lastUnreadCount = { etag: response.headers.get('ETag'), data: data };
+                return data;
+            });
+        })
+        .then(data => {
+            updateNavbarBadge(data.unread_count);
+            return data.unread_count;
+        })
+        .catch(error => {
+            // Silently fail
+            return null;
+        });
+    }
+
+    /**
+     * Poll the unread count, backing off from 5s to 60s while nothing changes
+     */
+    function pollUnreadMessages() {
+        const minDelay = 5000;
+        const maxDelay = 60000;
+        let delay = minDelay;
+        let lastCount = null;
+
+        function poll() {
+            if (document.hidden) {
+                setTimeout(poll, delay);
+                return;
+            }
+            checkUnreadMessages().then(count => {
+                if (count !== null && count !== lastCount) {
+                    delay = minDelay;
+                } else {
+                    delay = Math.min(delay * 2, maxDelay);
+                }
+                lastCount = count;
+                setTimeout(poll, delay);
+            });
+        }
+
+        poll();
+    }
+
+    /**
+     * Keep the navbar unread dot up to date (only for authenticated users,
+     * whose navbar links to the inbox)
+     */
+    function watchUnreadMessages() {
+        if (!document.querySelector(INBOX_LINKS) || window.unreadWatcherStarted) return;
+        window.unreadWatcherStarted = true;
+
+        if (!window.EventSource) {
+            pollUnreadMessages();
+            return;
+        }
+
+        const source = new EventSource(STREAM_URL);
+        let connected = false;
+        source.addEventListener('unread', function(event) {
+            connected = true;
+            updateNavbarBadge(JSON.parse(event.data).unread_count);
+        });
+        source.onerror = function() {
+            // EventSource reconnects by itself after a dropped connection; only
+            // switch to polling if the stream never worked or was closed for good
+            if (!connected || source.readyState === EventSource.CLOSED) {
+                source.close();
+                pollUnreadMessages();
+            }
+        };
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', watchUnreadMessages);
+    } else {
+        watchUnreadMessages();
+    }
+})();
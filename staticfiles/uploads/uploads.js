@@ -0,0 +1,166 @@
+/**
+ * Resumable chunked uploads
+ *
+ *   ChunkedUpload.upload(file, { onProgress(sentBytes, totalBytes) })
+ *       -> Promise resolving to the finalized upload id
+ *
+ * The file is sent in numbered chunks; a failed chunk is retried with
+ * backoff, and if the page is reloaded the same file resumes from the last
+ * chunk the server stored. Views that take files accept the returned id
+ * (`upload_ids` for work submissions, `upload_id` for message attachments).
+ */
+(function() {
+    'use strict';
+
+    const API_URL = '/api/uploads/';
+    const MAX_RETRIES = 5;
+
+    const CRC_TABLE = (function() {
+        const table = new Uint32Array(256);
+        for (let n = 0; n < 256; n++) {
+            let c = n;
+            for (let k = 0; k < 8; k++) {
+                c = (c & 1) ? (0xEDB88320 ^ (c >>> 1)) : (c >>> 1);
+            }
+            table[n] = c >>> 0;
+        }
+        return table;
+    })();
+
+    /**
+     * Continue a CRC-32 over more bytes (same result as Python's zlib.crc32)
+     */
+    function crc32(bytes, crc) {
+        let c = crc ^ -1;
+        for (let i = 0; i < bytes.length; i++) {
+            c = CRC_TABLE[(c ^ bytes[i]) & 0xFF] ^ (c >>> 8);
+        }
+        return (c ^ -1) >>> 0;
+    }
+
+    function getCSRFToken() {
+        const meta = document.querySelector('meta[name="csrf-token"]');
+        if (meta) return meta.getAttribute('content');
+        const input = document.querySelector('[name=csrfmiddlewaretoken]');
+        return input ? input.value : '';
+    }
+
+    function resumeKey(file) {
+        return `chunkedUpload:${file.name}:${file.size}:${file.lastModified}`;
+    }
+
+    function sleep(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    /**
+     * fetch() that retries network errors and server errors with backoff.
+     * Client errors (4xx) are returned for the caller to handle.
+     */
+    async function requestJSON(url, options) {
+        let delay = 1000;
+        for (let attempt = 0; ; attempt++) {
+            try {
+                const response = await fetch(url, Object.assign({ credentials: 'same-origin' }, options));
+                if (response.status < 500) {
+                    const data = await response.json().catch(() => ({}));
+                    return { status: response.status, data: data };
+                }
+                if (attempt >= MAX_RETRIES) {
+                    throw new Error(`Upload failed: status ${response.status}`);
+                }
+            } catch (error) {
+                if (attempt >= MAX_RETRIES) throw error;
+            }
+            await sleep(delay);
+            delay = Math.min(delay * 2, 30000);
+        }
+    }
+
+    function postForm(url, fields) {
+        const formData = new FormData();
+        Object.keys(fields).forEach(name => formData.append(name, fields[name]));
+        return requestJSON(url, {
+            method: 'POST',
+            body: formData,
+            headers: { 'X-CSRFToken': getCSRFToken() }
+        });
+    }
+
+    /**
+     * Reuse the session this file was being uploaded with, or start a new one
+     */
+    async function openSession(file) {
+        const key = resumeKey(file);
+        const savedId = window.localStorage ? localStorage.getItem(key) : null;
+        if (savedId) {
+            const { status, data } = await requestJSON(`${API_URL}${savedId}/`, { method: 'GET' });
+            if (status === 200 && data.status !== 'consumed') {
+                return data;
+            }
+            localStorage.removeItem(key);
+        }
+
+        const { status, data } = await postForm(API_URL, { filename: file.name, size: file.size });
+        if (status !== 201 || !data.success) {
+            throw new Error(data.error || 'Could not start upload');
+        }
+        if (window.localStorage) {
+            localStorage.setItem(key, data.upload_id);
+        }
+        return data;
+    }
+
+    async function upload(file, options) {
+        const onProgress = (options && options.onProgress) || function() {};
+        let session = await openSession(file);
+        const uploadId = session.upload_id;
+        const chunkSize = session.chunk_size;
+
+        if (session.status === 'uploading') {
+            let checksum = 0;
+            let index = 0;
+            while (index < session.chunk_count) {
+                const start = index * chunkSize;
+                const bytes = new Uint8Array(await file.slice(start, start + chunkSize).arrayBuffer());
+
+                if (index >= session.next_chunk) {
+                    const { status, data } = await requestJSON(`${API_URL}${uploadId}/chunks/${index}/`, {
+                        method: 'PUT',
+                        body: bytes,
+                        headers: {
+                            'Content-Type': 'application/octet-stream',
+                            'X-CSRFToken': getCSRFToken()
+                        }
+                    });
+                    if (status !== 200 && !(status === 409 && data.next_chunk > index)) {
+                        throw new Error(data.error || `Upload of ${file.name} failed`);
+                    }
+                    session.next_chunk = data.next_chunk;
+                    onProgress(data.received_bytes, file.size);
+                }
+
+                // Chunks the server already had still count towards the checksum
+                checksum = crc32(bytes, checksum);
+                index++;
+            }
+
+            const { status, data } = await postForm(`${API_URL}${uploadId}/finalize/`, { checksum: checksum });
+            if (status !== 200 || !data.success) {
+                if (window.localStorage) localStorage.removeItem(resumeKey(file));
+                throw new Error(data.error || `Upload of ${file.name} failed`);
+            }
+        }
+
+        onProgress(file.size, file.size);
+        if (window.localStorage) {
+            localStorage.removeItem(resumeKey(file));
+        }
+        return uploadId;
+    }
+
+    window.ChunkedUpload = {
+        upload: upload,
+        crc32: crc32
+    };
+})();
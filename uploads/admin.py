@@ -0,0 +1,19 @@
+from django.contrib import admin
+from .models import Blob, UploadSession
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'status', 'received_bytes', 'total_size', 'created_at', 'updated_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('filename', 'user__username')
+    readonly_fields = ('id', 'checksum', 'created_at', 'updated_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'size', 'ref_count', 'created_at')
+    ordering = ('-created_at',)
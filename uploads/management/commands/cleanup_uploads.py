@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from uploads.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Remove abandoned and already used upload sessions together with their partial files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=None,
+                            help="Age after which an unused session is abandoned "
+                                 "(default UPLOAD_SESSION_TTL_HOURS)")
+
+    def handle(self, *args, **options):
+        hours = options['hours']
+        if hours is None:
+            hours = settings.UPLOAD_SESSION_TTL_HOURS
+        cutoff = timezone.now() - timedelta(hours=hours)
+
+        # A consumed session's file is moved away by the request that claimed
+        # it; give that request time to finish before removing leftovers
+        consumed_cutoff = timezone.now() - timedelta(hours=1)
+        sessions = UploadSession.objects.filter(
+            Q(status='consumed', updated_at__lt=consumed_cutoff)
+            | Q(status__in=['uploading', 'complete'], updated_at__lt=cutoff)
+        )
+        removed = 0
+        for session in sessions.iterator():
+            session.discard()
+            removed += 1
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} upload session(s)"))
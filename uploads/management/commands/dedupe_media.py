@@ -0,0 +1,52 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from jobs.models import WorkFile
+from messaging.models import Message
+from uploads.storage import BLOB_PREFIX
+
+# (model, file field, field holding the user's file name) kept in blob storage
+BLOB_FIELDS = [
+    (WorkFile, 'file', 'original_name'),
+    (Message, 'attachment', 'attachment_name'),
+]
+
+
+class Command(BaseCommand):
+    help = "Move work files and message attachments stored before blob storage into it, deduplicating them"
+
+    def handle(self, *args, **options):
+        for model, field_name, name_field in BLOB_FIELDS:
+            storage = model._meta.get_field(field_name).storage
+            rows = model.objects.exclude(
+                **{f'{field_name}__isnull': True}
+            ).exclude(
+                **{field_name: ''}
+            ).exclude(
+                **{f'{field_name}__startswith': f'{BLOB_PREFIX}/'}
+            ).only('pk', field_name, name_field)
+
+            moved = missing = 0
+            for row in rows.iterator():
+                old_name = getattr(row, field_name).name
+                if not storage.exists(old_name):
+                    missing += 1
+                    continue
+
+                with transaction.atomic():
+                    with storage.open(old_name) as content:
+                        new_name = storage.save(old_name, content)
+                    changes = {field_name: new_name}
+                    if not getattr(row, name_field):
+                        # The stored name is about to stop being the user's file name
+                        changes[name_field] = os.path.basename(old_name)
+                    model.objects.filter(pk=row.pk).update(**changes)
+                if not model.objects.filter(**{field_name: old_name}).exists():
+                    storage.delete(old_name)
+                moved += 1
+
+            label = model._meta.verbose_name_plural
+            self.stdout.write(f"{label}: moved {moved} file(s), {missing} missing")
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.models import WorkFile
+from messaging.models import Message
+from uploads.previews import IMAGE_EXTENSIONS, process_pending
+
+
+class Command(BaseCommand):
+    help = "Render thumbnails and previews for uploaded images on a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Worker processes (default PREVIEW_WORKERS)")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep when nothing is pending")
+        parser.add_argument('--once', action='store_true',
+                            help="Render what is currently pending and exit")
+        parser.add_argument('--backfill', action='store_true',
+                            help="First queue images uploaded before previews existed")
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.queue_existing_images()
+
+        total_ready = total_failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'] or settings.PREVIEW_WORKERS) as pool:
+            try:
+                while True:
+                    ready, failed = process_pending(options['batch_size'], pool)
+                    total_ready += ready
+                    total_failed += failed
+                    if ready or failed:
+                        self.stdout.write(f"Rendered {ready}, failed {failed}")
+                    elif options['once']:
+                        break
+                    else:
+                        time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total_ready} ready, {total_failed} failed"))
+
+    def queue_existing_images(self):
+        for model, name_field in ((WorkFile, 'original_name'), (Message, 'attachment_name')):
+            rows = model.objects.filter(preview_status='none').exclude(**{name_field: ''})
+            ids = [
+                pk for pk, name in rows.values_list('pk', name_field).iterator()
+                if any(name.lower().endswith(extension) for extension in IMAGE_EXTENSIONS)
+            ]
+            queued = 0
+            for start in range(0, len(ids), 500):
+                queued += model.objects.filter(pk__in=ids[start:start + 500]).update(preview_status='pending')
+            self.stdout.write(f"Queued {queued} {model._meta.verbose_name_plural}")
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:44
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('total_size', models.PositiveBigIntegerField(help_text='File size in bytes')),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('next_chunk', models.PositiveIntegerField(default=0)),
+                ('received_bytes', models.PositiveBigIntegerField(default=0)),
+                ('checksum', models.PositiveBigIntegerField(default=0, help_text='CRC-32 of the bytes received so far')),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('complete', 'Complete'), ('consumed', 'Consumed')], default='uploading', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='uploads_status_updated_idx')],
+            },
+        ),
+    ]
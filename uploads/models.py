@@ -0,0 +1,209 @@
+"""
+Resumable chunked uploads.
+
+A client creates an ``UploadSession`` for one file, PUTs its chunks in
+order (``0 .. n-1``, each ``chunk_size`` bytes except the last), then
+finalizes it. Every chunk is appended straight to the session's partial
+file and folded into a running CRC-32, so neither the chunk nor the whole
+file is ever held in memory. A chunk that was already stored is
+acknowledged again without being rewritten, which makes retrying after a
+dropped connection safe.
+
+Views that take files (``submit_work``, ``conversation_detail``) accept the
+ids of finalized sessions; ``claim_uploads`` hands them over exactly once
+as ``File`` objects that ``Storage.save()`` moves into place instead of
+copying.
+"""
+import os
+import uuid
+import zlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.db import models, transaction
+from django.utils import timezone
+
+# Bytes read from the request body per write
+READ_SIZE = 64 * 1024
+
+
+class Blob(models.Model):
+    """
+    One stored file content, shared by every row whose file has the same
+    SHA-256; ``ref_count`` is the number of those rows. See ``uploads.storage``.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField(help_text="File size in bytes")
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count} references)"
+
+
+class UploadError(Exception):
+    """A chunk or finalize request the session cannot accept"""
+
+
+class UploadSession(models.Model):
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+        ('consumed', 'Consumed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField(help_text="File size in bytes")
+    chunk_size = models.PositiveIntegerField()
+    next_chunk = models.PositiveIntegerField(default=0)
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    checksum = models.PositiveBigIntegerField(default=0, help_text="CRC-32 of the bytes received so far")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # cleanup_uploads: stale sessions by status and age
+            models.Index(fields=['status', 'updated_at'], name='uploads_status_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()}) by {self.user.username}"
+
+    @property
+    def partial_path(self):
+        return os.path.join(settings.UPLOAD_PARTIAL_DIR, self.id.hex)
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    def expected_chunk_length(self, index):
+        return min(self.chunk_size, self.total_size - index * self.chunk_size)
+
+    def create_partial_file(self):
+        os.makedirs(settings.UPLOAD_PARTIAL_DIR, exist_ok=True)
+        open(self.partial_path, 'wb').close()
+
+    def write_chunk(self, index, stream):
+        """
+        Append chunk ``index`` read from ``stream`` to the partial file.
+
+        Chunks before ``next_chunk`` are already stored and are acknowledged
+        without rereading the body. Returns the session's new ``next_chunk``.
+        """
+        if self.status != 'uploading':
+            if index < self.next_chunk:
+                return self.next_chunk
+            raise UploadError('Upload is already finalized')
+        if index < self.next_chunk:
+            return self.next_chunk
+        if index != self.next_chunk or index >= self.chunk_count:
+            raise UploadError(f'Expected chunk {self.next_chunk}')
+
+        expected = self.expected_chunk_length(index)
+        checksum = self.checksum
+        written = 0
+        with open(self.partial_path, 'r+b') as partial:
+            # Drop whatever a previously interrupted attempt left behind
+            partial.seek(self.received_bytes)
+            partial.truncate()
+            while written <= expected:
+                data = stream.read(READ_SIZE)
+                if not data:
+                    break
+                partial.write(data)
+                written += len(data)
+                checksum = zlib.crc32(data, checksum)
+        if written != expected:
+            raise UploadError(f'Chunk {index} must be {expected} bytes, got {written}')
+
+        # Only one concurrent attempt at the same chunk may advance the session
+        advanced = UploadSession.objects.filter(
+            pk=self.pk, status='uploading', next_chunk=index
+        ).update(
+            next_chunk=index + 1,
+            received_bytes=self.received_bytes + written,
+            checksum=checksum,
+            updated_at=timezone.now(),
+        )
+        if not advanced:
+            raise UploadError(f'Chunk {index} was uploaded concurrently')
+        self.next_chunk = index + 1
+        self.received_bytes += written
+        self.checksum = checksum
+        return self.next_chunk
+
+    def finalize(self, checksum=None):
+        """Mark the upload complete once every byte has arrived and the client's CRC-32 matches"""
+        if self.status != 'uploading':
+            return
+        if self.received_bytes != self.total_size:
+            raise UploadError(f'Upload incomplete: {self.received_bytes} of {self.total_size} bytes received')
+        if checksum is not None and checksum != self.checksum:
+            raise UploadError('Checksum mismatch; upload the file again')
+        UploadSession.objects.filter(pk=self.pk, status='uploading').update(status='complete', updated_at=timezone.now())
+        self.status = 'complete'
+
+    def discard(self):
+        try:
+            os.remove(self.partial_path)
+        except FileNotFoundError:
+            pass
+        self.delete()
+
+
+class FinishedUpload(File):
+    """
+    A finalized upload's partial file, named and sized like the original.
+
+    Exposing ``temporary_file_path()`` lets ``FileSystemStorage`` move the
+    file into place, as it does for Django's own temporary uploads.
+    """
+
+    def __init__(self, session):
+        super().__init__(None, name=session.filename)
+        self.session = session
+        self.size = session.total_size
+
+    def open(self, mode='rb'):
+        if self.file is None:
+            self.file = open(self.session.partial_path, mode)
+        return self
+
+    def chunks(self, chunk_size=None):
+        self.open()
+        return super().chunks(chunk_size)
+
+    def temporary_file_path(self):
+        return self.session.partial_path
+
+
+def claim_uploads(user, upload_ids):
+    """
+    Hand over ``user``'s finalized uploads ``upload_ids``, each at most once.
+
+    Returns ``FinishedUpload`` files in the order given, or raises
+    ``UploadError`` (claiming nothing) if any id is unknown, not finalized
+    or already used.
+    """
+    upload_ids = list(dict.fromkeys(str(upload_id) for upload_id in upload_ids))
+    if not upload_ids:
+        return []
+    try:
+        upload_ids = [uuid.UUID(upload_id) for upload_id in upload_ids]
+    except ValueError:
+        raise UploadError('Invalid upload id')
+
+    with transaction.atomic():
+        sessions = UploadSession.objects.filter(id__in=upload_ids, user=user, status='complete')
+        claimed = sessions.update(status='consumed', updated_at=timezone.now())
+        if claimed != len(upload_ids):
+            raise UploadError('Upload not found or not finished')
+    sessions = UploadSession.objects.in_bulk(upload_ids)
+    return [FinishedUpload(sessions[upload_id]) for upload_id in upload_ids]
@@ -0,0 +1,138 @@
+"""
+Thumbnails and medium-size previews for uploaded images.
+
+Work files and message attachments that are images are saved with
+``preview_status='pending'``; the ``generate_previews`` command picks them
+up in batches and renders each distinct blob's variants on a process pool.
+Variants live in the blob's derived directory (``previews/<aa>/<sha256>/``),
+so they are shared by every row with the same content and removed with
+it, and rendering is idempotent: a variant that already exists is never
+rendered again.
+
+Only files in blob storage get previews; ``dedupe_media`` moves older files
+there first.
+"""
+import logging
+import os
+
+from django.conf import settings
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+from .storage import DERIVED_PREFIX, blob_digest, blob_name, blob_storage, derived_dir
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_STATUS_CHOICES = [
+    ('none', 'No preview'),
+    ('pending', 'Pending'),
+    ('ready', 'Ready'),
+    ('failed', 'Failed'),
+]
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+# Longest side in pixels of each variant, keyed by the model field storing it
+PREVIEW_SIZES = {
+    'thumbnail': 320,
+    'preview': 1280,
+}
+
+
+def initial_preview_status(filename):
+    """Status for a new row: images wait for the pipeline, other files have no preview"""
+    return 'pending' if os.path.splitext(filename or '')[1].lower() in IMAGE_EXTENSIONS else 'none'
+
+
+def preview_format():
+    return 'WEBP' if features.check('webp') else 'JPEG'
+
+
+def variant_name(sha256, variant, image_format=None):
+    extension = {'WEBP': 'webp', 'JPEG': 'jpg'}[image_format or preview_format()]
+    return f'{derived_dir(sha256)}/{variant}.{extension}'
+
+
+def source_for_variant(name):
+    """The blob a variant ``name`` was rendered from, or None if ``name`` is no variant"""
+    parts = name.split('/')
+    if len(parts) != 4 or parts[0] != DERIVED_PREFIX:
+        return None
+    source = blob_name(parts[2])
+    if blob_digest(source) is None or parts[1] != parts[2][:2]:
+        return None
+    return source
+
+
+def render_variants(name):
+    """
+    Render the missing variants of blob ``name`` (see ``PREVIEW_SIZES``)
+    and return ``{variant: stored name}``. Touches no database, so it can
+    run in a worker process.
+    """
+    sha256 = blob_digest(name)
+    if sha256 is None:
+        raise ValueError(f'{name} is not in blob storage')
+
+    image_format = preview_format()
+    names = {variant: variant_name(sha256, variant, image_format) for variant in PREVIEW_SIZES}
+    missing = {variant: size for variant, size in PREVIEW_SIZES.items()
+               if not blob_storage.exists(names[variant])}
+    if not missing:
+        return names
+
+    with Image.open(blob_storage.path(name)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image_format == 'JPEG':
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+        # Largest first, each resized from the previous one
+        for variant, size in sorted(missing.items(), key=lambda item: -item[1]):
+            image.thumbnail((size, size), Image.LANCZOS)
+            path = blob_storage.path(names[variant])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f'{path}.tmp'
+            image.save(temp_path, image_format, quality=settings.PREVIEW_QUALITY)
+            # Renders of the same blob may race; whichever finishes last wins
+            os.replace(temp_path, path)
+    return names
+
+
+def _render(name):
+    try:
+        return name, render_variants(name), None
+    except Exception as e:
+        return name, None, str(e)
+
+
+def process_pending(batch_size=50, pool=None):
+    """
+    Render variants for up to ``batch_size`` pending work files and
+    attachments, on ``pool`` (an executor) if given. Returns
+    ``(ready, failed)`` row counts.
+    """
+    from jobs.models import WorkFile
+    from messaging.models import Message
+
+    sources = [(WorkFile, 'file'), (Message, 'attachment')]
+    pending = {}
+    for model, field in sources:
+        names = model.objects.filter(preview_status='pending').values_list(field, flat=True)[:batch_size]
+        pending.update(dict.fromkeys(names))
+    if not pending:
+        return 0, 0
+
+    # Rendered before the transaction, which only records the results
+    results = list((pool.map if pool is not None else map)(_render, pending))
+
+    ready = failed = 0
+    with transaction.atomic():
+        for name, variants, error in results:
+            for model, field in sources:
+                rows = model.objects.filter(**{field: name, 'preview_status': 'pending'})
+                if variants is None:
+                    failed += rows.update(preview_status='failed')
+                else:
+                    ready += rows.update(preview_status='ready', **variants)
+            if error:
+                logger.warning(f"Could not render previews of {name}: {error}")
+    return ready, failed
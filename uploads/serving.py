@@ -0,0 +1,151 @@
+"""
+Sending stored files to the client once a view has authorized the request.
+
+``serve_file`` answers conditional requests (``If-None-Match`` /
+``If-Modified-Since``) with 304, then either hands the transfer to the web
+server or streams the file itself:
+
+- ``MEDIA_SENDFILE = 'x-accel-redirect'`` (nginx) or ``'x-sendfile'``
+  (Apache mod_xsendfile, lighttpd): the response carries only headers and
+  the web server sends the file, Range requests included, without tying up
+  a Python worker.
+- Otherwise a ``FileResponse`` streams it, through the server's
+  ``wsgi.file_wrapper`` (sendfile) when it can, and honours a single
+  ``Range`` so videos can be seeked.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_etags
+
+from .storage import blob_digest
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(header, size):
+    """
+    The ``(start, end)`` byte positions (inclusive) a ``Range`` header asks
+    for, or None to send the whole file (no header, or several ranges, which
+    are not supported). Raises ``RangeNotSatisfiable`` for a range outside
+    the file.
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last ``end`` bytes
+        length = int(end)
+        if not length or not size:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+class _RangeFile:
+    """Read at most ``length`` bytes of ``file`` from its current position"""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(name, stat):
+    # Blob names are content hashes, the strongest validator there is
+    sha256 = blob_digest(name)
+    if sha256:
+        return f'"{sha256}"'
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def serve_file(request, storage, name, filename=None, private=True):
+    """
+    Respond with file ``name`` from ``storage`` (which must be on the local
+    filesystem). ``filename`` is the name shown to the user; it also sets
+    the Content-Type, since blob names have no extension.
+    """
+    try:
+        path = storage.path(name)
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError, NotImplementedError):
+        raise Http404('File not found')
+
+    filename = filename or os.path.basename(name)
+    etag = file_etag(name, stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': 'private, max-age=3600' if private else 'public, max-age=86400',
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = _send(request, path, name, filename, stat, etag)
+    for header, value in headers.items():
+        response.headers.setdefault(header, value)
+    return response
+
+
+def _send(request, path, name, filename, stat, etag):
+    sendfile = getattr(settings, 'MEDIA_SENDFILE', None)
+    if sendfile:
+        content_type, encoding = mimetypes.guess_type(filename)
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        response['Content-Disposition'] = content_disposition_header(False, filename)
+        if sendfile == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+        elif sendfile == 'x-sendfile':
+            response['X-Sendfile'] = path
+        else:
+            raise ValueError(f"Unknown MEDIA_SENDFILE {sendfile!r}")
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    # A stale If-Range means the client's partial copy is outdated: send everything
+    if not if_range or etag in parse_etags(if_range) or if_range == http_date(stat.st_mtime):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, filename=filename)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(_RangeFile(file, end - start + 1), status=206, filename=filename)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
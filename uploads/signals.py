@@ -0,0 +1,31 @@
+from functools import lru_cache
+
+from django.db import transaction
+from django.db.models import FileField
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from jobs.models import WorkFile
+from messaging.models import Message
+
+from .storage import BlobStorage
+
+
+@lru_cache(maxsize=None)
+def _blob_fields(model):
+    return tuple(
+        field.name for field in model._meta.concrete_fields
+        if isinstance(field, FileField) and isinstance(field.storage, BlobStorage)
+    )
+
+
+# Connected per model: a post_delete receiver for every sender would stop
+# Django from fast-deleting any model's rows in cascades
+@receiver(post_delete, sender=WorkFile)
+@receiver(post_delete, sender=Message)
+def release_blobs(sender, instance, **kwargs):
+    """A deleted row no longer references its stored files; drop the references once it is gone for good"""
+    for name in _blob_fields(sender):
+        file = getattr(instance, name)
+        if file:
+            transaction.on_commit(lambda storage=file.storage, name=file.name: storage.delete(name))
@@ -0,0 +1,187 @@
+"""
+Content-addressed, deduplicated file storage.
+
+``BlobStorage`` hashes every file while it is written and stores its
+content once, under ``blobs/<aa>/<bb>/<sha256>``, no matter how many rows
+reference it or what they call it: the deliverable a freelancer sent in
+chat and then submitted as work is kept on disk a single time. Rows keep
+the name the user gave the file in their own column (``WorkFile.original_name``,
+``Message.attachment_name``).
+
+Each stored content has a ``Blob`` row counting its references. ``save()``
+adds a reference and ``delete()`` removes one, deleting the file only when
+the last reference goes, so deleting one row never breaks another. The
+``uploads.signals`` receivers release the references of deleted rows.
+
+Names outside ``blobs/`` (files stored before this storage was used) are
+handled like plain ``FileSystemStorage`` files; the ``dedupe_media``
+command moves them into blob storage.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'blobs'
+# Files rendered from a blob (see uploads.previews) live under its derived
+# directory and are removed together with it
+DERIVED_PREFIX = 'previews'
+BLOB_NAME_RE = re.compile(rf'^{BLOB_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/(?P<sha256>[0-9a-f]{{64}})$')
+
+
+def blob_name(sha256):
+    return f'{BLOB_PREFIX}/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+def derived_dir(sha256):
+    return f'{DERIVED_PREFIX}/{sha256[:2]}/{sha256}'
+
+
+def blob_digest(name):
+    """The SHA-256 a blob ``name`` stores, or None for a name outside blob storage"""
+    match = BLOB_NAME_RE.match(name or '')
+    return match.group('sha256') if match else None
+
+
+class SpooledBlob(File):
+    """
+    Content already hashed and written to a local file by ``BlobStorage.prepare``;
+    saving it only puts the file into place and records the reference.
+    """
+
+    def __init__(self, path, sha256, size, name=None, owned=True):
+        super().__init__(None, name=name)
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        # False when ``path`` is someone else's temporary upload file
+        self.owned = owned
+
+    def temporary_file_path(self):
+        return self.path
+
+    def discard(self):
+        """Remove the spooled copy of content that will not be saved"""
+        if self.owned and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@deconstructible(path='uploads.storage.BlobStorage')
+class BlobStorage(FileSystemStorage):
+
+    def prepare(self, content):
+        """
+        Hash ``content`` as it streams past and return it as a ``SpooledBlob``.
+        A temporary upload file is hashed in place; anything else is written
+        to a temporary file next to the blobs. Touches no database, so it is
+        safe to run in worker threads.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        if hasattr(content, 'temporary_file_path'):
+            for chunk in content.chunks():
+                digest.update(chunk)
+                size += len(chunk)
+            return SpooledBlob(content.temporary_file_path(), digest.hexdigest(), size, content.name, owned=False)
+
+        temp_dir = self.path(os.path.join(BLOB_PREFIX, 'tmp'))
+        os.makedirs(temp_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+        except Exception:
+            os.remove(path)
+            raise
+        return SpooledBlob(path, digest.hexdigest(), size, content.name)
+
+    def _save(self, name, content):
+        if not isinstance(content, SpooledBlob):
+            content = self.prepare(content)
+        name = blob_name(content.sha256)
+        full_path = self.path(name)
+
+        try:
+            # The file work happens before the transaction, which only
+            # holds the write lock for the reference count
+            if not os.path.exists(full_path):
+                self._place(content, full_path)
+            with transaction.atomic():
+                self._add_reference(content.sha256, content.size)
+                # With the Blob row locked, a concurrent delete of the last
+                # reference either removed the file already or can't now
+                if not os.path.exists(full_path):
+                    self._place(content, full_path)
+        finally:
+            content.discard()
+        return name
+
+    def _place(self, content, full_path):
+        """
+        Put a copy of ``content`` at ``full_path``, replacing it atomically so
+        readers never see a partial file. A spooled file this storage owns is
+        hard-linked, not copied, and stays in place until ``discard()``.
+        """
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        temp_path = f'{full_path}.{uuid.uuid4().hex}.tmp'
+        try:
+            linked = False
+            if content.owned:
+                try:
+                    os.link(content.path, temp_path)
+                    linked = True
+                except OSError:
+                    # Another filesystem, or one without hard links
+                    pass
+            if not linked:
+                shutil.copyfile(content.path, temp_path)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _add_reference(self, sha256, size):
+        from .models import Blob
+
+        if Blob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1):
+            return
+        try:
+            with transaction.atomic():
+                Blob.objects.create(sha256=sha256, size=size, ref_count=1)
+        except IntegrityError:
+            # Created concurrently by another save of the same content
+            Blob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1)
+
+    def delete(self, name):
+        """Drop one reference to a blob, removing the file with the last one"""
+        sha256 = blob_digest(name)
+        if sha256 is None:
+            return super().delete(name)
+
+        from .models import Blob
+
+        with transaction.atomic():
+            if Blob.objects.filter(sha256=sha256, ref_count__lte=1).delete()[0]:
+                super().delete(name)
+                shutil.rmtree(self.path(derived_dir(sha256)), ignore_errors=True)
+            else:
+                Blob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') - 1)
+
+
+blob_storage = BlobStorage()
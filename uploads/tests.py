@@ -0,0 +1,206 @@
+import io
+import os
+import shutil
+import tempfile
+import zlib
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from jobs.models import Job, WorkFile, WorkSubmission
+from .models import Blob, UploadError, UploadSession
+from .serving import RangeNotSatisfiable, parse_range
+from .storage import BlobStorage, blob_storage
+
+
+class MediaRootMixin:
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, UPLOAD_PARTIAL_DIR=f'{media_root}/partial')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class BlobStorageTests(MediaRootMixin, TestCase):
+
+    def test_same_content_is_stored_once(self):
+        first = blob_storage.save('report.pdf', ContentFile(b'deliverable'))
+        second = blob_storage.save('final-report.pdf', ContentFile(b'deliverable'))
+        other = blob_storage.save('report.pdf', ContentFile(b'something else'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(Blob.objects.get(sha256=first.rsplit('/', 1)[1]).ref_count, 2)
+        with blob_storage.open(first) as stored:
+            self.assertEqual(stored.read(), b'deliverable')
+
+    def test_file_is_removed_with_the_last_reference(self):
+        name = blob_storage.save('a.txt', ContentFile(b'shared'))
+        blob_storage.save('b.txt', ContentFile(b'shared'))
+
+        blob_storage.delete(name)
+        self.assertTrue(blob_storage.exists(name))
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+
+        blob_storage.delete(name)
+        self.assertFalse(blob_storage.exists(name))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_file_is_placed_outside_the_transaction(self):
+        depths = []
+        place = BlobStorage._place
+
+        def recording_place(storage, content, full_path):
+            depths.append(len(connection.atomic_blocks))
+            return place(storage, content, full_path)
+
+        outer = len(connection.atomic_blocks)
+        with mock.patch.object(BlobStorage, '_place', recording_place):
+            blob_storage.save('report.pdf', ContentFile(b'deliverable'))
+            blob_storage.save('report.pdf', ContentFile(b'deliverable'))
+        self.assertEqual(depths, [outer])
+        # No spooled copies left behind
+        self.assertEqual(os.listdir(blob_storage.path('blobs/tmp')), [])
+
+    def test_callers_temporary_file_is_left_alone(self):
+        for _ in range(2):
+            upload = TemporaryUploadedFile('report.pdf', 'application/pdf', 11, None)
+            self.addCleanup(upload.close)
+            upload.write(b'deliverable')
+            upload.seek(0)
+            name = blob_storage.save('report.pdf', upload)
+            self.assertTrue(os.path.exists(upload.temporary_file_path()))
+            with blob_storage.open(name) as stored:
+                self.assertEqual(stored.read(), b'deliverable')
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+
+    def test_deleting_a_row_releases_its_reference(self):
+        client = User.objects.create_user('client', 'client@example.com', 'password')
+        freelancer = User.objects.create_user('freelancer', 'freelancer@example.com', 'password')
+        job = Job.objects.create(
+            title='Logo', description='A logo', category='design', budget=40,
+            deadline='2030-01-01', client=client, freelancer=freelancer,
+        )
+        submission = WorkSubmission.objects.create(job=job, freelancer=freelancer, description='Done')
+        files = [
+            WorkFile.objects.create(
+                work_submission=submission, file=blob_storage.save(name, ContentFile(b'logo')),
+                original_name=name, file_size=4,
+            )
+            for name in ('logo.png', 'logo-copy.png')
+        ]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            files[0].delete()
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            files[1].delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(blob_storage.exists(files[1].file.name))
+
+
+class UploadSessionTests(MediaRootMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('freelancer', 'freelancer@example.com', 'password')
+
+    def setUp(self):
+        super().setUp()
+        self.session = UploadSession.objects.create(
+            user=self.user, filename='report.pdf', total_size=10, chunk_size=4,
+        )
+        self.session.create_partial_file()
+
+    def write(self, index, data):
+        return self.session.write_chunk(index, io.BytesIO(data))
+
+    def test_chunks_assemble_the_file(self):
+        self.assertEqual(self.write(0, b'0123'), 1)
+        self.assertEqual(self.write(1, b'4567'), 2)
+        self.assertEqual(self.write(2, b'89'), 3)
+        self.session.finalize(zlib.crc32(b'0123456789'))
+
+        self.assertEqual(UploadSession.objects.get(pk=self.session.pk).status, 'complete')
+        with open(self.session.partial_path, 'rb') as partial:
+            self.assertEqual(partial.read(), b'0123456789')
+
+    def test_retried_chunk_is_acknowledged_without_rereading(self):
+        self.write(0, b'0123')
+        body = io.BytesIO(b'xxxx')
+        self.assertEqual(self.session.write_chunk(0, body), 1)
+        self.assertEqual(body.tell(), 0)
+        self.assertEqual(UploadSession.objects.get(pk=self.session.pk).received_bytes, 4)
+
+    def test_wrong_length_chunk_is_rejected_and_can_be_retried(self):
+        for data in (b'012', b'01234'):
+            with self.assertRaisesMessage(UploadError, f'Chunk 0 must be 4 bytes, got {len(data)}'):
+                self.write(0, data)
+        self.assertEqual(UploadSession.objects.get(pk=self.session.pk).next_chunk, 0)
+
+        # The retry overwrites what the failed attempts left in the partial file
+        self.write(0, b'0123')
+        self.write(1, b'4567')
+        with self.assertRaisesMessage(UploadError, 'Chunk 2 must be 2 bytes, got 4'):
+            self.write(2, b'89ab')
+        self.write(2, b'89')
+        self.session.finalize(zlib.crc32(b'0123456789'))
+        with open(self.session.partial_path, 'rb') as partial:
+            self.assertEqual(partial.read(), b'0123456789')
+
+    def test_out_of_order_chunk_is_rejected(self):
+        with self.assertRaisesMessage(UploadError, 'Expected chunk 0'):
+            self.write(1, b'4567')
+        for index in range(3):
+            self.write(index, b'0123456789'[index * 4:index * 4 + 4])
+        with self.assertRaisesMessage(UploadError, 'Expected chunk 3'):
+            self.write(3, b'')
+
+    def test_finalize_checks_size_and_checksum(self):
+        self.write(0, b'0123')
+        with self.assertRaisesMessage(UploadError, 'Upload incomplete: 4 of 10 bytes received'):
+            self.session.finalize()
+        self.write(1, b'4567')
+        self.write(2, b'89')
+        with self.assertRaisesMessage(UploadError, 'Checksum mismatch'):
+            self.session.finalize(zlib.crc32(b'0123456788'))
+        self.assertEqual(UploadSession.objects.get(pk=self.session.pk).status, 'uploading')
+
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_ranges(self):
+        for header, expected in [
+            ('bytes=0-99', (0, 99)),
+            ('bytes=10-', (10, 999)),
+            ('bytes=990-2000', (990, 999)),
+            ('bytes=-100', (900, 999)),
+            ('bytes=-5000', (0, 999)),
+            (' bytes=5-5 ', (5, 5)),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 1000), expected)
+
+    def test_whole_file(self):
+        for header in (None, '', 'bytes=-', 'bytes=0-1,5-9', 'items=0-9', 'bytes=a-b'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 1000))
+
+    def test_unsatisfiable(self):
+        for header, size in [
+            ('bytes=1000-', 1000),
+            ('bytes=1000-1200', 1000),
+            ('bytes=50-10', 1000),
+            ('bytes=-0', 1000),
+            ('bytes=-10', 0),
+            ('bytes=0-', 0),
+        ]:
+            with self.subTest(header=header, size=size), self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, size)
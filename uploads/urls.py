@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('api/uploads/', views.create_upload, name='create_upload'),
+    path('api/uploads/<uuid:upload_id>/', views.upload_status, name='upload_status'),
+    path('api/uploads/<uuid:upload_id>/chunks/<int:index>/', views.upload_chunk, name='upload_chunk'),
+    path('api/uploads/<uuid:upload_id>/finalize/', views.finalize_upload, name='finalize_upload'),
+]
@@ -0,0 +1,146 @@
+import posixpath
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods, require_POST
+
+from jobs.models import WorkFile
+from messaging.models import Message
+from .models import UploadError, UploadSession
+from .previews import source_for_variant
+from .serving import serve_file
+from .storage import blob_storage
+
+# Media anyone may fetch, e.g. profile pictures shown on the public job board
+PUBLIC_MEDIA_PREFIXES = ('profile_pics/',)
+
+
+def _session_state(session):
+    return {
+        'success': True,
+        'upload_id': str(session.id),
+        'filename': session.filename,
+        'total_size': session.total_size,
+        'chunk_size': session.chunk_size,
+        'chunk_count': session.chunk_count,
+        'next_chunk': session.next_chunk,
+        'received_bytes': session.received_bytes,
+        'status': session.status,
+    }
+
+
+@login_required
+@require_POST
+def create_upload(request):
+    """Start a resumable upload for one file; the client then PUTs its chunks"""
+    filename = (request.POST.get('filename') or '').strip()
+    try:
+        total_size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid file size'}, status=400)
+
+    if not filename:
+        return JsonResponse({'success': False, 'error': 'Missing file name'}, status=400)
+    if total_size < 0:
+        return JsonResponse({'success': False, 'error': 'Invalid file size'}, status=400)
+    if total_size > settings.UPLOAD_MAX_SIZE:
+        return JsonResponse({
+            'success': False,
+            'error': f'File {filename} is too large. Maximum size is {settings.UPLOAD_MAX_SIZE // (1024 * 1024)}MB.'
+        }, status=400)
+
+    session = UploadSession.objects.create(
+        user=request.user,
+        filename=filename[:255],
+        total_size=total_size,
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+    )
+    session.create_partial_file()
+    return JsonResponse(_session_state(session), status=201)
+
+
+@login_required
+@require_http_methods(['GET'])
+def upload_status(request, upload_id):
+    """How far an upload got, so an interrupted client can resume from ``next_chunk``"""
+    session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+    return JsonResponse(_session_state(session))
+
+
+@login_required
+@require_http_methods(['PUT'])
+def upload_chunk(request, upload_id, index):
+    """Append chunk ``index`` (the raw request body) to the upload"""
+    session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+    try:
+        session.write_chunk(index, request)
+    except UploadError as e:
+        response = _session_state(session)
+        response.update(success=False, error=str(e))
+        return JsonResponse(response, status=409)
+    return JsonResponse(_session_state(session))
+
+
+@login_required
+@require_POST
+def finalize_upload(request, upload_id):
+    """Check that every chunk arrived (and the client's CRC-32, if sent) and mark the upload usable"""
+    session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+    checksum = request.POST.get('checksum')
+    try:
+        checksum = int(checksum) if checksum not in (None, '') else None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid checksum'}, status=400)
+
+    try:
+        session.finalize(checksum)
+    except UploadError as e:
+        response = _session_state(session)
+        response.update(success=False, error=str(e))
+        return JsonResponse(response, status=409)
+    return JsonResponse(_session_state(session))
+
+
+def _private_media(user, name):
+    """The file name to show for a work file or attachment ``user`` may read, else None"""
+    if not user.is_authenticated:
+        return None
+    work_file = WorkFile.objects.filter(
+        Q(work_submission__job__client=user) | Q(work_submission__job__freelancer=user),
+        file=name,
+    ).values_list('original_name', flat=True).first()
+    if work_file is not None:
+        return work_file
+    attachment = Message.objects.filter(
+        attachment=name, conversation__participants=user
+    ).values_list('attachment_name', flat=True).first()
+    if attachment is not None:
+        return attachment or name.rsplit('/', 1)[-1]
+    return None
+
+
+@require_http_methods(['GET', 'HEAD'])
+def serve_media(request, path):
+    """
+    Serve a file under MEDIA_URL. Work files and message attachments (and
+    their image previews) are only sent to the job's client and freelancer
+    or the conversation's participants.
+    """
+    if posixpath.normpath(path) != path:
+        raise Http404('File not found')
+    if path.startswith(PUBLIC_MEDIA_PREFIXES):
+        return serve_file(request, default_storage, path, private=False)
+
+    # Thumbnails and previews may be read by whoever may read their source
+    source = source_for_variant(path)
+    filename = _private_media(request.user, source or path)
+    if filename is None:
+        # Same answer for "missing" and "not yours", so names can't be probed
+        raise Http404('File not found')
+    if source is not None:
+        filename = posixpath.basename(path)
+    return serve_file(request, blob_storage, path, filename=filename)
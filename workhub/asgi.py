@@ -3,6 +3,10 @@ ASGI config for workhub project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the site with an ASGI server (e.g. ``uvicorn workhub.asgi:application``)
+to enable the server-sent events stream at /api/unread-count/stream/; under
+WSGI that endpoint answers 204 and pages fall back to polling.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,125 @@
+"""
+Application cache on top of Django's ``CACHES`` (Redis or files, shared
+by the worker processes; see ``CACHE_BACKEND`` in settings).
+
+Keys are versioned per namespace: ``cache_key('job:42', 'detail')`` is
+``job:42:g<generation>:detail``, where the generation is a timestamp kept
+in the cache. ``invalidate('job:42')`` replaces it with a new one, which
+abandons every key of the namespace at once (they expire on their own), so
+a group such as every page of the open-job list is dropped without knowing
+its keys. The new generation is written with a plain ``set`` rather than
+``incr``, which the file backend implements as a read-modify-write: two
+concurrent invalidations could both read one value and bump it to the same
+next one, leaving entries cached in between under the current generation.
+The model receivers in ``jobs.signals`` and ``reviews.models`` call it for
+the rows they change, after the transaction commits so a concurrent
+request cannot cache the old rows under the new generation.
+
+``cached`` computes a missing value in one caller per key at a time; the
+others wait for that result instead of all querying the database when a
+popular entry expires (a cache stampede). The lock is a ``cache.add``,
+atomic on Redis; on the file backend two callers may occasionally both
+take it and compute the value twice, which costs a query but serves
+nothing stale.
+"""
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+DEFAULT_TIMEOUT = 300
+# How long one caller may hold a key's lock before others compute it themselves
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+OPEN_JOBS = 'jobs:open'
+
+_MISSING = object()
+
+
+def job_namespace(job_id):
+    return f'job:{job_id}'
+
+
+def reviews_namespace(user_id):
+    return f'reviews:{user_id}'
+
+
+def unread_namespace(user_id):
+    return f'unread:{user_id}'
+
+
+def _new_generation():
+    # Time based, so an evicted generation never comes back with the value
+    # of one whose keys still exist, and concurrent bumps never coincide
+    return time.time_ns()
+
+
+def generation(namespace):
+    """
+    The namespace's current generation: a version number that changes
+    whenever it is invalidated (see ``etag_generation`` to use it as an ETag)
+    """
+    key = f'gen:{namespace}'
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _new_generation(), None)
+        value = cache.get(key)
+    return value
+
+
+def etag_generation(namespace):
+    """
+    ``generation(namespace)`` for an ETag, or None when the cache is local
+    to this process: invalidations made by other workers never reach it,
+    so its generation could validate a stale response indefinitely
+    """
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        return None
+    return generation(namespace)
+
+
+def cache_key(namespace, *parts):
+    return ':'.join([namespace, f'g{generation(namespace)}', *map(str, parts)])
+
+
+def invalidate(*namespaces):
+    """Drop every key of ``namespaces`` once the current transaction commits"""
+    def bump():
+        cache.set_many({f'gen:{namespace}': _new_generation() for namespace in namespaces}, None)
+
+    transaction.on_commit(bump)
+
+
+def cached(namespace, parts, compute, timeout=DEFAULT_TIMEOUT):
+    """
+    The cached value of key ``parts`` in ``namespace``, calling ``compute()``
+    and storing its result on a miss. Concurrent misses of the same key
+    (in any process sharing the cache) compute it once.
+    """
+    key = cache_key(namespace, *parts)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock_key = f'lock:{key}'
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        # Another caller is computing it: use their result when it lands
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if time.monotonic() >= deadline:
+            return compute()
+
+    try:
+        # Stored by the previous lock holder between our miss and our lock
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            cache.set(key, value, timeout)
+        return value
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,36 @@
+"""
+Conditional GET for JSON endpoints.
+
+``revalidate`` is Django's ``condition`` decorator for views whose body
+depends on who asks: the validator functions run before the view, and when
+the client's ``If-None-Match`` / ``If-Modified-Since`` still matches, the
+view (and its queries) is skipped and a bodiless 304 is sent. Responses are
+marked ``private, no-cache`` so browsers and proxies keep them per user and
+always come back to revalidate.
+
+Validators should be much cheaper than the view: a version counter from
+``workhub.cache.etag_generation`` or an indexed ``updated_at`` lookup.
+"""
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def revalidate(etag_func=None, last_modified_func=None):
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
+
+
+def user_etag(request, *parts):
+    """An ETag of ``parts`` for this user, so two users never share one"""
+    user_id = request.user.id if request.user.is_authenticated else 0
+    return '-'.join(map(str, (user_id, *parts)))
@@ -0,0 +1,65 @@
+"""
+``DATABASES['default']`` built from ``DATABASE_URL``.
+
+- SQLite (the default, ``sqlite:///<BASE_DIR>/db.sqlite3``): every new
+  connection switches to WAL, so readers and the writer no longer block
+  each other; ``synchronous=NORMAL``, which is crash-safe under WAL and
+  only fsyncs at checkpoints; a ``busy_timeout`` so a writer waits for the
+  lock instead of failing with "database is locked"; and memory-mapped
+  reads. Transactions begin IMMEDIATE, taking the write lock up front, so
+  two transactions can't both read and then deadlock upgrading to write.
+  That applies to every ``atomic()`` block, read-only ones included (e.g.
+  ``get_user_stats``): they queue for the write lock like any writer, so
+  keep them short and don't wrap plain reads in one.
+
+  WAL mode is persistent, recorded in the database file's header. The
+  development database checked into the repository (the default when
+  ``DATABASE_URL`` is unset) therefore keeps the rollback journal, so
+  running the app doesn't rewrite the tracked file (``wal=False``).
+- PostgreSQL: with psycopg 3 and ``psycopg_pool`` installed, Django's
+  connection pool is used. With psycopg2 (pinned in requirements.txt),
+  which Django cannot pool, each worker thread keeps its connection for
+  ``DATABASE_CONN_MAX_AGE`` seconds; put PgBouncer in front for a shared pool.
+
+Persistent connections are health-checked before reuse.
+"""
+import importlib.util
+
+import dj_database_url
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# Without WAL: synchronous stays FULL, which the rollback journal needs to be crash-safe
+SQLITE_ROLLBACK_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'busy_timeout': SQLITE_PRAGMAS['busy_timeout'],
+    'mmap_size': SQLITE_PRAGMAS['mmap_size'],
+}
+
+
+def sqlite_init_command(pragmas=SQLITE_PRAGMAS):
+    return ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items())
+
+
+def _psycopg_pool_available():
+    return all(importlib.util.find_spec(module) for module in ('psycopg', 'psycopg_pool'))
+
+
+def database_config(url, conn_max_age=600, pool_min_size=2, pool_max_size=10, wal=True):
+    """The settings dict for the database at ``url``; ``wal=False`` keeps a SQLite file out of WAL mode"""
+    config = dj_database_url.parse(url, conn_max_age=conn_max_age, conn_health_checks=True)
+    options = config.setdefault('OPTIONS', {})
+
+    if config['ENGINE'] == 'django.db.backends.sqlite3':
+        options.setdefault('init_command', sqlite_init_command(SQLITE_PRAGMAS if wal else SQLITE_ROLLBACK_PRAGMAS))
+        options.setdefault('transaction_mode', 'IMMEDIATE')
+    elif config['ENGINE'] == 'django.db.backends.postgresql' and _psycopg_pool_available():
+        options.setdefault('pool', {'min_size': pool_min_size, 'max_size': pool_max_size})
+        # The pool replaces persistent connections; Django refuses both
+        config['CONN_MAX_AGE'] = 0
+    return config
@@ -0,0 +1,127 @@
+"""
+SQLite write throughput with its defaults versus the tuning in
+``workhub.database``, under concurrent writer and reader processes the way
+gunicorn workers hit the database.
+
+    python -m workhub.db_benchmark --writers 4 --readers 2 --transactions 300
+
+Each configuration runs against a fresh temporary database. Writers commit
+small transactions (a message insert plus a counter update); readers keep
+scanning the table meanwhile. Reported are committed transactions per
+second and the attempts that failed with "database is locked".
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from workhub.database import SQLITE_PRAGMAS
+
+SCHEMA = """
+CREATE TABLE message (id INTEGER PRIMARY KEY, body TEXT NOT NULL, created_at REAL NOT NULL);
+CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER NOT NULL);
+INSERT INTO counter (id, value) VALUES (1, 0);
+"""
+
+# (pragmas applied on connect, statement starting a transaction)
+CONFIGURATIONS = {
+    # Django's defaults: rollback journal, synchronous=FULL, deferred transactions
+    'default': ({}, 'BEGIN'),
+    'tuned': (SQLITE_PRAGMAS, 'BEGIN IMMEDIATE'),
+}
+# Python's default busy timeout, which Django keeps unless OPTIONS sets one
+CONNECT_TIMEOUT = 5
+
+
+def _connect(path, pragmas):
+    connection = sqlite3.connect(path, timeout=CONNECT_TIMEOUT, isolation_level=None)
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name}={value}')
+    return connection
+
+
+def _writer(path, pragmas, begin, transactions, start, results):
+    connection = _connect(path, pragmas)
+    start.wait()
+    committed = locked = 0
+    while committed < transactions:
+        try:
+            connection.execute(begin)
+            connection.execute('SELECT value FROM counter WHERE id = 1').fetchone()
+            connection.execute('INSERT INTO message (body, created_at) VALUES (?, ?)', ('x' * 200, time.time()))
+            connection.execute('UPDATE counter SET value = value + 1 WHERE id = 1')
+            connection.execute('COMMIT')
+            committed += 1
+        except sqlite3.OperationalError:
+            locked += 1
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+    connection.close()
+    results.put((committed, locked))
+
+
+def _reader(path, pragmas, start, stop):
+    connection = _connect(path, pragmas)
+    start.wait()
+    while not stop.is_set():
+        try:
+            connection.execute('SELECT COUNT(*), MAX(created_at) FROM message').fetchone()
+        except sqlite3.OperationalError:
+            pass
+    connection.close()
+
+
+def run(name, writers, readers, transactions):
+    pragmas, begin = CONFIGURATIONS[name]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        connection = _connect(path, pragmas)
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        start = multiprocessing.Barrier(writers + readers + 1)
+        stop = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_writer, args=(path, pragmas, begin, transactions, start, results))
+            for _ in range(writers)
+        ] + [
+            multiprocessing.Process(target=_reader, args=(path, pragmas, start, stop))
+            for _ in range(readers)
+        ]
+        for process in processes:
+            process.start()
+
+        start.wait()
+        began = time.perf_counter()
+        outcomes = [results.get() for _ in range(writers)]
+        elapsed = time.perf_counter() - began
+        stop.set()
+        for process in processes:
+            process.join()
+
+    committed = sum(outcome[0] for outcome in outcomes)
+    locked = sum(outcome[1] for outcome in outcomes)
+    return committed / elapsed, locked, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--transactions', type=int, default=300, help="Commits per writer")
+    options = parser.parse_args()
+
+    print(f"{options.writers} writers x {options.transactions} transactions, {options.readers} readers")
+    baseline = None
+    for name in CONFIGURATIONS:
+        rate, locked, elapsed = run(name, options.writers, options.readers, options.transactions)
+        speedup = f" ({rate / baseline:.1f}x)" if baseline else ''
+        baseline = baseline or rate
+        print(f"{name:>8}: {rate:8.0f} commits/s{speedup}, {locked} locked, {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
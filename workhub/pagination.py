@@ -0,0 +1,54 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Pages are addressed by the sort key of the last row seen instead of an
+OFFSET, so fetching page N costs the same indexed range scan as page 1.
+Querysets are ordered newest first on ``(<field>, id)``; the cursor is an
+opaque URL-safe token encoding that pair.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk):
+    raw = f"{value.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(datetime, pk)`` for a token produced by ``encode_cursor``"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(value), int(pk)
+    except ValueError as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_paginate(queryset, cursor=None, limit=20, field='created_at'):
+    """
+    Return ``(items, next_cursor)`` for the page after ``cursor``.
+
+    ``next_cursor`` is None on the last page. One extra row is fetched to
+    find out whether there is a next page, so no COUNT query is needed.
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+        )
+
+    items = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return items, next_cursor
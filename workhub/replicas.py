@@ -0,0 +1,140 @@
+"""
+Read replicas.
+
+With ``DATABASE_REPLICA_URL`` set there is a ``replica`` database alias,
+and ``ReplicaRouter`` sends reads there only where data a moment old is
+fine:
+
+- in views decorated with ``replica_reads`` (GET and HEAD only) and in
+  ``use_replica()`` blocks; every other read goes to the primary;
+- never inside ``transaction.atomic``: a transaction reads what it writes
+  against. Querysets built for writing (``select_for_update``,
+  ``get_or_create``) are routed as writes and read the primary too;
+- never for a client that wrote recently. ``ReplicaPinMiddleware`` sets a
+  cookie on the response to any request that wrote, and for
+  ``REPLICA_PIN_SECONDS`` that client reads the primary, so users see
+  their own changes however far the replica lags.
+
+A request wrote if it isn't a GET, HEAD or OPTIONS, or if a model was
+saved or deleted (``post_save``, ``post_delete``, ``m2m_changed``) and the
+transaction committed. Being routed as a write isn't enough: lookups such
+as ``get_or_create`` that find their row write nothing. A GET view that
+writes with ``QuerySet.update()``, which sends no signal, calls
+``note_write()``.
+
+Writes always go to the primary. A value ``workhub.cache`` computes from a
+replica that lags behind an invalidation is kept until it expires.
+
+To try it locally, point ``DATABASE_REPLICA_URL`` at a copy of the SQLite
+file (``sqlite:///replica.sqlite3``) and refresh the copy to "replicate".
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.deprecation import MiddlewareMixin
+
+REPLICA_DB_ALIAS = 'replica'
+PIN_COOKIE = 'workhub_primary'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+# {'wrote': bool} for the request being handled, set by ReplicaPinMiddleware
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def use_replica():
+    """Let reads in this block (outside ``atomic``) go to the replica"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def is_pinned(request):
+    """Whether ``request`` comes from a client that wrote in the last REPLICA_PIN_SECONDS"""
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def note_write(using=DEFAULT_DB_ALIAS):
+    """Pin the current request's client to the primary once the current transaction commits"""
+    state = _request_state.get()
+    if state is not None and not state['wrote']:
+        transaction.on_commit(lambda: state.update(wrote=True), using=using)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def _model_written(sender, using, **kwargs):
+    note_write(using)
+
+
+@receiver(m2m_changed)
+def _relation_written(sender, action, using, **kwargs):
+    if action.startswith('post_'):
+        note_write(using)
+
+
+def replica_reads(view):
+    """Serve a read-only view from the replica, unless the client is pinned to the primary"""
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or is_pinned(request):
+            return view(request, *args, **kwargs)
+        with use_replica():
+            return view(request, *args, **kwargs)
+    return inner
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if (_replica_reads.get() and replica_configured()
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema from the primary
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinMiddleware(MiddlewareMixin):
+    """Pin clients to the primary for REPLICA_PIN_SECONDS after they write"""
+
+    def process_request(self, request):
+        request._replica_state = {'wrote': False}
+        _request_state.set(request._replica_state)
+
+    def process_response(self, request, response):
+        state = getattr(request, '_replica_state', None)
+        _request_state.set(None)
+        if not replica_configured() or state is None:
+            return response
+        if state['wrote'] or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, str(time.time() + seconds),
+                max_age=seconds, httponly=True, samesite='Lax',
+            )
+        return response
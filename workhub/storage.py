@@ -0,0 +1,93 @@
+"""
+Helpers for writing uploaded files to storage outside database transactions.
+
+Saving a large upload can take seconds; doing it inside
+``transaction.atomic()`` keeps the database write lock (the whole database
+on SQLite) for that long. Views should instead ``stage_files`` first, then
+record the returned names in a short transaction, and ``discard_files`` if
+that transaction fails:
+
+    staged = stage_files([(path, uploaded_file), ...])
+    try:
+        with transaction.atomic():
+            ...create rows pointing at staged names...
+    except Exception:
+        discard_files(staged)
+        raise
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+
+def _save(storage, path, content):
+    # Storage.save() copies content.chunks() to the destination (or moves
+    # a temporary upload file), so no upload is ever held in memory whole
+    return storage.save(path, content)
+
+
+def stage_files(files, storage=None, max_workers=None):
+    """
+    Save ``(path, file)`` pairs to ``storage`` concurrently.
+
+    Returns the saved names in the same order. If any save fails, the files
+    already written are deleted and the exception is re-raised.
+
+    A storage with a ``prepare(content)`` method (see ``uploads.storage``)
+    has only that slow part, writing the bytes, run concurrently; the saves
+    themselves then run here, so any database bookkeeping they do stays on
+    the caller's connection and transaction.
+    """
+    storage = storage or default_storage
+    files = list(files)
+    if not files:
+        return []
+
+    prepare = getattr(storage, 'prepare', None)
+    max_workers = max_workers or getattr(settings, 'UPLOAD_STAGING_WORKERS', 4)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(files))) as pool:
+        if prepare is None:
+            futures = [pool.submit(_save, storage, path, content) for path, content in files]
+        else:
+            futures = [pool.submit(prepare, content) for _, content in files]
+
+    results, error = [], None
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            error = error or e
+    if prepare is None:
+        if error is not None:
+            discard_files(results, storage)
+            raise error
+        return results
+
+    if error is not None:
+        for prepared in results:
+            prepared.discard()
+        raise error
+    saved = []
+    try:
+        for (path, _), prepared in zip(files, results):
+            saved.append(storage.save(path, prepared))
+    except Exception:
+        discard_files(saved, storage)
+        for prepared in results[len(saved):]:
+            prepared.discard()
+        raise
+    return saved
+
+
+def discard_files(names, storage=None):
+    """Best-effort removal of staged files whose database rows were never committed"""
+    storage = storage or default_storage
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.exception(f"Could not remove staged file {name}")
@@ -0,0 +1,329 @@
+import io
+import re
+import shutil
+import tempfile
+import zipfile
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import F, Q
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from jobs.models import Job, Application, WorkFile
+from jobs.search import search_jobs
+from jobs.views import MY_JOBS_TABS, _my_jobs_counts, _my_jobs_tab_jobs
+from messaging.models import Conversation, ConversationParticipant, Message
+from payments.models import Payment
+from .cache import cached, generation, invalidate
+from .pagination import encode_cursor, keyset_paginate
+from .replicas import PIN_COOKIE, REPLICA_DB_ALIAS, ReplicaRouter, note_write, use_replica
+from .zipstream import stream_zip, unique_names
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(TestCase):
+    """
+    Guard the hot query shapes used by the views against regressing to full
+    table scans. Each test runs EXPLAIN QUERY PLAN for the queryset a view
+    builds and checks that the expected composite index is used.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', 'client@example.com', 'password')
+        cls.freelancer = User.objects.create_user('freelancer', 'freelancer@example.com', 'password')
+        cls.job = Job.objects.create(
+            title='Build a website',
+            description='A small business site',
+            category='web_dev',
+            budget=500,
+            deadline='2030-01-01',
+            client=cls.client_user,
+        )
+        cls.conversation = Conversation.objects.create()
+        cls.conversation.participants.add(cls.client_user, cls.freelancer)
+
+    def assertUsesIndex(self, queryset, table, index):
+        self.assertPlanUsesIndex(queryset.explain(), table, index)
+
+    def assertPlanUsesIndex(self, plan, table, index):
+        full_scan = re.compile(rf'\bSCAN (TABLE )?{table}\b(?!\s+USING)')
+        for line in plan.splitlines():
+            self.assertIsNone(full_scan.search(line), f"Full scan of {table}:\n{plan}")
+        self.assertIn(index, plan, f"Expected {index} in plan:\n{plan}")
+
+    def assertQueriesUseIndex(self, run, table, index):
+        """
+        Call ``run`` (a helper that executes its own queries, like
+        ``keyset_paginate``) and check the plan of every query it sends
+        that reads ``table``.
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            run()
+        queries = [query['sql'] for query in ctx.captured_queries if f'FROM "{table}"' in query['sql']]
+        self.assertTrue(queries, f"No query read {table}")
+        for sql in queries:
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            self.assertPlanUsesIndex(plan, table, index)
+
+    # jobs.views
+
+    def test_job_board(self):
+        jobs = search_jobs('')
+        self.assertQueriesUseIndex(lambda: keyset_paginate(jobs), 'jobs_job', 'jobs_job_status_created_idx')
+        cursor = encode_cursor(self.job.created_at, self.job.pk)
+        self.assertQueriesUseIndex(lambda: keyset_paginate(jobs, cursor), 'jobs_job', 'jobs_job_status_created_idx')
+
+    def test_job_board_category(self):
+        jobs = search_jobs('', category='design')
+        self.assertQueriesUseIndex(lambda: keyset_paginate(jobs), 'jobs_job', 'jobs_job_status_created_idx')
+        self.assertUsesIndex(jobs, 'jobs_job', 'jobs_job_status_created_idx')
+
+    def test_my_jobs_counts(self):
+        self.assertQueriesUseIndex(
+            lambda: _my_jobs_counts(self.client_user, 'client'), 'jobs_job', 'jobs_job_client_status_idx'
+        )
+        self.assertQueriesUseIndex(
+            lambda: _my_jobs_counts(self.freelancer, 'freelancer'), 'jobs_job', 'jobs_job_freelancer_status_idx'
+        )
+
+    def test_my_jobs_tabs(self):
+        for tab, (owner, _) in MY_JOBS_TABS.items():
+            with self.subTest(tab=tab):
+                user = self.client_user if owner == 'client' else self.freelancer
+                jobs = _my_jobs_tab_jobs(user, tab)
+                self.assertQueriesUseIndex(
+                    lambda: keyset_paginate(jobs), 'jobs_job', f'jobs_job_{owner}_status_idx'
+                )
+
+    def test_decline_other_applications(self):
+        applications = Application.objects.filter(job=self.job, status='pending').exclude(id=0)
+        self.assertUsesIndex(applications, 'jobs_application', 'jobs_app_job_status_idx')
+
+    # accounts.views.dashboard
+
+    def test_dashboard_completed_jobs(self):
+        self.assertUsesIndex(
+            self.freelancer.assigned_jobs.filter(status='completed'), 'jobs_job', 'jobs_job_freelancer_status_idx'
+        )
+        self.assertUsesIndex(
+            self.client_user.posted_jobs.filter(status='completed'), 'jobs_job', 'jobs_job_client_status_idx'
+        )
+
+    def test_dashboard_earnings(self):
+        payments = Payment.objects.filter(to_user=self.freelancer, status='completed', payment_type='job_payment')
+        self.assertUsesIndex(payments, 'payments_payment', 'payments_to_status_type_idx')
+
+    def test_dashboard_spending(self):
+        payments = Payment.objects.filter(from_user=self.client_user, status='on_hold', payment_type='job_payment')
+        self.assertUsesIndex(payments, 'payments_payment', 'payments_from_status_idx')
+
+    # payments.views
+
+    def test_wallet_pending_payments(self):
+        self.assertUsesIndex(
+            Payment.objects.filter(from_user=self.client_user, status='on_hold'),
+            'payments_payment', 'payments_from_status_idx',
+        )
+        self.assertUsesIndex(
+            Payment.objects.filter(to_user=self.freelancer, status='on_hold'),
+            'payments_payment', 'payments_to_status_type_idx',
+        )
+
+    def test_client_total_spent(self):
+        payments = Payment.objects.filter(
+            from_user=self.client_user, status='completed'
+        ).exclude(payment_type='wallet_topup')
+        self.assertUsesIndex(payments, 'payments_payment', 'payments_from_status_idx')
+
+    # messaging.views
+
+    def test_mark_conversation_read(self):
+        memberships = ConversationParticipant.objects.filter(conversation=self.conversation, user=self.client_user)
+        self.assertUsesIndex(
+            memberships, 'messaging_conversation_participants', 'messaging_conversation_participants_conversation_id_user_id'
+        )
+
+    def test_unread_count(self):
+        messages = Message.objects.filter(
+            conversation__memberships__user=self.client_user,
+            id__gt=F('conversation__memberships__last_read_message_id'),
+        ).exclude(sender=self.client_user).exclude(conversation__deleted_by=self.client_user)
+        # Every SQLite index ends in the rowid, so the planner may serve the
+        # watermark range from either conversation index; what matters is the seek
+        self.assertUsesIndex(messages, 'messaging_message', '(conversation_id=? AND rowid>?)')
+
+    # uploads.views.serve_media
+
+    def test_media_work_file_lookup(self):
+        work_files = WorkFile.objects.filter(
+            Q(work_submission__job__client=self.client_user) | Q(work_submission__job__freelancer=self.client_user),
+            file='blobs/00/00/0000',
+        )
+        self.assertUsesIndex(work_files, 'jobs_workfile', 'jobs_workfile_file_idx')
+
+    def test_media_attachment_lookup(self):
+        messages = Message.objects.filter(attachment='blobs/00/00/0000', conversation__participants=self.client_user)
+        self.assertUsesIndex(messages, 'messaging_message', 'messaging_msg_attachment_idx')
+
+
+class ReplicaMixin:
+    """
+    A ``replica`` alias reading the test database over a connection of its
+    own, like the one DATABASE_REPLICA_URL adds (with TEST MIRROR), for a
+    TransactionTestCase: the replica only sees committed rows.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        connections.settings[REPLICA_DB_ALIAS] = {**primary, 'TEST': {**primary['TEST'], 'MIRROR': DEFAULT_DB_ALIAS}}
+        # Not a class attribute: the test runner would look for the alias in DATABASES
+        cls.databases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        cls.replica_configured = mock.patch('workhub.replicas.replica_configured', return_value=True)
+        cls.replica_configured.start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.replica_configured.stop()
+        connections[REPLICA_DB_ALIAS].close()
+        del connections[REPLICA_DB_ALIAS]
+        del connections.settings[REPLICA_DB_ALIAS]
+
+    def replica_queries(self):
+        return CaptureQueriesContext(connections[REPLICA_DB_ALIAS])
+
+
+# A cache shared by the test runs would answer from another run's rows
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ReplicaRouterTests(ReplicaMixin, TransactionTestCase):
+
+    def setUp(self):
+        self.client_user = User.objects.create_user('client', 'client@example.com', 'password')
+        self.freelancer = User.objects.create_user('freelancer', 'freelancer@example.com', 'password')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.client_user, self.freelancer)
+        Message.objects.create(conversation=self.conversation, sender=self.freelancer, content='Hello')
+        self.client.force_login(self.client_user)
+
+    def test_routing(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Job), DEFAULT_DB_ALIAS)
+        with use_replica():
+            self.assertEqual(router.db_for_read(Job), REPLICA_DB_ALIAS)
+            self.assertEqual(router.db_for_write(Job), DEFAULT_DB_ALIAS)
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Job), DEFAULT_DB_ALIAS)
+
+    def test_read_only_view_reads_the_replica(self):
+        with self.replica_queries() as replica:
+            response = self.client.get('/inbox/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('messaging_conversation' in query['sql'] for query in replica.captured_queries))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_during_a_get_pins_the_client(self):
+        # Opening the conversation moves the read watermark
+        response = self.client.get(f'/conversation/{self.conversation.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        with self.replica_queries() as replica:
+            self.assertEqual(self.client.get('/inbox/').status_code, 200)
+        self.assertEqual(replica.captured_queries, [])
+
+    def test_rolled_back_write_does_not_pin(self):
+        state = {'wrote': False}
+        with mock.patch('workhub.replicas._request_state') as request_state:
+            request_state.get.return_value = state
+            with transaction.atomic():
+                note_write()
+                transaction.set_rollback(True)
+            self.assertFalse(state['wrote'])
+            note_write()
+        self.assertTrue(state['wrote'])
+
+
+class CacheTests(TestCase):
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        settings_override = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_invalidate_drops_the_namespace(self):
+        self.assertEqual(cached('job:1', ('detail',), lambda: 'old'), 'old')
+        self.assertEqual(cached('job:1', ('detail',), lambda: 'new'), 'old')
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate('job:1')
+        self.assertEqual(cached('job:1', ('detail',), lambda: 'new'), 'new')
+
+    def test_concurrent_invalidations_both_change_the_generation(self):
+        before = generation('job:1')
+        # Two workers that both read the generation before either bumps it
+        # can't collapse into one bump: the new value doesn't depend on it
+        with mock.patch('workhub.cache.cache.get', return_value=before), \
+                self.captureOnCommitCallbacks(execute=True):
+            invalidate('job:1')
+        first = generation('job:1')
+        with mock.patch('workhub.cache.cache.get', return_value=before), \
+                self.captureOnCommitCallbacks(execute=True):
+            invalidate('job:1')
+        self.assertEqual(len({before, first, generation('job:1')}), 3)
+
+
+class ZipStreamTests(SimpleTestCase):
+
+    def archive(self, files, **kwargs):
+        """Stream ``(name, content, compress)`` entries the way the download view does"""
+        names = unique_names(name for name, _, _ in files)
+        entries = [
+            (name, ContentFile(content), len(content), compress)
+            for name, (_, content, compress) in zip(names, files)
+        ]
+        stream = io.BytesIO()
+        for chunk in stream_zip(entries, **kwargs):
+            stream.write(chunk)
+        stream.seek(0)
+        return zipfile.ZipFile(stream)
+
+    def test_archive_is_valid(self):
+        report = b'quarterly numbers ' * 5000
+        archive = self.archive([
+            ('report.txt', report, True),
+            ('photo.jpg', bytes(range(256)) * 40, False),
+            ('empty.txt', b'', True),
+        ], chunk_size=1024)
+
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), ['report.txt', 'photo.jpg', 'empty.txt'])
+        self.assertEqual(archive.read('report.txt'), report)
+        self.assertEqual(archive.read('photo.jpg'), bytes(range(256)) * 40)
+        self.assertEqual(archive.read('empty.txt'), b'')
+        self.assertEqual(archive.getinfo('report.txt').compress_type, zipfile.ZIP_DEFLATED)
+        self.assertEqual(archive.getinfo('photo.jpg').compress_type, zipfile.ZIP_STORED)
+
+    def test_duplicate_names_are_numbered(self):
+        archive = self.archive([
+            ('final.pdf', b'one', False),
+            ('Final.pdf', b'two', False),
+            ('final.pdf', b'three', False),
+            ('notes', b'four', True),
+            ('notes', b'five', True),
+        ])
+
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), ['final.pdf', 'Final (2).pdf', 'final (3).pdf', 'notes', 'notes (2)'])
+        self.assertEqual(archive.read('final (3).pdf'), b'three')
+        self.assertEqual(archive.read('notes (2)'), b'five')
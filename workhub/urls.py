@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from uploads.views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,8 +10,7 @@ urlpatterns = [
     path("", include("payments.urls")),
     path("", include("reviews.urls")),
     path("", include("messaging.urls")),
-]
-
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    path("", include("uploads.urls")),
+    # Media goes through an authorization check in every environment
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", serve_media, name="serve_media"),
+]
\ No newline at end of file